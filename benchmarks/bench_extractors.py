@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the HTML extraction scripts
+Generates synthetic portal pages with a grdMaps grid of N rows and D district
+options, then times and memory-profiles (tracemalloc) each extractor's parse
+function. Results are written as JSON and can be compared with an earlier run
+to catch regressions.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from extract_from_html_table import parse_table_html, parse_table_html_fast
+from extract_from_saved_html import parse_districts_html
+from extract_html_simple import parse_page_html
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+DEFAULT_ROWS = "1000,10000,100000"
+DEFAULT_DISTRICTS = "30,300"
+DEFAULT_REPEAT = 3
+REGRESSION_THRESHOLD = 0.20  # Flag runs more than 20% slower (or larger) than the baseline
+
+EXTRACTORS = {
+    'table_bs4': parse_table_html,
+    'table_fast': parse_table_html_fast,
+    'saved_html_bs4': parse_districts_html,
+    'simple_bs4': parse_page_html,
+}
+
+ROW_TEMPLATE = """<tr{style}>
+			<td>
+                                    <span id="grdMaps_lblDist_{i}">{district}</span>
+                                </td><td>
+                                    <span id="grdMaps_lblTal_{i}">{taluk}</span>
+                                </td><td>
+                                    <span id="grdMaps_lblHob_{i}">{hobli}</span>
+                                </td><td>
+                                    <span id="grdMaps_lblVil_{i}">{village}</span>
+                                </td><td>
+                                    <input type="image" name="grdMaps$ctl{ctl:02d}$ImgPdf" id="grdMaps_ImgPdf_{i}" src="./pdf.jpg" style="height:20px;width:20px;">
+                                </td><td>
+                                </td>
+		</tr>"""
+
+def synthetic_page(rows, districts, taluks_per_district=8, hoblis_per_taluk=6):
+    """A portal page shaped like the live one, with `rows` grid rows over `districts` districts"""
+    options = ['\t<option value="0">All</option>']
+    options += [f'\t<option value="{d + 1}">District {d + 1}</option>' for d in range(districts)]
+    parts = [
+        '<html><head><title>SSLR | Revenue Maps Online</title>',
+        '<script type="text/javascript">function jsFunctionDisplay() { /* district taluk */ }</script>',
+        '</head><body><form method="post" action="./" id="frmdata">',
+        '<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="' + 'A' * 4096 + '">',
+        '<input type="hidden" name="__EVENTVALIDATION" id="__EVENTVALIDATION" value="' + 'B' * 1024 + '">',
+        '<select name="ddl_district" id="ddl_district">', "\n".join(options), '</select>',
+        '<table cellspacing="0" rules="all" border="1" id="grdMaps"><tbody><tr>',
+        '<th scope="col">District</th><th scope="col">Taluk</th><th scope="col">Hobli</th>'
+        '<th scope="col">Village</th><th scope="col">Pdf File</th><th scope="col">KMZ File</th></tr>',
+    ]
+    for i in range(rows):
+        d = i % districts
+        t = (i // districts) % taluks_per_district
+        h = (i // (districts * taluks_per_district)) % hoblis_per_taluk
+        parts.append(ROW_TEMPLATE.format(
+            style=' style="background-color:LightBlue;"' if i % 2 == 0 else '', i=i, ctl=i + 2,
+            district=f"District {d + 1}", taluk=f"TALUK {d + 1}-{t + 1}",
+            hobli=f"HOBLI {d + 1}-{t + 1}-{h + 1}", village=f"VILLAGE {i + 1}"
+        ))
+    parts.append('<tr style="background-color:CornflowerBlue;"><td colspan="6"><table><tbody><tr>'
+                 '<td><span>1</span></td><td><a href="javascript:__doPostBack(&#39;grdMaps&#39;,&#39;Page$2&#39;)">2</a></td>'
+                 '</tr></tbody></table></td></tr>')
+    parts.append('</tbody></table></form></body></html>')
+    return "\n".join(parts)
+
+def time_extractor(func, page, repeat):
+    """Wall-clock seconds of each of `repeat` parses"""
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        func(page)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+def peak_memory(func, page):
+    """Peak traced allocation of one parse, in MB"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func(page)
+        return tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    finally:
+        tracemalloc.stop()
+
+def run_benchmarks(row_counts, district_counts, extractors, repeat):
+    """Benchmark every extractor on every page size"""
+    results = []
+    for districts in district_counts:
+        for rows in row_counts:
+            page = synthetic_page(rows, districts)
+            print(f"📄 {rows:,} rows, {districts} districts ({len(page) / 1024 / 1024:.1f} MB of HTML)")
+            if 'table_bs4' in extractors and 'table_fast' in extractors and rows <= 10000:
+                if parse_table_html(page) != parse_table_html_fast(page):
+                    print("   ❌ table_fast disagrees with table_bs4 on this page")
+            for name in extractors:
+                func = EXTRACTORS[name]
+                timings = time_extractor(func, page, repeat)
+                peak = peak_memory(func, page)
+                best = min(timings)
+                results.append({
+                    'extractor': name,
+                    'rows': rows,
+                    'districts': districts,
+                    'html_bytes': len(page),
+                    'seconds_best': round(best, 6),
+                    'seconds_median': round(statistics.median(timings), 6),
+                    'peak_mb': round(peak, 2),
+                    'rows_per_second': round(rows / best) if best else None
+                })
+                print(f"   {name:<15} best {best:9.4f}s  median {statistics.median(timings):9.4f}s  "
+                      f"peak {peak:8.1f} MB  {rows / best if best else 0:12,.0f} rows/s")
+    return results
+
+def compare(results, baseline_path, threshold):
+    """Print changes against a baseline run; returns the regressions found"""
+    with open(baseline_path, 'r') as f:
+        baseline = {(r['extractor'], r['rows'], r['districts']): r for r in json.load(f)['results']}
+    regressions = []
+    print(f"\n📊 Compared with {baseline_path}:")
+    for r in results:
+        old = baseline.get((r['extractor'], r['rows'], r['districts']))
+        if not old:
+            continue
+        time_ratio = r['seconds_best'] / old['seconds_best'] if old['seconds_best'] else 1.0
+        mem_ratio = r['peak_mb'] / old['peak_mb'] if old['peak_mb'] else 1.0
+        flag = ''
+        if time_ratio > 1 + threshold or mem_ratio > 1 + threshold:
+            flag = '  ⚠️  regression'
+            regressions.append(r)
+        print(f"   {r['extractor']:<15} {r['rows']:>7,} rows {r['districts']:>4} districts: "
+              f"time x{time_ratio:.2f}  memory x{mem_ratio:.2f}{flag}")
+    return regressions
+
+def parse_counts(text):
+    return [int(x) for x in text.split(',') if x.strip()]
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark the HTML extractors on synthetic portal pages")
+    parser.add_argument('--rows', default=DEFAULT_ROWS, help=f"Grid row counts (default: {DEFAULT_ROWS})")
+    parser.add_argument('--districts', default=DEFAULT_DISTRICTS,
+                        help=f"District option counts (default: {DEFAULT_DISTRICTS})")
+    parser.add_argument('--extractors', default=','.join(EXTRACTORS),
+                        help=f"Subset of: {', '.join(EXTRACTORS)}")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="Timed runs per case (best is kept)")
+    parser.add_argument('-o', '--output', help="Results file (default: benchmarks/results/extractors-<time>.json)")
+    parser.add_argument('--compare', help="Earlier results file to compare against")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help="Relative slowdown or memory growth counted as a regression")
+    args = parser.parse_args()
+
+    extractors = [e for e in args.extractors.split(',') if e]
+    unknown = [e for e in extractors if e not in EXTRACTORS]
+    if unknown:
+        parser.error(f"unknown extractors: {', '.join(unknown)}")
+
+    results = run_benchmarks(parse_counts(args.rows), parse_counts(args.districts), extractors,
+                             max(1, args.repeat))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"extractors-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'created': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+            'results': results
+        }, f, indent=2)
+    print(f"\n💾 Results saved to: {output}")
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
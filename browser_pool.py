@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+"""
+Supervised pool of browser workers for long download runs
+Each worker thread owns one Chrome (plus its paired download session). The
+supervisor recycles a browser after MAX_PAGES_PER_DRIVER pages or when its
+process tree passes MAX_DRIVER_RSS_MB, a watchdog kills sessions that hang,
+and crashed workers are replaced with their in-flight village re-queued.
+With hedging on, a village running past the live p95 is started a second time
+on the next free worker; the first copy to finish wins and the other is
+cancelled.
+"""
+
+import os
+import queue
+import signal
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from geodocs.scheduler import BULK, HEDGE, INTERACTIVE, LaneScheduler
+
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False  # RSS is read from /proc where available
+
+MAX_PAGES_PER_DRIVER = 300  # Recycle a browser after this many page loads
+MAX_DRIVER_RSS_MB = 1500  # Recycle when chromedriver + Chrome use more than this
+WATCHDOG_TIMEOUT = 180  # Seconds a single village may take before its browser is killed
+MAX_REQUEUES = 2  # Times a village is retried on a fresh browser after a crash
+RESTART_BACKOFF = 5  # Seconds to wait after a browser fails to start
+HEDGE_PERCENTILE = 0.95  # Hedge items running longer than this share of recent items
+HEDGE_MIN_SAMPLES = 20  # Finished items needed before the percentile is trusted
+HEDGE_WINDOW = 200  # Recent item durations the percentile is taken over
+HEDGE_MAX_SHARE = 0.05  # At most this share of finished items may be hedged
+
+class WorkerCrashed(Exception):
+    """The worker's browser died or was killed by the watchdog"""
+
+class Cancelled(Exception):
+    """Another copy of this worker's (hedged) item finished first"""
+
+class _Race:
+    """The copies of one item running on the pool; the first to claim it wins"""
+
+    def __init__(self, item, future, handler):
+        self.item = item
+        self.future = future
+        self.handler = handler
+        self.lock = threading.Lock()
+        self.workers = []  # Workers running a copy right now
+        self.queued = 0  # Copies waiting in the scheduler
+        self.winner = None
+        self.hedged = False
+        self.delivered = False
+
+    def join(self, worker):
+        with self.lock:
+            self.workers.append(worker)
+
+    def leave(self, worker):
+        """Remove a finished copy; returns how many copies are still running"""
+        with self.lock:
+            self.workers.remove(worker)
+            return len(self.workers)
+
+    def claim(self, worker):
+        """Make `worker` the winner (cancelling the other copies); False if another copy won"""
+        with self.lock:
+            if self.winner is None:
+                self.winner = worker
+                for other in self.workers:
+                    if other is not worker:
+                        other.cancelled = True
+            return self.winner is worker
+
+def _children(pid):
+    """All descendant pids of a process"""
+    if HAS_PSUTIL:
+        try:
+            return [p.pid for p in psutil.Process(pid).children(recursive=True)]
+        except psutil.Error:
+            return []
+    if not os.path.isdir('/proc'):
+        return []
+    parents = {}
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat', 'r') as f:
+                    stat = f.read()
+                parents.setdefault(int(stat.rsplit(')', 1)[1].split()[1]), []).append(int(entry))
+            except (OSError, IndexError, ValueError):
+                continue
+    found, stack = [], [pid]
+    while stack:
+        for child in parents.get(stack.pop(), []):
+            found.append(child)
+            stack.append(child)
+    return found
+
+def _rss_mb(pid):
+    """Resident memory of one process in MB, or None if it cannot be read"""
+    if HAS_PSUTIL:
+        try:
+            return psutil.Process(pid).memory_info().rss / 1024 / 1024
+        except psutil.Error:
+            return None
+    try:
+        with open(f'/proc/{pid}/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+class BrowserWorker:
+    """One browser and its download session, as seen by the supervisor"""
+
+    def __init__(self, worker_id, driver_factory, session_factory=None, warmup=None):
+        self.worker_id = worker_id
+        self.driver_factory = driver_factory
+        self.session_factory = session_factory
+        self.warmup = warmup
+        self.warm = False  # Browser shows a freshly loaded portal page
+        self.driver = None
+        self.session = None
+        self.pages = 0
+        self.busy_since = None
+        self.killed = False
+        self.recycled = 0
+        self.race = None  # The item being worked on
+        self.cancelled = False  # A hedged copy of that item already won
+
+    @property
+    def pid(self):
+        try:
+            return self.driver.service.process.pid
+        except AttributeError:
+            return None
+
+    def start(self):
+        """Launch a fresh browser (and session), pre-loading the portal if a warmup is set"""
+        self.driver = self.driver_factory()
+        self.pages = 0
+        self.killed = False
+        self.warm = False
+        if self.warmup is not None:
+            try:
+                self.warmup(self.driver)
+                self.warm = True
+            except Exception:
+                pass  # The first village will navigate itself
+        self.session = self.session_factory(self.driver) if self.session_factory else None
+
+    def stop(self):
+        """Quit the browser, killing it if it does not quit cleanly"""
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+        if self.driver is not None:
+            if self.killed:
+                self.kill()
+            else:
+                try:
+                    self.driver.quit()
+                except Exception:
+                    self.kill()
+            self.driver = None
+
+    def restart(self):
+        """Replace the browser with a fresh one"""
+        self.stop()
+        self.start()
+
+    def kill(self):
+        """Hard-kill chromedriver and every Chrome process under it"""
+        pid = self.pid
+        if pid is None:
+            return
+        for child in reversed(_children(pid)):
+            try:
+                os.kill(child, signal.SIGKILL)
+            except OSError:
+                pass
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+    def rss_mb(self):
+        """Memory used by chromedriver and its Chrome processes"""
+        pid = self.pid
+        if pid is None:
+            return None
+        sizes = [_rss_mb(p) for p in [pid] + _children(pid)]
+        sizes = [s for s in sizes if s is not None]
+        return sum(sizes) if sizes else None
+
+    def needs_recycle(self):
+        """Page budget used up or memory cap exceeded"""
+        if self.pages >= MAX_PAGES_PER_DRIVER:
+            return True
+        rss = self.rss_mb()
+        return rss is not None and rss > MAX_DRIVER_RSS_MB
+
+    def is_alive(self):
+        """Whether the browser still answers WebDriver commands"""
+        if self.killed or self.driver is None:
+            return False
+        try:
+            process = getattr(self.driver.service, 'process', None)
+            if process is not None and process.poll() is not None:
+                return False
+            self.driver.current_window_handle
+            return True
+        except Exception:
+            return False
+
+    def check(self):
+        """Raise WorkerCrashed if the watchdog killed this worker's browser, Cancelled if another copy won"""
+        if self.killed:
+            raise WorkerCrashed(f"worker {self.worker_id} was killed by the watchdog")
+        if self.cancelled:
+            raise Cancelled(f"worker {self.worker_id} lost a hedged race")
+
+    def claim(self):
+        """Take the current item for this worker before side effects such as downloading
+
+        Raises Cancelled if a hedged copy on another worker claimed it first.
+        Handlers that never call claim() are claimed when they return.
+        """
+        race = self.race
+        if race is not None and not race.claim(self):
+            raise Cancelled(f"worker {self.worker_id} lost a hedged race")
+
+class BrowserPool:
+    """Run a handler over items on a pool of supervised browser workers
+
+    `handler(worker, item)` does the work on `worker.driver` and returns a
+    result. It should raise WorkerCrashed (or call `worker.check()`) when it
+    notices its browser is gone. `run()` yields `(item, result)` pairs as they
+    finish; `result` is None for items abandoned after MAX_REQUEUES crashes.
+
+    Browsers are launched in parallel as soon as the pool starts and, with a
+    `warmup(driver)` callable, pre-loaded so that `worker.warm` is set. With
+    `rewarm=True` a worker re-runs the warmup after each item, once the result
+    is delivered, so idle browsers always wait on a fresh portal page.
+
+    A long-running pool takes items one at a time with `submit()`, which
+    returns a Future instead of going through `run()`. Items wait in priority
+    lanes (geodocs/scheduler.py): `run()` feeds the bulk lane and `submit()`
+    the interactive one by default, so a submitted lookup goes to the next
+    free worker. `lanes` overrides each lane's worker and rate shares and
+    `rate` is the pool's portal budget in villages per second.
+
+    With `hedge=True` the watchdog also starts a second copy of any item
+    running past the HEDGE_PERCENTILE of recent durations (for at most
+    HEDGE_MAX_SHARE of the items), ahead of the bulk lane. The first copy to
+    return, or to call `worker.claim()`, wins; the other is cancelled at its
+    next `worker.check()` / `worker.claim()` and its result discarded.
+
+    `watchdog_timeout` is how long one item may run before its browser is
+    killed; callers size it from their handler's own waits.
+    """
+
+    def __init__(self, size, handler, driver_factory, session_factory=None, delay=0, warmup=None,
+                 rewarm=False, lanes=None, rate=None, hedge=False, watchdog_timeout=WATCHDOG_TIMEOUT):
+        self.handler = handler
+        self.watchdog_timeout = watchdog_timeout
+        self.delay = delay
+        self.rewarm = rewarm and warmup is not None
+        self.workers = [BrowserWorker(i + 1, driver_factory, session_factory, warmup)
+                        for i in range(max(1, size))]
+        self.tasks = LaneScheduler(len(self.workers), lanes, rate)
+        self.results = queue.Queue()
+        self.stats = {'recycled': 0, 'crashed': 0, 'hung': 0, 'requeued': 0, 'abandoned': 0,
+                      'finished': 0, 'hedged': 0, 'hedge_won': 0, 'cancelled': 0}
+        self.hedge = hedge and len(self.workers) > 1
+        self.durations = deque(maxlen=HEDGE_WINDOW)  # Seconds taken by recent winning copies
+        self._stop = threading.Event()
+        self._threads = []
+        self._start_lock = threading.Lock()
+
+    def _work(self, worker):
+        # Launch and pre-warm before taking work, so all browsers start in parallel
+        try:
+            worker.start()
+        except Exception:
+            worker.driver = None  # Retried when the first item arrives
+
+        while not self._stop.is_set():
+            try:
+                lane, (item, attempts, future, handler, race) = self.tasks.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if race is None:
+                race = _Race(item, future, handler)
+            else:
+                with race.lock:
+                    race.queued -= 1
+                    finished = race.winner is not None
+                if finished:
+                    self.tasks.done(lane)  # Copy of an item that finished while it waited
+                    continue
+            race.join(worker)
+            worker.race = race
+            worker.cancelled = False
+
+            result = None
+            crashed = cancelled = False
+            started = time.time()
+            try:
+                if worker.driver is None:
+                    worker.start()
+                elif worker.needs_recycle():
+                    worker.restart()
+                    worker.recycled += 1
+                    self.stats['recycled'] += 1
+                started = worker.busy_since = time.time()
+                result = handler(worker, item)
+            except Cancelled:
+                cancelled = True
+            except Exception:
+                crashed = True
+            finally:
+                worker.busy_since = None
+                worker.race = None
+                self.tasks.done(lane)
+            won = not (crashed or cancelled or worker.killed) and race.claim(worker)
+            race.leave(worker)
+
+            if crashed or worker.killed:
+                self.stats['crashed'] += 1
+                try:
+                    worker.stop()
+                except Exception:
+                    pass
+                if self._stop.is_set():
+                    break
+                with race.lock:
+                    if race.winner is worker:
+                        # Claimed, then crashed (e.g. mid-download): nothing was delivered, so give
+                        # the item up; the copies the claim cancelled will not finish it either
+                        race.winner = None
+                    running = any(not other.cancelled for other in race.workers)
+                    # Another copy of the item is still running, waiting (a hedge) or already won
+                    pending = running or race.queued or race.winner is not None
+                    requeue = not pending and attempts < MAX_REQUEUES
+                    if requeue:
+                        race.queued += 1
+                if requeue:
+                    self.stats['requeued'] += 1
+                    self.tasks.put((item, attempts + 1, future, handler, race), lane)
+                elif not pending and race.claim(worker):
+                    self.stats['abandoned'] += 1
+                    self._deliver(race, None)
+                if worker.driver is None:
+                    time.sleep(RESTART_BACKOFF if attempts else 0)
+                continue
+
+            if won:
+                self.durations.append(time.time() - started)
+                if lane == HEDGE:
+                    self.stats['hedge_won'] += 1
+                self._deliver(race, result)
+            else:
+                self.stats['cancelled'] += 1  # Lost to a hedged copy; its result is dropped
+                worker.warm = False
+            if self.rewarm and not worker.warm and not self._stop.is_set():
+                try:
+                    worker.warmup(worker.driver)
+                    worker.warm = True
+                except Exception:
+                    pass  # The next item will navigate itself
+            if self.delay:
+                time.sleep(self.delay)
+
+    def _deliver(self, race, result):
+        with race.lock:
+            if race.delivered:
+                return
+            race.delivered = True
+        self.stats['finished'] += 1
+        if race.future is not None:
+            race.future.set_result(result)
+        else:
+            self.results.put((race.item, result))
+
+    def _watchdog(self):
+        while not self._stop.wait(1):
+            for worker in self.workers:
+                started = worker.busy_since
+                if started and not worker.killed and time.time() - started > self.watchdog_timeout:
+                    self.stats['hung'] += 1
+                    worker.killed = True
+                    worker.kill()
+            if self.hedge:
+                self._hedge()
+
+    def hedge_threshold(self):
+        """Seconds after which a running item is hedged, or None while there are too few samples"""
+        durations = sorted(self.durations)
+        if len(durations) < HEDGE_MIN_SAMPLES:
+            return None
+        return durations[int(HEDGE_PERCENTILE * (len(durations) - 1))]
+
+    def _hedge(self):
+        """Queue a second copy of items running past the threshold, within the hedge budget"""
+        threshold = self.hedge_threshold()
+        if threshold is None:
+            return
+        now = time.time()
+        for worker in self.workers:
+            if self.stats['hedged'] + 1 > HEDGE_MAX_SHARE * self.stats['finished']:
+                return
+            race, started = worker.race, worker.busy_since
+            if race is None or started is None or now - started <= threshold:
+                continue
+            with race.lock:
+                if race.hedged or race.winner is not None:
+                    continue
+                race.hedged = True
+                race.queued += 1
+            self.stats['hedged'] += 1
+            self.tasks.put((race.item, 0, race.future, race.handler, race), HEDGE)
+
+    def start(self):
+        """Start worker threads and the watchdog (once)"""
+        with self._start_lock:
+            if self._threads:
+                return
+            for worker in self.workers:
+                thread = threading.Thread(target=self._work, args=(worker,), daemon=True,
+                                          name=f"browser-worker-{worker.worker_id}")
+                thread.start()
+                self._threads.append(thread)
+            watchdog = threading.Thread(target=self._watchdog, daemon=True, name="browser-watchdog")
+            watchdog.start()
+            self._threads.append(watchdog)
+
+    def submit(self, item, lane=INTERACTIVE, handler=None):
+        """Queue one item and return a Future of its result (starts the pool on first use)
+
+        `handler` replaces the pool's handler for this item, so a lookup
+        service can share the workers of a bulk run.
+        """
+        self.start()
+        future = Future()
+        self.tasks.put((item, 0, future, handler or self.handler, None), lane)
+        return future
+
+    def run(self, items):
+        """Process items in the bulk lane and yield (item, result) pairs as they complete"""
+        for item in items:
+            self.tasks.put((item, 0, None, self.handler, None), BULK)
+        pending = len(items)
+        self.start()
+        try:
+            while pending:
+                yield self.results.get()
+                pending -= 1
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        """Stop workers and close every browser"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        for worker in self.workers:
+            try:
+                worker.stop()
+            except Exception:
+                worker.kill()
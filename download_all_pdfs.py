@@ -2,326 +2,235 @@
 """
 Download all village map PDFs from Karnataka Land Records website
 This script will download ~18,323 PDFs organized by district/taluk/hobli
+
+Catalog, paths, progress and links come from the geodocs core library; the
+Selenium resolver and the transfer engine are only imported once main()
+has work to do (see geodocs/engines.py).
 """
 
-import json
+import argparse
+import importlib
 import os
+import sys
+import threading
 import time
-import requests
-from datetime import datetime, timedelta
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-import urllib.parse
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from browser_pool import WATCHDOG_TIMEOUT, BrowserPool, WorkerCrashed
+from map_pack import PACK_INDEX_FILE, load_pack_index
+from map_store import load_manifest, save_manifest, url_index, ingest_file, link_existing
+from geodocs import (
+    BASE_URL, DOWNLOAD_DIR, PROGRESS_FILE, PDF_LINKS_FILE, USE_BLOB_STORE,
+    load_catalog, iter_villages, sanitize_filename, village_filepath,
+    load_progress, save_progress, reconcile_progress,
+    load_pdf_links, save_pdf_link, save_pdf_links, load_validators, save_validators,
+    load_engine
+)
+from geodocs.negative_cache import RETRYABLE_REASONS, get_negative_cache, hobli_key, miss_reason
+from geodocs.profiling import add_profile_arguments, start_profile, finish_profile
+from geodocs.run_stats import ORDERS, RUN_STATS_FILE, EtaTracker, RunStats
+from geodocs.scheduler import BULK, INTERACTIVE
+from geodocs.timeouts import get_timeouts
 
-# Configuration
-BASE_URL = "https://landrecords.karnataka.gov.in/service3/"
-DOWNLOAD_DIR = "village_maps"
-PROGRESS_FILE = "download_progress.json"
-PDF_LINKS_FILE = "all_pdf_links.json"  # File to store all PDF URLs
+# Configuration (browser settings live in geodocs/resolver_selenium.py)
 MAX_RETRIES = 3
+RETRY_DELAY = 2  # Seconds between attempts of one village
+TRANSFER_BUDGET = 120  # Seconds one PDF transfer attempt is allowed when sizing the watchdog
 DELAY_BETWEEN_REQUESTS = 1  # seconds between downloads (reduced for speed)
-HEADLESS = False  # Set to False to see browser (popups work better in non-headless)
+BROWSER_WORKERS = 1  # Parallel browsers (each supervised by browser_pool.py)
+BULK_WORKER_SHARE = 0.75  # With --serve: share of the browsers the bulk crawl may occupy (the rest stay free for lookups)
+PORTAL_RATE = None  # Villages started per second across all browsers (None: no limit beyond the delay)
+BULK_RATE_SHARE = 1.0  # Share of PORTAL_RATE the bulk crawl may use
+HEDGE_STRAGGLERS = True  # Start a second copy of villages running past the live p95 (needs 2+ browsers)
+QUEUE_ORDER = "catalog"  # "catalog", "cost" (cheapest hoblis first) or "value" (most maps per hour first), from run_stats.sqlite
+RESOLVER_ENGINE = "selenium"  # "selenium": drive Chrome; "http": cached ASP.NET postbacks, no browser
+TRANSFER_ENGINE = "http"  # "http": requests session with the browser's cookies; "cdp": through the browser itself
 
-def setup_driver():
-    """Setup Chrome driver with options"""
-    chrome_options = Options()
-    if HEADLESS:
-        chrome_options.add_argument('--headless')
-    chrome_options.add_argument('--no-sandbox')
-    chrome_options.add_argument('--disable-dev-shm-usage')
-    chrome_options.add_argument('--disable-gpu')
-    chrome_options.add_argument('--window-size=1920,1080')
-    
-    # Set download preferences
-    prefs = {
-        "download.default_directory": os.path.abspath(DOWNLOAD_DIR),
-        "download.prompt_for_download": False,
-        "download.directory_upgrade": True,
-        "plugins.always_open_pdf_externally": True
-    }
-    chrome_options.add_experimental_option("prefs", prefs)
-    
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-    return driver
+# Engine functions that older scripts import from this module; resolved on
+# first access so importing download_all_pdfs stays free of Selenium
+_LAZY_EXPORTS = {
+    'setup_driver': 'geodocs.resolver_selenium',
+    'warm_up_driver': 'geodocs.resolver_selenium',
+    'get_pdf_url_from_page': 'geodocs.resolver_selenium',
+    'download_pdf': 'geodocs.transfer_http',
+    'write_pdf': 'geodocs.transfer_http',
+    'validators_from_response': 'geodocs.transfer_http',
+    'create_download_session': 'geodocs.transfer_http',
+    'sync_session_cookies': 'geodocs.transfer_http',
+    'fetch_pdf_via_cdp': 'geodocs.transfer_cdp',
+}
 
-def load_progress():
-    """Load download progress from file"""
-    if os.path.exists(PROGRESS_FILE):
-        with open(PROGRESS_FILE, 'r') as f:
-            return json.load(f)
-    return {"downloaded": [], "failed": []}
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        return getattr(importlib.import_module(_LAZY_EXPORTS[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-def save_progress(progress):
-    """Save download progress to file"""
-    with open(PROGRESS_FILE, 'w') as f:
-        json.dump(progress, f, indent=2)
+def watchdog_timeout(resolver):
+    """Seconds a village may run before its browser is killed: every attempt of process_village at full length"""
+    attempts = MAX_RETRIES * (resolver.resolve_budget() + TRANSFER_BUDGET)
+    return max(WATCHDOG_TIMEOUT, attempts + 2 * (MAX_RETRIES - 1) * RETRY_DELAY)
 
-def load_pdf_links():
-    """Load existing PDF links from file"""
-    if os.path.exists(PDF_LINKS_FILE):
-        with open(PDF_LINKS_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
+def process_village(worker, item, known_urls, resolver, transfer, http, negative=None, mapped_hoblis=()):
+    """Resolve and download one village on a pool worker's browser
 
-def save_pdf_link(pdf_links, district, taluk, hobli, village, pdf_url):
-    """Save a PDF link to the JSON structure"""
-    district_name = district['label']
-    taluk_name = taluk['label']
-    hobli_name = hobli['label']
-    village_name = village['label']
+    Runs on the worker's thread; bookkeeping (progress, links, store) stays
+    with the caller. Returns a result dict with status 'downloaded', 'linked'
+    (same URL as a map already stored) or 'failed'. With a `negative` cache,
+    a village whose hobli (or itself) is known to have no map fails at once
+    with `cached` set, and a new "no map" answer is recorded there;
+    `mapped_hoblis` are hobli keys with a map, which are never cached as empty.
+    """
+    started = time.time()
+    district, taluk, hobli, village = item['district'], item['taluk'], item['hobli'], item['village']
+    filepath = village_filepath(item)
+    result = {'id': item['id'], 'status': 'failed', 'pdf_url': None, 'validator': None,
+              'sha256': None, 'worker': worker.worker_id, 'elapsed': 0.0, 'commands': 0,
+              'reason': None, 'cached': False, 'resolve': 0.0, 'download': 0.0, 'stages': {}}
     
-    # Initialize structure if needed
-    if district_name not in pdf_links:
-        pdf_links[district_name] = {}
-    if taluk_name not in pdf_links[district_name]:
-        pdf_links[district_name][taluk_name] = {}
-    if hobli_name not in pdf_links[district_name][taluk_name]:
-        pdf_links[district_name][taluk_name][hobli_name] = {}
+    # Another village of the same hobli may have just found it empty
+    cached = negative.lookup(item) if negative is not None else None
+    if cached:
+        result.update(reason=cached[1]['reason'], cached=True)
+        return result
+    counts = getattr(worker.driver, 'command_counts', None)
+    commands_before = sum(counts.values()) if counts is not None else 0
+    stage_seconds = getattr(worker.driver, 'stage_seconds', None)
+    stages_before = dict(stage_seconds) if stage_seconds is not None else {}
     
-    # Save the link
-    pdf_links[district_name][taluk_name][hobli_name][village_name] = {
-        'url': pdf_url,
-        'district_value': district['value'],
-        'taluk_value': taluk['value'],
-        'hobli_value': hobli['value'],
-        'village_value': village['value'],
-        'timestamp': datetime.now().isoformat()
-    }
-
-def save_pdf_links(pdf_links):
-    """Save PDF links to file"""
-    with open(PDF_LINKS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(pdf_links, f, indent=2, ensure_ascii=False)
-
-def get_pdf_url_from_page(driver, district, taluk, hobli, village, debug=False):
-    """Navigate to page, fill form, and extract PDF URL - using exact flow from test_website_flow.py"""
-    try:
-        if debug:
-            print(f"      [DEBUG] Starting PDF URL extraction for {village}")
-        # Navigate to the page
-        driver.get(BASE_URL)
-        time.sleep(1)  # Minimal wait
-        
-        # Fill district - EXACT from test script
-        district_select = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.NAME, "ddl_district"))
+    # Get PDF URL
+    pdf_url = None
+    reason = None
+    for retry in range(MAX_RETRIES):
+        worker.check()
+        pdf_url = resolver.get_pdf_url_from_page(
+            worker.driver,
+            district['value'],
+            taluk['value'],
+            hobli['value'],
+            village['label'],
+            skip_navigation=worker.warm
         )
-        driver.execute_script(f"arguments[0].value = '{district}';", district_select)
-        driver.execute_script("arguments[0].dispatchEvent(new Event('change', {bubbles: true}));", district_select)
-        time.sleep(0.5)  # Minimal wait - dropdowns are quick
-        
-        # Fill taluk
-        taluk_select = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.NAME, "ddl_taluk"))
-        )
-        # Wait for taluk options to load - minimal wait
-        time.sleep(0.5)  # Minimal wait
-        options = taluk_select.find_elements(By.TAG_NAME, 'option')
-        valid_options = [opt for opt in options if opt.get_attribute('value')]
-        if len(valid_options) <= 1:
-            return None  # No valid options
-        driver.execute_script(f"arguments[0].value = '{taluk}';", taluk_select)
-        driver.execute_script("arguments[0].dispatchEvent(new Event('change', {bubbles: true}));", taluk_select)
-        time.sleep(0.5)  # Minimal wait - dropdowns are quick
-        
-        # Fill hobli
-        hobli_select = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.NAME, "ddl_hobli"))
-        )
-        # Wait for hobli options to load - minimal wait
-        time.sleep(0.5)  # Minimal wait
-        options = hobli_select.find_elements(By.TAG_NAME, 'option')
-        valid_options = [opt for opt in options if opt.get_attribute('value')]
-        if len(valid_options) <= 1:
-            return None  # No valid options
-        driver.execute_script(f"arguments[0].value = '{hobli}';", hobli_select)
-        time.sleep(0.3)  # Minimal wait
-        
-        # Fill village
-        village_input = driver.find_element(By.NAME, "txtVlgName")
-        village_input.clear()
-        village_input.send_keys(village)
-        driver.execute_script("arguments[0].dispatchEvent(new Event('input', {bubbles: true}));", village_input)
-        driver.execute_script("arguments[0].dispatchEvent(new Event('change', {bubbles: true}));", village_input)
-        time.sleep(0.3)  # Minimal wait
-        
-        # Click search button
-        search_btn = driver.find_element(By.NAME, "btnSearch")
-        search_btn.click()
-        time.sleep(2)  # Minimal wait for results
-        
-        # Wait for grid to appear
-        try:
-            grid_table = WebDriverWait(driver, 15).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "table[id*='grdMaps'], table[id*='Grid']"))
-            )
-            # Minimal wait for grid to render
-            time.sleep(1)
-        except TimeoutException:
-            return None
-        
-        # Now try to find PDF button - EXACT from test script
-        pdf_img = None
-        try:
-            pdf_img = driver.find_element(By.ID, "grdMaps_ImgPdf_0")
-        except NoSuchElementException:
-            try:
-                pdf_img = driver.find_element(By.CSS_SELECTOR, "img[id*='grdMaps_ImgPdf']")
-            except NoSuchElementException:
-                try:
-                    pdf_img = grid_table.find_element(By.CSS_SELECTOR, "img[id*='ImgPdf']")
-                except NoSuchElementException:
-                    return None
-        
-        if not pdf_img:
-            return None
-        
-        # Get onclick attribute (might be empty if it opens popup)
-        onclick = pdf_img.get_attribute('onclick') or ''
-        
-        # If onclick exists, try to extract URL from it first
-        if onclick:
-            import re
-            # Pattern 1: FileDownload.aspx?file=... (most common)
-            fileDownloadMatch = re.search(r"FileDownload\.aspx[^'\"\s]*file=([^'\")\s&]+)", onclick, re.IGNORECASE)
-            if fileDownloadMatch:
-                file_param = fileDownloadMatch.group(1).strip("'\"")
-                pdf_url = f"{BASE_URL}FileDownload.aspx?file={file_param}"
-                return pdf_url
-            
-            # Pattern 2: Try other patterns
-            patterns = [
-                r"FileDownload\.aspx\?file=['\"]([^'\"]+)['\"]",
-                r"['\"]FileDownload\.aspx[^'\"]*file=([^'\")\s&]+)['\"]",
-            ]
-            
-            for pattern in patterns:
-                match = re.search(pattern, onclick, re.IGNORECASE)
-                if match:
-                    file_param = match.group(1).strip("'\"")
-                    pdf_url = f"{BASE_URL}FileDownload.aspx?file={file_param}"
-                    return pdf_url
-        
-        # If onclick is empty or extraction failed, click button and check for popup
-        # This handles the case where button opens a popup window
-        original_window = driver.current_window_handle
-        window_handles_before = driver.window_handles  # Use list, not set (EXACT from test)
-        
-        # Click the PDF button
-        try:
-            driver.execute_script("arguments[0].click();", pdf_img)
-            time.sleep(1)  # Minimal wait for popup
-        except:
-            pdf_img.click()
-            time.sleep(1)  # Minimal wait for popup
-        
-        # Check for new window/popup - EXACT from test script
-        window_handles_after = driver.window_handles
-        new_windows = [w for w in window_handles_after if w not in window_handles_before]
-        
-        if new_windows:
-            # Switch to popup - EXACT from test script
-            driver.switch_to.window(new_windows[0])
-            popup_url = driver.current_url
-            
-            # Extract PDF URL from popup - EXACT from test script
-            if 'FileDownload.aspx' in popup_url:
-                pdf_url = popup_url
-                # Close popup and switch back - EXACT from test script
-                driver.close()
-                driver.switch_to.window(original_window)
-                return pdf_url
-            else:
-                driver.close()
-                driver.switch_to.window(original_window)
-        else:
-            # No popup, check current URL - EXACT from test script
-            current_url = driver.current_url
-            if 'FileDownload.aspx' in current_url:
-                return current_url
-        
-        return None
-            
-    except Exception as e:
-        return None
+        reason = miss_reason(worker.driver)
+        worker.warm = False
+        worker.pages += 1
+        if pdf_url:
+            break
+        if not worker.is_alive():
+            raise WorkerCrashed(f"browser of worker {worker.worker_id} died")
+        if reason is not None and reason not in RETRYABLE_REASONS:
+            break  # The portal answered "no map"; another pass would show the same
+        if retry < MAX_RETRIES - 1:
+            time.sleep(RETRY_DELAY)
     
-    return None
-
-def download_pdf(pdf_url, filepath):
-    """Download PDF from URL"""
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Referer': BASE_URL
-        }
-        response = requests.get(pdf_url, headers=headers, timeout=30, stream=True)
-        response.raise_for_status()
-        
-        # Check if it's actually a PDF
-        if 'application/pdf' in response.headers.get('content-type', ''):
-            os.makedirs(os.path.dirname(filepath), exist_ok=True)
-            with open(filepath, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-            return True
-        else:
-            return False
-    except Exception as e:
-        return False
+    if counts is not None:
+        result['commands'] = sum(counts.values()) - commands_before
+    if stage_seconds is not None:
+        result['stages'] = {stage: round(seconds - stages_before.get(stage, 0.0), 3)
+                            for stage, seconds in stage_seconds.items()
+                            if stage and seconds > stages_before.get(stage, 0.0)}
+    result['resolve'] = time.time() - started
+    
+    if not pdf_url:
+        result.update(reason=reason, elapsed=time.time() - started)
+        if negative is not None and reason:
+            negative.record(item, reason, hobli_has_maps=hobli_key(item) in mapped_hoblis)
+        return result
+    result['pdf_url'] = pdf_url
+    if negative is not None:
+        negative.clear(item)
+    
+    # A hedged copy on another browser may have got here first; only one downloads
+    worker.claim()
+    
+    # Another village already resolved to the same sheet: nothing to transfer
+    if pdf_url in known_urls:
+        result.update(status='linked', sha256=known_urls[pdf_url], elapsed=time.time() - started)
+        return result
+    
+    # The URL may be tied to the browser's ASP.NET session
+    http.sync_session_cookies(worker.session, worker.driver)
+    
+    # Download PDF
+    for retry in range(MAX_RETRIES):
+        worker.check()
+        validator = {}
+        success = transfer.fetch_pdf(pdf_url, filepath, validators=validator,
+                                     session=worker.session, driver=worker.driver)
+        if success:
+            result.update(status='downloaded', validator=validator)
+            break
+        if retry < MAX_RETRIES - 1:
+            time.sleep(RETRY_DELAY)
+    
+    result['elapsed'] = time.time() - started
+    result['download'] = result['elapsed'] - result['resolve']
+    return result
 
-def sanitize_filename(name):
-    """Sanitize filename to remove invalid characters"""
-    invalid_chars = '<>:"/\\|?*'
-    for char in invalid_chars:
-        name = name.replace(char, '_')
-    return name.strip()
+def main(serve_port=None, order=QUEUE_ORDER):
+    """Main function to download all PDFs
 
-def main():
-    """Main function to download all PDFs"""
+    With `serve_port`, the resolver service (resolver_service.py) runs on the
+    same browsers: its lookups take the interactive lane, ahead of the crawl.
+    `order` is the queue order (see QUEUE_ORDER).
+    """
     print("🚀 Starting PDF download process...")
     print(f"📁 Download directory: {os.path.abspath(DOWNLOAD_DIR)}")
     
     # Load data
     print("📖 Loading location data...")
-    with open('complete-karnataka-data-filtered.json', 'r') as f:
-        data = json.load(f)
+    data = load_catalog()
     
-    # Load progress
+    # Load progress and reconcile it with what is actually on disk
     progress = load_progress()
+    print("🔎 Scanning downloaded maps...")
+    packed = []
+    if os.path.exists(PACK_INDEX_FILE):
+        packed = load_pack_index()['villages'].keys()
+    added, removed = reconcile_progress(data, progress, also_present=packed)
+    if added or removed:
+        print(f"   ➕ {added} found on disk, ➖ {removed} missing from disk")
+        save_progress(progress)
     downloaded_set = set(progress.get("downloaded", []))
     failed_set = set(progress.get("failed", []))
     
-    # Load PDF links
+    # Villages and hoblis known to have no map (per-reason expiry)
+    negative = get_negative_cache()
+    
+    # Load PDF links and HTTP validators
     pdf_links = load_pdf_links()
+    validators = load_validators()
+    
+    # Content-addressed store: identical maps are stored and transferred once
+    if USE_BLOB_STORE:
+        manifest = load_manifest()
+        known_urls = url_index(manifest)
     
     # Count total villages
     total_villages = 0
     village_list = []
-    for district in data:
-        for taluk in district.get('taluks', []):
-            for hobli in taluk.get('hoblis', []):
-                for village in hobli.get('villages', []):
-                    village_id = f"{district['value']}_{taluk['value']}_{hobli['value']}_{village['value']}"
-                    if village_id not in downloaded_set and village_id not in failed_set:
-                        village_list.append({
-                            'id': village_id,
-                            'district': district,
-                            'taluk': taluk,
-                            'hobli': hobli,
-                            'village': village
-                        })
-                    total_villages += 1
+    mapped_hoblis = set()  # Hoblis with at least one map are never cached as empty
+    retry_expired = 0
+    known_empty = 0
+    for item in iter_villages(data):
+        if item['id'] in downloaded_set:
+            mapped_hoblis.add(hobli_key(item))
+        elif item['id'] in failed_set and negative.expired(item):
+            failed_set.discard(item['id'])  # Its "no map" answer expired: try again
+            retry_expired += 1
+        if item['id'] not in downloaded_set and item['id'] not in failed_set:
+            if negative.lookup(item):
+                failed_set.add(item['id'])
+                known_empty += 1
+            else:
+                village_list.append(item)
+        total_villages += 1
     
     print(f"📊 Total villages: {total_villages}")
     print(f"✅ Already downloaded: {len(downloaded_set)}")
     print(f"❌ Previously failed: {len(failed_set)}")
+    if retry_expired or known_empty:
+        print(f"🚫 Known to have no map: {known_empty} newly skipped, {retry_expired} retried (answer expired)")
     print(f"🔄 Remaining: {len(village_list)}")
     print()
     
@@ -329,12 +238,48 @@ def main():
         print("✨ All PDFs already downloaded!")
         return
     
-    # Setup driver
-    print("🌐 Setting up browser...")
-    driver = setup_driver()
+    # Expected cost of each village from earlier runs (geodocs/run_stats.py)
+    run_stats = RunStats()
+    estimator = run_stats.estimator()
+    village_list = estimator.order(village_list, order)
+    
+    # Engines are only imported now that there is work to do
+    resolver = load_engine('resolver', RESOLVER_ENGINE)
+    transfer = load_engine('transfer', TRANSFER_ENGINE)
+    http = load_engine('transfer', 'http')
+    
+    # Browser workers (each with its own supervised Chrome and download session);
+    # serving lookups needs a second browser the crawl never occupies
+    browsers = max(BROWSER_WORKERS, 2) if serve_port else BROWSER_WORKERS
+    print(f"🌐 Starting {browsers} browser worker(s)...")
+    
+    def handler(worker, item):
+        return process_village(worker, item, known_urls if USE_BLOB_STORE else {}, resolver, transfer, http,
+                               negative, mapped_hoblis)
+    
+    lanes = {BULK: {'workers': BULK_WORKER_SHARE if serve_port else 1.0, 'rate': BULK_RATE_SHARE}}
+    pool = BrowserPool(browsers, handler, resolver.setup_driver, http.create_download_session,
+                       delay=DELAY_BETWEEN_REQUESTS, warmup=resolver.warm_up_driver,
+                       rewarm=bool(serve_port), lanes=lanes, rate=PORTAL_RATE, hedge=HEDGE_STRAGGLERS,
+                       watchdog_timeout=watchdog_timeout(resolver))
+    bulk_workers = pool.tasks.lanes[BULK].limit  # Browsers the crawl itself may occupy
+    if estimator.measured:
+        expected = sum(estimator.cost(item) for item in village_list) / bulk_workers
+        print(f"📈 History: {estimator.measured} villages measured; about "
+              f"{str(timedelta(seconds=int(expected)))} of work left ({order} order)")
+    server = None
+    if serve_port:
+        from resolver_service import ResolverService, make_server
+        server = make_server(ResolverService(RESOLVER_ENGINE, pool=pool), port=serve_port, quiet=True)
+        threading.Thread(target=server.serve_forever, daemon=True, name="resolver-service").start()
+        print(f"📡 Serving lookups on http://localhost:{serve_port}/api/get-pdf-url (interactive lane)")
     
     downloaded_count = 0
     failed_count = 0
+    resolved_villages = 0
+    webdriver_commands = 0
+    run_id = run_stats.start_run(RESOLVER_ENGINE, browsers)
+    eta_tracker = EtaTracker(estimator, village_list, bulk_workers)
     start_time = time.time()
     
     # Progress tracking function
@@ -343,16 +288,11 @@ def main():
         elapsed = time.time() - start_t
         progress_pct = (current / total) * 100
         
-        # Calculate speed and ETA
+        # Calculate speed and ETA (expected cost of what is left, scaled by this run's pace)
+        eta = timedelta(seconds=int(eta_tracker.eta(elapsed)))
         if current > 0 and elapsed > 0:
-            avg_time_per_pdf = elapsed / current
-            remaining = total - current
-            eta_seconds = remaining * avg_time_per_pdf
-            eta = timedelta(seconds=int(eta_seconds))
             speed_per_min = (current / elapsed) * 60
         else:
-            avg_time_per_pdf = 0
-            eta = timedelta(seconds=0)
             speed_per_min = 0
         
         # Progress bar (50 chars)
@@ -376,91 +316,56 @@ def main():
         print("🚀 Starting download process...")
         print("="*80 + "\n")
         
-        for idx, item in enumerate(village_list, 1):
+        for idx, (item, result) in enumerate(pool.run(village_list), 1):
             village_id = item['id']
             district = item['district']
             taluk = item['taluk']
             hobli = item['hobli']
             village = item['village']
+            filepath = village_filepath(item)
             
-            # Create filepath
-            district_name = sanitize_filename(district['label'])
-            taluk_name = sanitize_filename(taluk['label'])
-            hobli_name = sanitize_filename(hobli['label'])
-            village_name = sanitize_filename(village['label'])
-            filepath = os.path.join(DOWNLOAD_DIR, district_name, taluk_name, hobli_name, f"{village_name}.pdf")
-            
-            # Show current item (truncate if too long)
-            current_item = f"{district_name} > {taluk_name} > {hobli_name} > {village_name}"
+            # Show finished item (truncate if too long)
+            current_item = " > ".join(sanitize_filename(x['label']) for x in (district, taluk, hobli, village))
             if len(current_item) > 70:
                 current_item = current_item[:67] + "..."
+            print(f"\n[{idx:5d}/{len(village_list)}] {current_item}")
             
-            # Print current item on new line every 10 items or first/last
-            if idx == 1 or idx % 10 == 0 or idx == len(village_list):
-                print(f"\n[{idx:5d}/{len(village_list)}] {current_item}")
+            eta_tracker.finished(village_id)
+            if result is None:
+                status = 'failed'
+                print("   💥 Browser crashed repeatedly on this village ❌ Failed")
             else:
-                print(f"\n[{idx:5d}/{len(village_list)}] {current_item}")
+                status = result['status']
+                if not result['cached']:
+                    run_stats.record(run_id, item, result)
+                if result['commands']:
+                    resolved_villages += 1
+                    webdriver_commands += result['commands']
+                if result['pdf_url']:
+                    # Save PDF link to JSON (even if download failed)
+                    save_pdf_link(pdf_links, district, taluk, hobli, village, result['pdf_url'])
+                if status in ('downloaded', 'linked'):
+                    mapped_hoblis.add(hobli_key(item))
+                if status == 'linked':
+                    # Another village already resolved to the same sheet
+                    link_existing(manifest, village_id, filepath, result['sha256'], result['pdf_url'])
+                    print(f"   🔗 Same map as an earlier village, linked (worker {result['worker']})")
+                elif status == 'downloaded':
+                    validators[village_id] = result['validator']
+                    if USE_BLOB_STORE:
+                        known_urls[result['pdf_url']] = ingest_file(manifest, village_id, filepath, result['pdf_url'])
+                    print(f"   ✅ Downloaded in {result['elapsed']:.1f}s (worker {result['worker']})")
+                elif result['cached']:
+                    print(f"   🚫 Skipped: known to have no map ({result['reason']})")
+                else:
+                    stage = "Getting PDF URL" if not result['pdf_url'] else "Downloading"
+                    reason = f" ({result['reason']})" if result['reason'] else ""
+                    print(f"   ❌ Failed: {stage}{reason} (worker {result['worker']})")
             
-            # Skip if already exists
-            if os.path.exists(filepath):
-                downloaded_set.add(village_id)
-                downloaded_count += 1
-                print_progress(idx, len(village_list), downloaded_count, failed_count, start_time)
-                if idx % 10 == 0:
-                    save_progress({"downloaded": list(downloaded_set), "failed": list(failed_set)})
-                continue
-            
-            # Get PDF URL
-            print("   🔍 Getting PDF URL...", end='', flush=True)
-            pdf_url = None
-            for retry in range(MAX_RETRIES):
-                # Enable debug for first retry to see what's happening
-                debug_mode = (retry == 0 and idx <= 3)  # Debug first 3 villages
-                pdf_url = get_pdf_url_from_page(
-                    driver,
-                    district['value'],
-                    taluk['value'],
-                    hobli['value'],
-                    village['label'],
-                    debug=debug_mode
-                )
-                if pdf_url:
-                    print(" ✅", end='', flush=True)
-                    break
-                if retry < MAX_RETRIES - 1:
-                    print(f" 🔄 Retry {retry + 1}...", end='', flush=True)
-                    time.sleep(2)
-            
-            if not pdf_url:
-                print(" ❌ Failed")
-                failed_set.add(village_id)
-                failed_count += 1
-                print_progress(idx, len(village_list), downloaded_count, failed_count, start_time)
-                if idx % 10 == 0:
-                    save_progress({"downloaded": list(downloaded_set), "failed": list(failed_set)})
-                    save_pdf_links(pdf_links)
-                continue
-            
-            # Save PDF link to JSON (even if download fails later)
-            save_pdf_link(pdf_links, district, taluk, hobli, village, pdf_url)
-            
-            # Download PDF
-            print(" ⬇️  Downloading...", end='', flush=True)
-            success = False
-            for retry in range(MAX_RETRIES):
-                success = download_pdf(pdf_url, filepath)
-                if success:
-                    print(" ✅", end='', flush=True)
-                    break
-                if retry < MAX_RETRIES - 1:
-                    print(f" 🔄 Retry {retry + 1}...", end='', flush=True)
-                    time.sleep(2)
-            
-            if success:
+            if status in ('downloaded', 'linked'):
                 downloaded_set.add(village_id)
                 downloaded_count += 1
             else:
-                print(" ❌ Failed")
                 failed_set.add(village_id)
                 failed_count += 1
             
@@ -471,18 +376,32 @@ def main():
             if idx % 10 == 0:
                 save_progress({"downloaded": list(downloaded_set), "failed": list(failed_set)})
                 save_pdf_links(pdf_links)
-            
-            # Delay between requests
-            if idx < len(village_list):
-                time.sleep(DELAY_BETWEEN_REQUESTS)
+                save_validators(validators)
+                if USE_BLOB_STORE:
+                    save_manifest(manifest)
+                get_timeouts().save()
+                negative.save()
+                run_stats.commit()
     
     except KeyboardInterrupt:
         print("\n\n⚠️  Interrupted by user. Saving progress...")
     finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+        pool.shutdown()
+        
         # Final save
         save_progress({"downloaded": list(downloaded_set), "failed": list(failed_set)})
         save_pdf_links(pdf_links)
-        driver.quit()
+        save_validators(validators)
+        if USE_BLOB_STORE:
+            save_manifest(manifest)
+        timeouts = get_timeouts()
+        timeouts.save()
+        negative.save()
+        run_stats.finish_run(run_id, downloaded_count + failed_count)
+        run_stats.close()
         
         total_time = time.time() - start_time
         total_time_str = str(timedelta(seconds=int(total_time))).split('.')[0]
@@ -499,11 +418,46 @@ def main():
             print(f"   📈 Average time per PDF: {avg_time:.1f} seconds")
             speed_per_min = (downloaded_count / total_time) * 60 if total_time > 0 else 0
             print(f"   🚀 Average speed: {speed_per_min:.1f} PDFs/minute")
+        if resolved_villages:
+            print(f"   🔁 Resolver round trips per village: {webdriver_commands / resolved_villages:.1f}")
+        learned = {step: s for step, s in timeouts.summary().items() if s['samples'] or s['expired']}
+        if learned:
+            print("   ⏲️  Step timeouts: " + " | ".join(
+                f"{step} {s['timeout']:.1f}s ({s['expired']} expired)" for step, s in learned.items()))
+        cached_misses = negative.summary()
+        if any(cached_misses.values()):
+            print("   🚫 Cached as no map: " + " | ".join(
+                f"{scope} " + ", ".join(f"{reason} {n}" for reason, n in sorted(counts.items()))
+                for scope, counts in cached_misses.items() if counts))
+        lane_stats = pool.tasks.stats()
+        if lane_stats[INTERACTIVE]['started']:
+            lookups = lane_stats[INTERACTIVE]
+            print(f"   📡 Lookups served on the pool: {lookups['started']} "
+                  f"(queued {lookups['wait_avg']:.1f}s on average, {lookups['wait_max']:.1f}s at most)")
+        if pool.stats['hedged']:
+            threshold = pool.hedge_threshold()
+            print(f"   🏁 Hedged stragglers: {pool.stats['hedged']} "
+                  f"({pool.stats['hedged'] / max(1, pool.stats['finished']) * 100:.1f}% of villages, "
+                  f"past {threshold or 0:.1f}s) | hedge finished first: {pool.stats['hedge_won']} | "
+                  f"copies cancelled: {pool.stats['cancelled']}")
+        print(f"   ♻️  Browsers recycled: {pool.stats['recycled']} | 💥 crashed: {pool.stats['crashed']} "
+              f"(hung: {pool.stats['hung']}) | 🔁 villages re-queued: {pool.stats['requeued']}")
         print(f"   💾 Progress saved to: {PROGRESS_FILE}")
         print(f"   🔗 PDF links saved to: {PDF_LINKS_FILE}")
+        print(f"   📈 Timings saved to: {RUN_STATS_FILE} (python -m geodocs.run_stats report)")
         print(f"   📊 Total PDF links collected: {sum(len(h) for d in pdf_links.values() for t in d.values() for h in t.values())}")
         print("="*80)
 
 if __name__ == "__main__":
-    main()
-
+    parser = argparse.ArgumentParser(description="Download every village map PDF")
+    parser.add_argument('--serve', type=int, metavar='PORT',
+                        help="Also answer /api/get-pdf-url on this port, ahead of the crawl")
+    parser.add_argument('--order', choices=ORDERS, default=QUEUE_ORDER,
+                        help="Queue order: catalog, cost (cheapest hoblis first) or value (most maps per hour first)")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    profiler = start_profile(args)
+    try:
+        main(serve_port=args.serve, order=args.order)
+    finally:
+        finish_profile(profiler, args.profile)
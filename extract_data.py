@@ -10,10 +10,18 @@ This script will:
 
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
+import argparse
 import json
+import os
+import sys
 import time
 from datetime import datetime
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from geodocs import BASE_URL
+from geodocs.profiling import add_profile_arguments, start_profile, finish_profile
+from geodocs.resolver_selenium import count_commands
+
 try:
     from webdriver_manager.chrome import ChromeDriverManager
     USE_WEBDRIVER_MANAGER = True
@@ -39,6 +47,7 @@ def setup_driver():
         driver = webdriver.Chrome(options=options)
     
     driver.implicitly_wait(2)  # Ultra-fast implicit wait
+    count_commands(driver)  # Per-stage WebDriver command timings (see --profile)
     return driver
 
 def get_villages_from_table(driver):
@@ -236,7 +245,8 @@ def extract_all_data():
     
     try:
         print("Loading website...")
-        driver.get("https://landrecords.karnataka.gov.in/service3/")
+        driver.stage = 'districts'
+        driver.get(BASE_URL)
         time.sleep(0.5)  # Ultra-fast initial load
         
         # Get all districts using fast JavaScript
@@ -263,6 +273,7 @@ def extract_all_data():
             print(f"[{i}/{len(districts)}] Processing district: {district['label']} ({district['value']}) - ⏱️ {elapsed:.1f}s")
             
             # Select district using fast JavaScript
+            driver.stage = 'taluks'
             driver.execute_script(f"""
                 var select = document.querySelector('select[name="ddl_district"]');
                 select.value = '{district['value']}';
@@ -296,6 +307,7 @@ def extract_all_data():
                 print(f"    [{j}/{len(taluks)}] Processing taluk: {taluk['label']}")
                 
                 # Select taluk using fast JavaScript
+                driver.stage = 'hoblis'
                 driver.execute_script(f"""
                     var select = document.querySelector('select[name="ddl_taluk"]');
                     select.value = '{taluk['value']}';
@@ -329,6 +341,7 @@ def extract_all_data():
                     print(f"        [{k}/{len(hoblis)}] Processing hobli: {hobli['label']}")
                     
                     # Select hobli using fast JavaScript
+                    driver.stage = 'villages'
                     driver.execute_script(f"""
                         var select = document.querySelector('select[name="ddl_hobli"]');
                         select.value = '{hobli['value']}';
@@ -362,14 +375,80 @@ def extract_all_data():
     finally:
         driver.quit()
 
+def extract_all_data_http(use_cache=True):
+    """Same extraction with plain ASP.NET postbacks instead of a browser
+
+    Pages are cached by form state in .portal_cache.sqlite (shared with the
+    http resolver), so a re-crawl only sends requests for expired pages.
+    """
+    from geodocs.portal_html import select_options
+    from geodocs.resolver_http import PortalClient
+    
+    client = PortalClient(use_cache=use_cache)
+    try:
+        print("Loading website...")
+        districts = select_options(client.start_page(), 'ddl_district')
+        print(f"Found {len(districts)} districts\n")
+        start_time = datetime.now()
+        
+        all_data = []
+        for i, district in enumerate(districts, 1):
+            elapsed = (datetime.now() - start_time).total_seconds()
+            print(f"[{i}/{len(districts)}] Processing district: {district['label']} ({district['value']}) - ⏱️ {elapsed:.1f}s")
+            taluks = select_options(client.district_page(district['value']), 'ddl_taluk')
+            print(f"  Found {len(taluks)} taluks")
+            
+            district_data = {
+                "value": district['value'],
+                "label": district['label'],
+                "taluks": []
+            }
+            for j, taluk in enumerate(taluks, 1):
+                print(f"    [{j}/{len(taluks)}] Processing taluk: {taluk['label']}")
+                hoblis = select_options(client.taluk_page(district['value'], taluk['value']), 'ddl_hobli')
+                print(f"      Found {len(hoblis)} hoblis")
+                
+                taluk_data = {
+                    "value": taluk['value'],
+                    "label": taluk['label'],
+                    "hoblis": []
+                }
+                for k, hobli in enumerate(hoblis, 1):
+                    print(f"        [{k}/{len(hoblis)}] Processing hobli: {hobli['label']}")
+                    villages = client.villages(district['value'], taluk['value'], hobli['value'])
+                    if len(villages) > 0:
+                        print(f"          Found {len(villages)} total villages (across all pages)")
+                    taluk_data["hoblis"].append({
+                        "value": hobli['value'],
+                        "label": hobli['label'],
+                        "villages": [{"value": str(idx+1), "label": v} for idx, v in enumerate(villages)]
+                    })
+                district_data["taluks"].append(taluk_data)
+            all_data.append(district_data)
+        
+        if client.cache is not None:
+            print(f"\nResponse cache: {client.cache.hits} hits, {client.cache.misses} misses, "
+                  f"{sum(client.command_counts.values())} requests sent")
+        return all_data
+    finally:
+        client.quit()
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract districts, taluks, hoblis and villages from the portal")
+    parser.add_argument('--http', action='store_true',
+                        help="Use cached ASP.NET postbacks instead of a browser")
+    parser.add_argument('--no-cache', action='store_true', help="With --http, ignore the response cache")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    profiler = start_profile(args)
+    
     print("=" * 60)
     print("Karnataka Land Records Data Extraction")
     print("=" * 60)
     print()
     
     try:
-        data = extract_all_data()
+        data = extract_all_data_http(use_cache=not args.no_cache) if args.http else extract_all_data()
         
         # Save to JSON file
         output_file = "complete-karnataka-data.json"
@@ -392,4 +471,5 @@ if __name__ == "__main__":
         print(f"\nError: {e}")
         import traceback
         traceback.print_exc()
-
+    finally:
+        finish_profile(profiler, args.profile)
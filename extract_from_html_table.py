@@ -7,37 +7,69 @@ The website has a table (grdMaps) with all districts, taluks, hoblis, and villag
 import requests
 from bs4 import BeautifulSoup
 import json
+import os
+import sys
 from collections import defaultdict
 
-def extract_all_data_from_table():
-    """Extract all data from the grdMaps table in the HTML"""
-    
-    print("Fetching website HTML...")
-    url = "https://landrecords.karnataka.gov.in/service3/"
-    
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-    }
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from geodocs import BASE_URL
+from geodocs.portal_html import grid_rows, select_options
+
+def build_structure(data_structure, district_map):
+    """Convert district -> taluk -> hobli -> [villages] into the catalog format"""
+    all_data = []
     
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
+    for district_name, taluks in sorted(data_structure.items()):
+        district_value = district_map.get(district_name, '')
+        
+        district_data = {
+            'value': district_value,
+            'label': district_name,
+            'taluks': []
+        }
+        
+        for taluk_name, hoblis in sorted(taluks.items()):
+            taluk_data = {
+                'value': '',  # Will need to be filled from form submissions
+                'label': taluk_name,
+                'hoblis': []
+            }
+            
+            for hobli_name, villages in sorted(hoblis.items()):
+                hobli_data = {
+                    'value': '',  # Will need to be filled from form submissions
+                    'label': hobli_name,
+                    'villages': [{'value': str(i+1), 'label': v} for i, v in enumerate(sorted(villages))]
+                }
+                
+                taluk_data['hoblis'].append(hobli_data)
+            
+            district_data['taluks'].append(taluk_data)
+        
+        all_data.append(district_data)
     
-    print("Parsing HTML and extracting table data...")
-    soup = BeautifulSoup(response.content, 'html.parser')
+    return all_data
+
+def parse_table_html(html, verbose=False):
+    """Extract all data from the grdMaps table in a page's HTML (BeautifulSoup)"""
+    soup = BeautifulSoup(html, 'html.parser')
     
     # Find the table with id="grdMaps"
     table = soup.find('table', {'id': 'grdMaps'})
     
     if not table:
-        print("❌ Table not found!")
+        if verbose:
+            print("❌ Table not found!")
         return None
     
-    print("✅ Found data table!")
+    if verbose:
+        print("✅ Found data table!")
     
     # Extract all rows (skip header)
     rows = table.find_all('tr')[1:]  # Skip header row
     
-    print(f"Found {len(rows)} data rows")
+    if verbose:
+        print(f"Found {len(rows)} data rows")
     
     # Organize data by district -> taluk -> hobli -> villages
     data_structure = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
@@ -65,39 +97,43 @@ def extract_all_data_from_table():
                 if village_name not in data_structure[district_name][taluk_name][hobli_name]:
                     data_structure[district_name][taluk_name][hobli_name].append(village_name)
     
-    # Convert to final structure
-    all_data = []
+    return build_structure(data_structure, district_map)
+
+def parse_table_html_fast(html, verbose=False):
+    """Same result as parse_table_html, scanning the grid's label spans with regular expressions"""
+    if 'id="grdMaps"' not in html:
+        if verbose:
+            print("❌ Table not found!")
+        return None
     
-    for district_name, taluks in sorted(data_structure.items()):
-        district_value = district_map.get(district_name, '')
-        
-        district_data = {
-            'value': district_value,
-            'label': district_name,
-            'taluks': []
-        }
-        
-        for taluk_name, hoblis in sorted(taluks.items()):
-            taluk_data = {
-                'value': '',  # Will need to be filled from form submissions
-                'label': taluk_name,
-                'hoblis': []
-            }
-            
-            for hobli_name, villages in sorted(hoblis.items()):
-                hobli_data = {
-                    'value': '',  # Will need to be filled from form submissions
-                    'label': hobli_name,
-                    'villages': [{'value': str(i+1), 'label': v} for i, v in enumerate(sorted(villages))]
-                }
-                
-                taluk_data['hoblis'].append(hobli_data)
-            
-            district_data['taluks'].append(taluk_data)
-        
-        all_data.append(district_data)
+    rows = grid_rows(html)
+    if verbose:
+        print("✅ Found data table!")
+        print(f"Found {len(rows)} data rows")
     
-    return all_data
+    district_map = {option['label']: option['value'] for option in select_options(html, 'ddl_district')}
+    data_structure = defaultdict(lambda: defaultdict(lambda: defaultdict(dict)))
+    for row in rows:
+        if row.get('district') and row.get('taluk') and row.get('hobli') and row.get('village'):
+            # dict keys keep first-seen order and make the duplicate check O(1)
+            data_structure[row['district']][row['taluk']][row['hobli']][row['village']] = None
+    
+    return build_structure(data_structure, district_map)
+
+def extract_all_data_from_table():
+    """Extract all data from the grdMaps table in the HTML"""
+    
+    print("Fetching website HTML...")
+    
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+    }
+    
+    response = requests.get(BASE_URL, headers=headers)
+    response.raise_for_status()
+    
+    print("Parsing HTML and extracting table data...")
+    return parse_table_html(response.content, verbose=True)
 
 if __name__ == "__main__":
     print("=" * 60)
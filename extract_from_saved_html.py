@@ -6,15 +6,9 @@ This parses the saved HTML file instead of scraping the live website
 
 from bs4 import BeautifulSoup
 import json
-import re
 
-def extract_data_from_html(html_file):
-    """Extract all districts, taluks, hoblis from saved HTML"""
-    
-    print(f"Reading HTML file: {html_file}")
-    with open(html_file, 'r', encoding='utf-8') as f:
-        html_content = f.read()
-    
+def parse_districts_html(html_content, verbose=False):
+    """Extract all districts from a page's HTML (taluks/hoblis are loaded dynamically)"""
     soup = BeautifulSoup(html_content, 'html.parser')
     
     # Extract districts
@@ -31,7 +25,8 @@ def extract_data_from_html(html_file):
                     'taluks': []
                 })
     
-    print(f"Found {len(districts)} districts")
+    if verbose:
+        print(f"Found {len(districts)} districts")
     
     # The HTML file might have JavaScript that populates taluks/hoblis
     # Or it might have data embedded in script tags
@@ -39,7 +34,6 @@ def extract_data_from_html(html_file):
     
     # Look for JavaScript variables or data structures
     scripts = soup.find_all('script')
-    data_found = False
     
     for script in scripts:
         if script.string:
@@ -49,10 +43,21 @@ def extract_data_from_html(html_file):
             # This is a fallback - the HTML might not have all data
             
             # Try to find any data structures
-            if 'district' in script_content.lower() or 'taluk' in script_content.lower():
+            if verbose and ('district' in script_content.lower() or 'taluk' in script_content.lower()):
                 print("Found potential data in JavaScript...")
                 # Could parse JavaScript here if needed
     
+    return districts
+
+def extract_data_from_html(html_file):
+    """Extract all districts, taluks, hoblis from saved HTML"""
+    
+    print(f"Reading HTML file: {html_file}")
+    with open(html_file, 'r', encoding='utf-8') as f:
+        html_content = f.read()
+    
+    districts = parse_districts_html(html_content, verbose=True)
+    
     # Since the saved HTML likely only has the initial page state,
     # we'll need to note that taluks/hoblis need to be fetched dynamically
     # But we can at least get the district structure
@@ -6,27 +6,15 @@ Simple script to extract HTML from the website and parse all data
 import requests
 from bs4 import BeautifulSoup
 import json
+import os
+import sys
 
-def extract_all_data_from_html():
-    """Extract all data from the website HTML"""
-    
-    print("Fetching website HTML...")
-    url = "https://landrecords.karnataka.gov.in/service3/"
-    
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    
-    print("Parsing HTML...")
-    soup = BeautifulSoup(response.content, 'html.parser')
-    
-    # Save raw HTML
-    with open('website-html.html', 'w', encoding='utf-8') as f:
-        f.write(response.text)
-    print("✅ Saved raw HTML to website-html.html")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from geodocs import BASE_URL
+
+def parse_page_html(html, verbose=False):
+    """Parse districts, candidate data scripts, hidden inputs and tables from a page's HTML"""
+    soup = BeautifulSoup(html, 'html.parser')
     
     # Extract districts
     district_select = soup.find('select', {'name': 'ddl_district'})
@@ -42,31 +30,63 @@ def extract_all_data_from_html():
                     'label': label
                 })
     
-    print(f"Found {len(districts)} districts in HTML")
+    if verbose:
+        print(f"Found {len(districts)} districts in HTML")
     
     # The HTML might have all the data embedded, let's check for any data structures
     # Look for script tags with data
-    scripts = soup.find_all('script')
-    data_found = False
-    
-    for script in scripts:
+    data_scripts = []
+    for script in soup.find_all('script'):
         if script.string:
             # Look for JSON data or arrays in scripts
             content = script.string
             if 'district' in content.lower() or 'taluk' in content.lower():
-                print("Found potential data in script tags")
-                # Save script content for inspection
-                with open('scripts-content.txt', 'w', encoding='utf-8') as f:
-                    f.write(content)
-                data_found = True
+                if verbose:
+                    print("Found potential data in script tags")
+                data_scripts.append(content)
     
     # Also check for hidden inputs or data attributes
     hidden_inputs = soup.find_all('input', type='hidden')
-    print(f"Found {len(hidden_inputs)} hidden inputs")
+    if verbose:
+        print(f"Found {len(hidden_inputs)} hidden inputs")
     
     # Look for any tables with data
     tables = soup.find_all('table')
-    print(f"Found {len(tables)} tables in HTML")
+    if verbose:
+        print(f"Found {len(tables)} tables in HTML")
+    
+    return {
+        'districts': districts,
+        'data_scripts': data_scripts,
+        'hidden_inputs': len(hidden_inputs),
+        'tables': len(tables)
+    }
+
+def extract_all_data_from_html():
+    """Extract all data from the website HTML"""
+    
+    print("Fetching website HTML...")
+    
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    }
+    
+    response = requests.get(BASE_URL, headers=headers)
+    response.raise_for_status()
+    
+    # Save raw HTML
+    with open('website-html.html', 'w', encoding='utf-8') as f:
+        f.write(response.text)
+    print("✅ Saved raw HTML to website-html.html")
+    
+    print("Parsing HTML...")
+    parsed = parse_page_html(response.content, verbose=True)
+    districts = parsed['districts']
+    
+    if parsed['data_scripts']:
+        # Save script content for inspection
+        with open('scripts-content.txt', 'w', encoding='utf-8') as f:
+            f.write(parsed['data_scripts'][-1])
     
     # Save districts data
     output = {
@@ -0,0 +1,17 @@
+"""
+Core library for the village map tools
+Catalog, paths, progress and link storage use only the standard library.
+Resolver (Selenium) and transfer (HTTP, CDP) engines are loaded lazily
+through geodocs.engines.load_engine().
+"""
+
+from .config import (
+    BASE_URL, DOWNLOAD_DIR, DATA_FILE, PROGRESS_FILE, PDF_LINKS_FILE, VALIDATORS_FILE, USE_BLOB_STORE
+)
+from .catalog import load_catalog, iter_villages
+from .paths import sanitize_filename, village_filepath
+from .progress import load_progress, save_progress, scan_downloaded_villages, reconcile_progress
+from .links import (
+    load_pdf_links, save_pdf_link, save_pdf_links, load_validators, save_validators
+)
+from .engines import load_engine, available_engines, register_engine
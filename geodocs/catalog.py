@@ -0,0 +1,26 @@
+"""
+District > taluk > hobli > village catalog
+"""
+
+import json
+
+from .config import DATA_FILE
+
+def load_catalog():
+    """Load the district > taluk > hobli > village catalog"""
+    with open(DATA_FILE, 'r') as f:
+        return json.load(f)
+
+def iter_villages(data):
+    """Yield one item per village with its id and full hierarchy"""
+    for district in data:
+        for taluk in district.get('taluks', []):
+            for hobli in taluk.get('hoblis', []):
+                for village in hobli.get('villages', []):
+                    yield {
+                        'id': f"{district['value']}_{taluk['value']}_{hobli['value']}_{village['value']}",
+                        'district': district,
+                        'taluk': taluk,
+                        'hobli': hobli,
+                        'village': village
+                    }
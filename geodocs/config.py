@@ -0,0 +1,38 @@
+"""
+Shared configuration for the village map tools
+"""
+
+import os
+
+PORTAL_URL = "https://landrecords.karnataka.gov.in/service3/"
+BASE_URL = os.environ.get("GEODOCS_BASE_URL", PORTAL_URL)  # Point at a cassette recorder/replayer
+DOWNLOAD_DIR = "village_maps"
+DATA_FILE = "complete-karnataka-data-filtered.json"
+PROGRESS_FILE = "download_progress.json"
+PDF_LINKS_FILE = "all_pdf_links.json"  # File to store all PDF URLs
+VALIDATORS_FILE = "map_validators.json"  # ETag / Last-Modified / Content-Length per village
+USE_BLOB_STORE = True  # Keep PDFs in the content-addressed store (map_store.py), hierarchy as links
+RECONCILE_WORKERS = 8  # Parallel district scans when rebuilding progress from disk
+NAME_INDEX_FILE = ".name_index.gz"  # Prebuilt trigram index of catalog names (see geodocs/name_index.py)
+TIMEOUTS_FILE = ".step_timeouts.json"  # Learned per-step wait timeouts (see geodocs/timeouts.py)
+HTTP_CACHE_FILE = ".portal_cache.sqlite"  # On-disk cache of portal pages, shared by resolver and crawler
+HTTP_CACHE_MAX_MB = 256  # Least recently used pages are evicted past this size
+RUN_STATS_FILE = "run_stats.sqlite"  # Per-village timings of every crawl (see geodocs/run_stats.py)
+NEGATIVE_CACHE_FILE = ".negative_cache.json"  # Villages / hoblis known to have no map (see geodocs/negative_cache.py)
+NEGATIVE_CACHE_TTL = {  # Seconds a "no map" answer is trusted, per reason
+    'no_taluks': 7 * 24 * 3600,  # District dropdown offered no taluks
+    'no_hoblis': 7 * 24 * 3600,  # Taluk dropdown offered no hoblis
+    'empty_grid': 3 * 24 * 3600,  # The hobli's results grid lists no maps
+    'no_map': 24 * 3600,  # The grid has maps, but none for this village
+    'no_url': 6 * 3600,  # A PDF button was found but gave no FileDownload URL
+    'grid_timeout': 3600,  # The grid never appeared (usually a slow portal)
+}
+HTTP_CACHE_TTL = {  # Seconds a cached page stays fresh, per form step
+    'start': 7 * 24 * 3600,
+    'district': 7 * 24 * 3600,
+    'taluk': 7 * 24 * 3600,
+    'hobli': 24 * 3600,
+    'grid': 24 * 3600,
+    'search': 24 * 3600,
+    'pdf': 24 * 3600,
+}
@@ -0,0 +1,39 @@
+"""
+Registry of resolver and transfer engines
+Engines are imported on first use, so tools that only need the core
+(catalog, paths, progress, links) never import Selenium or requests.
+
+A resolver engine provides setup_driver(), warm_up_driver(driver),
+get_pdf_url_from_page(driver, district, taluk, hobli, village, ...) and
+resolve_budget() (the longest one get_pdf_url_from_page call can take).
+A transfer engine provides fetch_pdf(pdf_url, filepath, validators, session, driver).
+"""
+
+import importlib
+
+ENGINES = {
+    'resolver': {
+        'selenium': 'geodocs.resolver_selenium',
+        'http': 'geodocs.resolver_http',
+    },
+    'transfer': {
+        'http': 'geodocs.transfer_http',
+        'cdp': 'geodocs.transfer_cdp',
+    },
+}
+
+def available_engines(kind):
+    """Names of the registered engines of one kind"""
+    return sorted(ENGINES.get(kind, {}))
+
+def register_engine(kind, name, module_path):
+    """Register an engine module (imported lazily by load_engine)"""
+    ENGINES.setdefault(kind, {})[name] = module_path
+
+def load_engine(kind, name):
+    """Import and return an engine module"""
+    try:
+        module_path = ENGINES[kind][name]
+    except KeyError:
+        raise ValueError(f"Unknown {kind} engine {name!r} (available: {', '.join(available_engines(kind))})")
+    return importlib.import_module(module_path)
@@ -0,0 +1,171 @@
+"""
+On-disk cache of portal responses keyed by normalized form state
+Pages are stored zlib-compressed in a SQLite file so the HTTP resolver, the
+crawler and separate processes can share them. Entries expire after a per-step
+TTL and the least recently used ones are evicted past a size limit.
+"""
+
+import argparse
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from .config import BASE_URL, HTTP_CACHE_FILE, HTTP_CACHE_MAX_MB, HTTP_CACHE_TTL
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    step TEXT NOT NULL,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+"""
+
+def normalize_value(value):
+    """Form values compare case- and whitespace-insensitively"""
+    return " ".join(str(value or '').split()).upper()
+
+def form_key(step, district='', taluk='', hobli='', village='', page=''):
+    """Cache key for the page a form step produces
+
+    Only the fields that define the page are part of the key, so the same
+    district/taluk/hobli selection maps to one entry whichever flow posted it.
+    """
+    parts = [BASE_URL, step, district, taluk, hobli, village, page]
+    return "|".join(normalize_value(p) for p in parts)
+
+class ResponseCache:
+    """SQLite-backed response cache with per-step TTL and LRU eviction"""
+
+    def __init__(self, path=HTTP_CACHE_FILE, max_mb=HTTP_CACHE_MAX_MB, ttl=None):
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.ttl = dict(HTTP_CACHE_TTL, **(ttl or {}))
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    def get(self, key):
+        """Cached body for a key, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT step, body, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            step, body, created = row
+            if now - created > self.ttl.get(step, 0):
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.hits += 1
+        return zlib.decompress(body).decode('utf-8')
+
+    def put(self, key, step, text):
+        """Store a body and evict least recently used entries past the size limit"""
+        body = zlib.compress(text.encode('utf-8'), 6)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, step, body, size, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, step, body, len(body), now, now)
+            )
+            self._evict()
+            self._db.commit()
+
+    def invalidate(self, key):
+        """Drop one entry (e.g. a page whose ViewState the server rejected)"""
+        with self._lock:
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+
+    def prune(self):
+        """Delete every expired entry; returns how many were removed"""
+        now = time.time()
+        removed = 0
+        with self._lock:
+            for step, ttl in self.ttl.items():
+                removed += self._db.execute(
+                    "DELETE FROM responses WHERE step = ? AND created < ?", (step, now - ttl)
+                ).rowcount
+            self._db.commit()
+        return removed
+
+    def clear(self):
+        """Delete every entry"""
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+        self._db.execute("VACUUM")
+
+    def stats(self):
+        """Entries and compressed bytes per step"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT step, COUNT(*), SUM(size) FROM responses GROUP BY step ORDER BY step"
+            ).fetchall()
+        return {step: {'entries': count, 'bytes': size} for step, count, size in rows}
+
+    def close(self):
+        """Close the database"""
+        with self._lock:
+            self._db.close()
+
+_shared = None
+_shared_lock = threading.Lock()
+
+def get_cache():
+    """Process-wide shared cache instance"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = ResponseCache()
+        return _shared
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Inspect or clear the portal response cache")
+    parser.add_argument('command', choices=['stats', 'prune', 'clear'])
+    args = parser.parse_args()
+
+    if not os.path.exists(HTTP_CACHE_FILE):
+        print(f"✨ No cache at {HTTP_CACHE_FILE}")
+        return
+    cache = ResponseCache()
+    if args.command == 'prune':
+        print(f"🧹 Removed {cache.prune()} expired pages")
+    elif args.command == 'clear':
+        cache.clear()
+        print(f"🧹 Cleared {HTTP_CACHE_FILE}")
+    stats = cache.stats()
+    print(f"📦 {HTTP_CACHE_FILE}: {sum(s['entries'] for s in stats.values())} pages, "
+          f"{sum(s['bytes'] for s in stats.values()) / 1024 / 1024:.1f} MB")
+    for step, s in stats.items():
+        print(f"   {step:<9} {s['entries']:6d} pages  {s['bytes'] / 1024:9.1f} KB")
+    cache.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Resolved PDF links and HTTP validators per village
+"""
+
+import json
+import os
+from datetime import datetime
+
+from .config import PDF_LINKS_FILE, VALIDATORS_FILE
+
+def load_pdf_links():
+    """Load existing PDF links from file"""
+    if os.path.exists(PDF_LINKS_FILE):
+        with open(PDF_LINKS_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+def save_pdf_link(pdf_links, district, taluk, hobli, village, pdf_url):
+    """Save a PDF link to the JSON structure"""
+    district_name = district['label']
+    taluk_name = taluk['label']
+    hobli_name = hobli['label']
+    village_name = village['label']
+    
+    # Initialize structure if needed
+    if district_name not in pdf_links:
+        pdf_links[district_name] = {}
+    if taluk_name not in pdf_links[district_name]:
+        pdf_links[district_name][taluk_name] = {}
+    if hobli_name not in pdf_links[district_name][taluk_name]:
+        pdf_links[district_name][taluk_name][hobli_name] = {}
+    
+    # Save the link
+    pdf_links[district_name][taluk_name][hobli_name][village_name] = {
+        'url': pdf_url,
+        'district_value': district['value'],
+        'taluk_value': taluk['value'],
+        'hobli_value': hobli['value'],
+        'village_value': village['value'],
+        'timestamp': datetime.now().isoformat()
+    }
+
+def save_pdf_links(pdf_links):
+    """Save PDF links to file"""
+    with open(PDF_LINKS_FILE, 'w', encoding='utf-8') as f:
+        json.dump(pdf_links, f, indent=2, ensure_ascii=False)
+
+def load_validators():
+    """Load stored HTTP validators (ETag, Last-Modified, Content-Length) per village"""
+    if os.path.exists(VALIDATORS_FILE):
+        with open(VALIDATORS_FILE, 'r') as f:
+            return json.load(f)
+    return {}
+
+def save_validators(validators):
+    """Save HTTP validators to file"""
+    with open(VALIDATORS_FILE, 'w') as f:
+        json.dump(validators, f, indent=2)
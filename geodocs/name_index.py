@@ -0,0 +1,296 @@
+"""
+Fuzzy search over village, hobli, taluk and district names
+Names are reduced to a phonetic key (transliteration variants such as
+CHINNAGUNDI / CHINAGUNDI or HUNASHEEKATTI / HUNASIKATTI collapse together)
+and indexed by trigrams. A query scores candidates by trigram overlap (Dice
+coefficient) from the posting lists, so no name is compared one by one. The
+index is prebuilt into NAME_INDEX_FILE and rebuilt when the catalog changes.
+"""
+
+import argparse
+import bisect
+import gzip
+import heapq
+import json
+import math
+import os
+import re
+import time
+from array import array
+from collections import Counter
+from itertools import chain
+
+from .catalog import load_catalog
+from .config import DATA_FILE, NAME_INDEX_FILE
+
+INDEX_VERSION = 1
+KINDS = ('district', 'taluk', 'hobli', 'village')
+MIN_SCORE = 0.3  # Candidates below this trigram similarity are not returned
+SEED_POSTINGS = 1000  # Rows of the shortest posting lists counted exactly before the bar is set
+SEED_ROWS = 300  # Best of those scored to set the bar
+SET_MIN = 256  # Posting lists at least this long are kept as sets for membership tests
+
+# Applied in order to the upper-cased letters of a name
+_PHONETIC_RULES = [
+    (re.compile(r'EE|IE|EA|Y$'), 'I'),
+    (re.compile(r'OO|OU'), 'U'),
+    (re.compile(r'([KGTDPB])H'), r'\1'),
+    (re.compile(r'SH'), 'S'),
+    (re.compile(r'W'), 'V'),
+    (re.compile(r'Z'), 'J'),
+    (re.compile(r'(.)\1+'), r'\1'),
+]
+_NON_LETTERS = re.compile(r'[^A-Z]+')
+
+def phonetic_key(name):
+    """Spelling-insensitive key of a transliterated name"""
+    key = _NON_LETTERS.sub('', str(name or '').upper())
+    for pattern, replacement in _PHONETIC_RULES:
+        key = pattern.sub(replacement, key)
+    return key
+
+def trigrams(key):
+    """Set of padded trigrams of a phonetic key"""
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class NameIndex:
+    """Trigram index over the catalog hierarchy
+
+    `entries` holds [kind, label, value, parent] rows (parent is the row of
+    the enclosing district/taluk/hobli, -1 for districts); `postings` maps a
+    trigram to the sorted rows that contain it.
+    """
+
+    def __init__(self, entries, postings, source=None, sizes=None):
+        self.entries = entries
+        self.postings = postings
+        self.source = source or {}
+        self.sizes = sizes or [len(trigrams(phonetic_key(e[1]))) for e in entries]  # Trigrams per entry
+        self.min_size = min(self.sizes, default=1)
+        # Rows are in catalog order, so everything under a row is the range row..ends[row]
+        self.values = []  # Dropdown values from the district down, per row
+        self.ends = list(range(1, len(entries) + 1))
+        for entry in entries:
+            parent = entry[3]
+            self.values.append((self.values[parent] if parent >= 0 else ()) + (str(entry[2]),))
+        for row in range(len(entries) - 1, -1, -1):
+            parent = entries[row][3]
+            if parent >= 0:
+                self.ends[parent] = max(self.ends[parent], self.ends[row])
+        self.rows = {values: row for row, values in enumerate(self.values)}
+        self._sets = {}
+
+    @classmethod
+    def build(cls, data=None):
+        """Index every name in the catalog"""
+        entries = []
+        for district in data if data is not None else load_catalog():
+            d = len(entries)
+            entries.append(['district', district['label'], district['value'], -1])
+            for taluk in district.get('taluks', []):
+                t = len(entries)
+                entries.append(['taluk', taluk['label'], taluk['value'], d])
+                for hobli in taluk.get('hoblis', []):
+                    h = len(entries)
+                    entries.append(['hobli', hobli['label'], hobli['value'], t])
+                    for village in hobli.get('villages', []):
+                        entries.append(['village', village['label'], village['value'], h])
+        postings = {}
+        for row, entry in enumerate(entries):
+            for gram in trigrams(phonetic_key(entry[1])):
+                postings.setdefault(gram, array('I')).append(row)
+        return cls(entries, postings, _source_signature())
+
+    def save(self, path=NAME_INDEX_FILE):
+        """Write the index: a JSON header line, then all posting lists as one uint32 array"""
+        grams = sorted(self.postings)
+        header = {'version': INDEX_VERSION, 'source': self.source, 'entries': self.entries,
+                  'sizes': self.sizes, 'trigrams': grams, 'lengths': [len(self.postings[g]) for g in grams]}
+        rows = array('I')
+        for gram in grams:
+            rows.extend(self.postings[gram])
+        tmp_path = path + '.part'
+        with gzip.open(tmp_path, 'wb', compresslevel=6) as f:
+            f.write(json.dumps(header, separators=(',', ':'), ensure_ascii=False).encode('utf-8') + b'\n')
+            f.write(rows.tobytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=NAME_INDEX_FILE):
+        """Read an index written by save()"""
+        with gzip.open(path, 'rb') as f:
+            header = json.loads(f.readline())
+            rows = array('I')
+            rows.frombytes(f.read())
+        if header.get('version') != INDEX_VERSION:
+            raise ValueError(f"{path} has index version {header.get('version')}, expected {INDEX_VERSION}")
+        postings = {}
+        start = 0
+        for gram, length in zip(header['trigrams'], header['lengths']):
+            postings[gram] = rows[start:start + length]
+            start += length
+        return cls(header['entries'], postings, header.get('source'), header.get('sizes'))
+
+    def path(self, row):
+        """Labels from the district down to an entry"""
+        labels = []
+        while row >= 0:
+            labels.append(self.entries[row][1])
+            row = self.entries[row][3]
+        return labels[::-1]
+
+    def _posting_set(self, gram):
+        found = self._sets.get(gram)
+        if found is None:
+            found = self._sets[gram] = frozenset(self.postings[gram])
+        return found
+
+    def _add_matches(self, counts, grams, lists):
+        """Add the trigrams of `grams` each row already in `counts` contains"""
+        for gram in grams:
+            if len(lists[gram]) >= SET_MIN:
+                counts.update(self._posting_set(gram).intersection(counts))
+            else:
+                counts.update(row for row in lists[gram] if row in counts)
+
+    def search(self, query, kinds=None, limit=10, within=None, min_score=MIN_SCORE):
+        """Ranked matches for a (mis)spelled name
+
+        `kinds` restricts the entry types, `within` is a list of dropdown
+        values (district, taluk, hobli) the matches must lie under. Each
+        result has kind, label, score, path (labels) and values; villages
+        also get their village_id.
+
+        `within` narrows every posting list to one row range by bisection.
+        Rows of the shortest lists are counted first and the best of them
+        scored; the limit-th best score is a bar every result must reach, so
+        only the lists a row reaching it must appear in are counted in full.
+        """
+        key = phonetic_key(query)
+        if not key:
+            return []
+        kinds = set(kinds or KINDS)
+        lists = {}
+        if within:
+            under = self.rows.get(tuple(str(v) for v in within))
+            if under is None:
+                return []
+            low, high = under, self.ends[under]
+            for gram in trigrams(key):
+                posting = self.postings.get(gram, ())
+                lists[gram] = posting[bisect.bisect_left(posting, low):bisect.bisect_left(posting, high)]
+        else:
+            lists = {gram: self.postings.get(gram, ()) for gram in trigrams(key)}
+        grams = sorted(lists, key=lambda gram: len(lists[gram]))
+        n = len(grams)
+
+        def score(row, common):
+            return 2 * common / (n + self.sizes[row]) if self.entries[row][0] in kinds else 0
+
+        # Rows of the shortest lists, counted exactly; the best of them set the bar
+        seed = Counter()
+        counted = 0
+        while counted < n and (not counted or len(seed) + len(lists[grams[counted]]) <= SEED_POSTINGS):
+            seed.update(lists[grams[counted]])
+            counted += 1
+        self._add_matches(seed, grams[counted:], lists)
+        bar = min_score
+        best = seed.most_common()[:SEED_ROWS]
+        if len(best) >= limit:
+            bar = max(bar, heapq.nlargest(limit, (score(row, common) for row, common in best))[-1])
+
+        # A row reaching the bar has at least `smallest` trigrams and shares `needed`
+        # of the query's, so it is in one of the n - needed + 1 shortest lists
+        smallest = max(self.min_size, math.ceil(bar * n / (2 - bar) - 1e-9))
+        needed = max(1, math.ceil(bar * (n + smallest) / 2 - 1e-9))
+        if needed > n:
+            return []
+        prefix = n - needed + 1
+        if prefix <= counted:
+            counts = seed
+        else:
+            counts = Counter(chain.from_iterable(lists[gram] for gram in grams[:prefix]))
+            self._add_matches(counts, grams[prefix:], lists)
+
+        top = []  # Heap of the best (score, row) so far
+        for row, common in counts.most_common():
+            # No entry sharing `common` trigrams can score above this
+            bound = 2 * common / (n + common)
+            if common < needed or (len(top) >= limit and bound < top[0][0]):
+                break
+            value = score(row, common)
+            if value < bar:
+                continue
+            if len(top) < limit:
+                heapq.heappush(top, (value, row))
+            elif value > top[0][0]:
+                heapq.heapreplace(top, (value, row))
+        results = []
+        for value, row in sorted(top, key=lambda s: (-s[0], len(self.entries[s[1]][1]))):
+            entry = self.entries[row]
+            values = list(self.values[row])
+            result = {'kind': entry[0], 'label': entry[1], 'score': round(value, 3),
+                      'path': self.path(row), 'values': values}
+            if entry[0] == 'village':
+                result['village_id'] = "_".join(values)
+            results.append(result)
+        return results
+
+def _source_signature():
+    try:
+        stat = os.stat(DATA_FILE)
+    except OSError:
+        return {}
+    return {'file': DATA_FILE, 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+_shared = None
+
+def load_index(path=NAME_INDEX_FILE):
+    """The prebuilt index, rebuilt (and saved) if missing or older than the catalog"""
+    global _shared
+    if _shared is not None:
+        return _shared
+    index = None
+    if os.path.exists(path):
+        try:
+            index = NameIndex.load(path)
+        except (OSError, ValueError):
+            index = None
+    if index is None or index.source != _source_signature():
+        index = NameIndex.build()
+        index.save(path)
+    _shared = index
+    return index
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Fuzzy search over catalog names")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('build', help=f"Rebuild {NAME_INDEX_FILE} from {DATA_FILE}")
+    query = sub.add_parser('search', help="Find names")
+    query.add_argument('name')
+    query.add_argument('--kind', choices=KINDS, action='append', help="Only these kinds (repeatable)")
+    query.add_argument('--within', help="Dropdown values to search under, e.g. 2 or 2/1/1")
+    query.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        started = time.time()
+        index = NameIndex.build()
+        index.save()
+        print(f"✅ Indexed {len(index.entries)} names, {len(index.postings)} trigrams in "
+              f"{time.time() - started:.1f}s -> {NAME_INDEX_FILE} ({os.path.getsize(NAME_INDEX_FILE) / 1024:.0f} KB)")
+        return
+
+    index = load_index()
+    started = time.perf_counter()
+    results = index.search(args.name, args.kind, args.limit, args.within.split('/') if args.within else None)
+    elapsed = (time.perf_counter() - started) * 1000
+    for r in results:
+        print(f"   {r['score']:.2f}  {r['kind']:<8} {' > '.join(r['path'])}"
+              + (f"  ({r['village_id']})" if 'village_id' in r else ''))
+    print(f"🔎 {len(results)} matches in {elapsed:.2f} ms")
+
+if __name__ == "__main__":
+    main()
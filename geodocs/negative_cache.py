@@ -0,0 +1,135 @@
+"""
+Negative-result cache for villages and hoblis without a map
+When a resolver gives up it names the reason in `driver.miss_reason`. Reasons
+that describe the whole hobli (its dropdowns are empty, or its grid lists no
+maps) are cached for the hobli, so every other village in it is skipped
+without a browser pass; the rest are cached for the village. Each reason
+expires after its NEGATIVE_CACHE_TTL, and the cache is saved to
+NEGATIVE_CACHE_FILE for later runs.
+"""
+
+import json
+import os
+import threading
+import time
+
+from .config import NEGATIVE_CACHE_FILE, NEGATIVE_CACHE_TTL
+
+NO_TALUKS = 'no_taluks'
+NO_HOBLIS = 'no_hoblis'
+EMPTY_GRID = 'empty_grid'
+NO_MAP = 'no_map'
+NO_URL = 'no_url'
+GRID_TIMEOUT = 'grid_timeout'
+
+HOBLI_REASONS = {NO_TALUKS, NO_HOBLIS, EMPTY_GRID}  # Cached for the whole hobli
+RETRYABLE_REASONS = {GRID_TIMEOUT, NO_URL}  # Still worth the resolver's retries within a run
+
+def miss_reason(driver):
+    """Why the last get_pdf_url_from_page on this driver returned None (None: unknown / error)"""
+    return getattr(driver, 'miss_reason', None)
+
+def hobli_key(item):
+    """Cache key of a village's hobli"""
+    return "_".join(str(item[k]['value']) for k in ('district', 'taluk', 'hobli'))
+
+class NegativeCache:
+    """Per-village and per-hobli "no map" answers with per-reason expiry"""
+
+    def __init__(self, path=NEGATIVE_CACHE_FILE, ttls=None):
+        self.path = path
+        self.ttls = dict(NEGATIVE_CACHE_TTL, **(ttls or {}))
+        self.entries = {'villages': {}, 'hoblis': {}}  # key -> {'reason', 'until', 'village'}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """Read entries saved by earlier runs (expired ones are kept to mark villages due a retry)"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            for scope in self.entries:
+                self.entries[scope] = dict(saved.get(scope, {}))
+
+    def save(self):
+        """Write the cache (only if it changed)"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {scope: dict(entries) for scope, entries in self.entries.items()}
+            self._dirty = False
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def lookup(self, item):
+        """(scope, entry) of a live "no map" answer for a catalog village, or None"""
+        now = time.time()
+        with self._lock:
+            for scope, key in (('hoblis', hobli_key(item)), ('villages', item['id'])):
+                entry = self.entries[scope].get(key)
+                if entry is not None and entry['until'] > now:
+                    return scope, entry
+        return None
+
+    def expired(self, item):
+        """Whether a village has a cached answer that has run out (so it is due a retry)"""
+        now = time.time()
+        with self._lock:
+            return any(entry is not None and entry['until'] <= now
+                       for entry in (self.entries['hoblis'].get(hobli_key(item)),
+                                     self.entries['villages'].get(item['id'])))
+
+    def record(self, item, reason, hobli_has_maps=False):
+        """Remember why a village has no map; returns the scope it was cached for (None: not cacheable)
+
+        With `hobli_has_maps` (another village of the hobli has a map) a
+        hobli-wide reason is only cached for this village, as NO_MAP.
+        """
+        if reason in HOBLI_REASONS and hobli_has_maps:
+            reason = NO_MAP
+        ttl = self.ttls.get(reason)
+        if not ttl:
+            return None
+        scope, key = ('hoblis', hobli_key(item)) if reason in HOBLI_REASONS else ('villages', item['id'])
+        with self._lock:
+            self.entries[scope][key] = {'reason': reason, 'until': round(time.time() + ttl), 'village': item['id']}
+            self._dirty = True
+        return scope
+
+    def clear(self, item):
+        """Forget any answer for a village (and its hobli) once it resolved"""
+        with self._lock:
+            for scope, key in (('hoblis', hobli_key(item)), ('villages', item['id'])):
+                if self.entries[scope].pop(key, None) is not None:
+                    self._dirty = True
+
+    def summary(self):
+        """{'villages': {reason: count}, 'hoblis': {reason: count}} of live entries"""
+        now = time.time()
+        with self._lock:
+            counts = {}
+            for scope, entries in self.entries.items():
+                counts[scope] = {}
+                for entry in entries.values():
+                    if entry['until'] > now:
+                        counts[scope][entry['reason']] = counts[scope].get(entry['reason'], 0) + 1
+            return counts
+
+_shared = None
+_shared_lock = threading.Lock()
+
+def get_negative_cache():
+    """Process-wide shared negative cache"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = NegativeCache()
+        return _shared
@@ -0,0 +1,24 @@
+"""
+File names and on-disk locations of village maps
+"""
+
+import os
+
+from .config import DOWNLOAD_DIR
+
+def sanitize_filename(name):
+    """Sanitize filename to remove invalid characters"""
+    invalid_chars = '<>:"/\\|?*'
+    for char in invalid_chars:
+        name = name.replace(char, '_')
+    return name.strip()
+
+def village_filepath(item):
+    """Path of a village's PDF inside DOWNLOAD_DIR"""
+    return os.path.join(
+        DOWNLOAD_DIR,
+        sanitize_filename(item['district']['label']),
+        sanitize_filename(item['taluk']['label']),
+        sanitize_filename(item['hobli']['label']),
+        f"{sanitize_filename(item['village']['label'])}.pdf"
+    )
@@ -0,0 +1,68 @@
+"""
+Parsing helpers for portal pages (dropdowns, hidden form fields, results grid)
+Regular expressions over the raw HTML: no parser dependency, and fast enough
+for grids with tens of thousands of rows.
+"""
+
+import html
+import re
+
+PLACEHOLDER_VALUES = ('', '0', 'All', '--Select--')  # Dropdown entries that are not real choices
+
+_TAG_RE = re.compile(r'<(input|select)\b([^>]*)>', re.IGNORECASE)
+_ATTR_RE = re.compile(r'([\w:$.-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+_OPTION_RE = re.compile(r'<option\b([^>]*)>(.*?)</option>', re.IGNORECASE | re.DOTALL)
+_GRID_LABEL_RE = re.compile(r'id="grdMaps_lbl(Dist|Tal|Hob|Vil)_(\d+)"[^>]*>([^<]*)<')
+_PDF_BUTTON_RE = re.compile(r'<input\b([^>]*\bid="grdMaps_ImgPdf_(\d+)"[^>]*)>', re.IGNORECASE)
+
+def tag_attrs(attr_text):
+    """Attributes of one HTML tag as a dict (values unescaped)"""
+    return {m.group(1).lower(): html.unescape(m.group(2) if m.group(2) is not None else m.group(3))
+            for m in _ATTR_RE.finditer(attr_text)}
+
+def select_block(page, name):
+    """Inner HTML of a <select> by name"""
+    match = re.search(r'<select\b[^>]*name="%s"[^>]*>(.*?)</select>' % re.escape(name),
+                      page, re.IGNORECASE | re.DOTALL)
+    return match.group(1) if match else ''
+
+def select_options(page, name):
+    """Real choices of a dropdown as [{'value', 'label'}] (placeholders skipped)"""
+    options = []
+    for attrs, label in _OPTION_RE.findall(select_block(page, name)):
+        value = tag_attrs(attrs).get('value', '')
+        if value not in PLACEHOLDER_VALUES:
+            options.append({'value': value, 'label': html.unescape(label).strip()})
+    return options
+
+def form_fields(page):
+    """Field values a browser would submit from this page (hidden, text and select)"""
+    fields = {}
+    for tag, attr_text in _TAG_RE.findall(page):
+        attrs = tag_attrs(attr_text)
+        name = attrs.get('name')
+        if not name:
+            continue
+        if tag.lower() == 'select':
+            options = [tag_attrs(a) for a, _ in _OPTION_RE.findall(select_block(page, name))]
+            chosen = [o for o in options if 'selected' in o] or options[:1]
+            fields[name] = chosen[0].get('value', '') if chosen else ''
+        elif attrs.get('type', 'text').lower() in ('hidden', 'text'):
+            fields[name] = attrs.get('value', '')
+    return fields
+
+def grid_rows(page):
+    """Rows of the results grid as dicts with district/taluk/hobli/village labels and the PDF button name"""
+    rows = {}
+    keys = {'Dist': 'district', 'Tal': 'taluk', 'Hob': 'hobli', 'Vil': 'village'}
+    for column, row, text in _GRID_LABEL_RE.findall(page):
+        rows.setdefault(int(row), {})[keys[column]] = html.unescape(text).strip()
+    for attr_text, row in _PDF_BUTTON_RE.findall(page):
+        name = tag_attrs(attr_text).get('name')
+        if name:
+            rows.setdefault(int(row), {})['pdf_button'] = name
+    return [rows[i] for i in sorted(rows)]
+
+def has_grid_page(page, number):
+    """Whether the grid's pager links to page `number`"""
+    return f"Page${number}'" in page or f"Page${number}&#39;" in page
@@ -0,0 +1,204 @@
+"""
+Built-in profiling: a sampling profiler and per-stage WebDriver command timings
+The sampler snapshots every thread's Python stack at a fixed interval (no
+tracing overhead on the profiled code) and writes a speedscope file or
+collapsed stacks for flamegraph.pl. Resolver engines report each WebDriver
+command with record_command(); the totals are grouped by resolver stage.
+"""
+
+import json
+import linecache
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+DEFAULT_INTERVAL_MS = 5  # Sampling period
+IO_MODULES = ('/urllib3/', '/http/client.py', '/requests/', '/socket.py', '/ssl.py')
+WAIT_MODULES = ('/threading.py', '/queue.py', '/selectors.py', '/concurrent/futures/')
+
+_command_lock = threading.Lock()
+_command_stats = defaultdict(lambda: [0, 0.0])  # (stage, command) -> [count, seconds]
+
+def record_command(stage, command, seconds):
+    """Add one WebDriver command to the process-wide per-stage totals"""
+    with _command_lock:
+        entry = _command_stats[(stage or 'other', command)]
+        entry[0] += 1
+        entry[1] += seconds
+
+def command_stats():
+    """Per-stage command totals: {stage: {command: {'count', 'seconds'}}}"""
+    with _command_lock:
+        stats = defaultdict(dict)
+        for (stage, command), (count, seconds) in _command_stats.items():
+            stats[stage][command] = {'count': count, 'seconds': round(seconds, 4)}
+    return dict(stats)
+
+def print_command_stats():
+    """Print the per-stage WebDriver command table"""
+    stats = command_stats()
+    if not stats:
+        return
+    print("   🧭 WebDriver commands by stage:")
+    for stage, commands in sorted(stats.items(), key=lambda kv: -sum(c['seconds'] for c in kv[1].values())):
+        count = sum(c['count'] for c in commands.values())
+        seconds = sum(c['seconds'] for c in commands.values())
+        top = max(commands.items(), key=lambda kv: kv[1]['seconds'])[0]
+        print(f"      {stage:<10} {count:7d} commands  {seconds:9.1f}s  (mostly {top})")
+
+def _frame_label(code, lineno):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{lineno})"
+
+def classify(stack):
+    """Rough category of a sampled stack: webdriver I/O, http, sleep, wait or python"""
+    files = [code.co_filename.replace(os.sep, '/') for code, _ in stack]
+    leaf_code, leaf_line = stack[-1]
+    if any('/selenium/' in f for f in files):
+        return 'webdriver'
+    if any(m in f for f in files for m in IO_MODULES):
+        return 'http'
+    if 'sleep(' in linecache.getline(leaf_code.co_filename, leaf_line):
+        return 'sleep'
+    if any(m in files[-1] for m in WAIT_MODULES):
+        return 'wait'
+    return 'python'
+
+class SamplingProfiler:
+    """Sample all threads' stacks from a background thread
+
+    Sampling starts `start_after` seconds after start() and stops after
+    `duration` seconds (None: until stop()), so long runs can be profiled over
+    a window once they reach steady state.
+    """
+
+    def __init__(self, interval_ms=DEFAULT_INTERVAL_MS, start_after=0, duration=None):
+        self.interval = interval_ms / 1000
+        self.start_after = start_after
+        self.duration = duration
+        self.samples = defaultdict(Counter)  # thread name -> Counter of stacks
+        self.categories = Counter()
+        self.sampled_seconds = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start sampling in the background"""
+        self._thread = threading.Thread(target=self._run, daemon=True, name="sampling-profiler")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop sampling"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        if self._stop.wait(self.start_after):
+            return
+        own = threading.get_ident()
+        started = time.time()
+        while not self._stop.is_set():
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append((frame.f_code, frame.f_lineno))
+                    frame = frame.f_back
+                if not stack:
+                    continue
+                stack.reverse()
+                self.samples[names.get(ident, str(ident))][tuple(stack)] += 1
+                self.categories[classify(stack)] += 1
+            self.sampled_seconds = time.time() - started
+            if self.duration is not None and self.sampled_seconds >= self.duration:
+                break
+            self._stop.wait(self.interval)
+
+    def write_collapsed(self, path):
+        """Collapsed stacks ("thread;frame;frame count"), input for flamegraph.pl"""
+        with open(path, 'w') as f:
+            for thread, stacks in self.samples.items():
+                for stack, count in stacks.items():
+                    frames = ';'.join(_frame_label(code, line) for code, line in stack)
+                    f.write(f"{thread};{frames} {count}\n")
+
+    def write_speedscope(self, path):
+        """speedscope.app file with one sampled profile per thread"""
+        frames, frame_index, profiles = [], {}, []
+        for thread, stacks in self.samples.items():
+            samples, weights = [], []
+            for stack, count in stacks.items():
+                indexes = []
+                for code, line in stack:
+                    key = (code.co_name, code.co_filename, line)
+                    if key not in frame_index:
+                        frame_index[key] = len(frames)
+                        frames.append({'name': code.co_name, 'file': code.co_filename, 'line': line})
+                    indexes.append(frame_index[key])
+                samples.append(indexes)
+                weights.append(count * self.interval)
+            profiles.append({
+                'type': 'sampled', 'name': thread, 'unit': 'seconds',
+                'startValue': 0, 'endValue': sum(weights),
+                'samples': samples, 'weights': weights
+            })
+        with open(path, 'w') as f:
+            json.dump({
+                '$schema': 'https://www.speedscope.app/file-format-schema.json',
+                'shared': {'frames': frames},
+                'profiles': profiles,
+                'name': os.path.basename(path),
+                'exporter': 'geodocs.profiling'
+            }, f)
+
+    def write(self, path):
+        """Write speedscope JSON (*.json) or collapsed stacks (anything else)"""
+        if path.endswith('.json'):
+            self.write_speedscope(path)
+        else:
+            self.write_collapsed(path)
+
+    def print_summary(self):
+        """Print where the sampled time went"""
+        total = sum(self.categories.values())
+        if not total:
+            print("   🔬 No profile samples (window never opened?)")
+            return
+        parts = [f"{name} {count / total * 100:.0f}%" for name, count in self.categories.most_common()]
+        print(f"   🔬 Sampled {self.sampled_seconds:.0f}s: " + " | ".join(parts))
+
+def add_profile_arguments(parser):
+    """Add --profile and its window options to an argparse parser"""
+    group = parser.add_argument_group('profiling')
+    group.add_argument('--profile', metavar='FILE',
+                       help="Write a sampling profile: *.json for speedscope, otherwise collapsed stacks")
+    group.add_argument('--profile-start', type=float, default=0, metavar='SECONDS',
+                       help="Start sampling this long after launch")
+    group.add_argument('--profile-duration', type=float, metavar='SECONDS',
+                       help="Sample for this long (default: until exit)")
+    group.add_argument('--profile-interval', type=float, default=DEFAULT_INTERVAL_MS, metavar='MS',
+                       help=f"Sampling period (default: {DEFAULT_INTERVAL_MS} ms)")
+
+def start_profile(args):
+    """Start a profiler if --profile was given"""
+    if not getattr(args, 'profile', None):
+        return None
+    return SamplingProfiler(args.profile_interval, args.profile_start, args.profile_duration).start()
+
+def finish_profile(profiler, path):
+    """Stop the profiler and write the profile plus per-stage command totals"""
+    if profiler is None:
+        return
+    profiler.stop()
+    profiler.write(path)
+    stats_path = os.path.splitext(path)[0] + '.commands.json'
+    with open(stats_path, 'w') as f:
+        json.dump(command_stats(), f, indent=2)
+    profiler.print_summary()
+    print_command_stats()
+    print(f"   🔥 Profile written to {path} (command timings: {stats_path})")
@@ -0,0 +1,76 @@
+"""
+Download progress: which villages are downloaded or failed
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from .catalog import iter_villages
+from .config import DOWNLOAD_DIR, PROGRESS_FILE, RECONCILE_WORKERS
+from .paths import village_filepath
+
+def load_progress():
+    """Load download progress from file"""
+    if os.path.exists(PROGRESS_FILE):
+        with open(PROGRESS_FILE, 'r') as f:
+            return json.load(f)
+    return {"downloaded": [], "failed": []}
+
+def save_progress(progress):
+    """Save download progress to file"""
+    with open(PROGRESS_FILE, 'w') as f:
+        json.dump(progress, f, indent=2)
+
+def scan_pdf_files(directory):
+    """Recursively list non-empty PDF paths under a directory using os.scandir"""
+    found = []
+    stack = [directory]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.endswith('.pdf') and entry.stat().st_size > 0:
+                        found.append(os.path.normpath(entry.path))
+        except OSError:
+            continue
+    return found
+
+def scan_downloaded_villages(data, also_present=()):
+    """Find every village whose PDF is already on disk, in one pass
+
+    Each district directory is scanned in parallel and files are mapped back
+    to village_ids through the catalog. Ids in `also_present` (e.g. villages
+    held in a packed archive) count as present too.
+    """
+    path_to_id = {os.path.normpath(village_filepath(item)): item['id'] for item in iter_villages(data)}
+    present = set()
+
+    if os.path.isdir(DOWNLOAD_DIR):
+        with os.scandir(DOWNLOAD_DIR) as entries:
+            district_dirs = [entry.path for entry in entries if entry.is_dir(follow_symlinks=False)]
+        with ThreadPoolExecutor(max_workers=RECONCILE_WORKERS) as executor:
+            for paths in executor.map(scan_pdf_files, district_dirs):
+                present.update(path_to_id[p] for p in paths if p in path_to_id)
+
+    known_ids = set(path_to_id.values())
+    present.update(v for v in also_present if v in known_ids)
+    return present
+
+def reconcile_progress(data, progress, also_present=()):
+    """Rebuild the downloaded set from disk and update the progress store in bulk
+
+    Returns (added, removed): villages found on disk that the progress file did
+    not list, and villages listed as downloaded whose file is gone.
+    """
+    present = scan_downloaded_villages(data, also_present)
+    downloaded = set(progress.get("downloaded", []))
+    failed = set(progress.get("failed", []))
+
+    added = present - downloaded
+    removed = downloaded - present
+    progress["downloaded"] = list(present)
+    progress["failed"] = list(failed - present)
+    return len(added), len(removed)
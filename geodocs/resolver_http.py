@@ -0,0 +1,197 @@
+"""
+HTTP resolver engine: walks the portal's ASP.NET form with plain postbacks
+No browser is involved. Every dropdown change, search and PDF button click is a
+POST carrying the previous page's __VIEWSTATE / __EVENTVALIDATION, and every
+page is cached by the form state that produced it (see geodocs.http_cache), so
+selections already made by an earlier run or by the crawler cost no requests.
+"""
+
+import html
+import re
+from collections import Counter
+from urllib.parse import urljoin
+
+import requests
+
+from .config import BASE_URL
+from .http_cache import form_key, get_cache, normalize_value
+from .negative_cache import EMPTY_GRID, NO_MAP, NO_URL
+from .portal_html import form_fields, grid_rows, has_grid_page
+
+USE_CACHE = True  # Serve repeated form states from the on-disk cache
+REQUEST_TIMEOUT = 30
+REQUESTS_PER_RESOLVE = 12  # Live requests one pdf_url() can make (its form chain, rebuilt once when rejected)
+
+_PDF_URL_RE = re.compile(r'FileDownload\.aspx\?file=[^\'"\s)<>]+', re.IGNORECASE)
+
+class PortalError(Exception):
+    """The portal rejected a postback (e.g. stale ViewState) or returned an error page"""
+
+class PortalClient:
+    """One portal session (cookies + keep-alive connection) with cached form steps
+
+    Stands in for a WebDriver in the download pool: it has quit(),
+    get_cookies() and current_window_handle, and no browser process.
+    """
+
+    service = None  # No chromedriver process to supervise
+
+    def __init__(self, cache=None, use_cache=USE_CACHE):
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            'Referer': BASE_URL
+        })
+        self.cache = (cache or get_cache()) if use_cache else None
+        self.command_counts = Counter()  # Live requests per step (cache hits are not counted)
+        self.miss_reason = None  # Why the last pdf_url() found nothing (see geodocs/negative_cache.py)
+
+    @property
+    def current_window_handle(self):
+        return 'portal'
+
+    def quit(self):
+        """Close the HTTP session"""
+        self.session.close()
+
+    def get_cookies(self):
+        """Session cookies in WebDriver's format (for sync_session_cookies)"""
+        return [{'name': c.name, 'value': c.value, 'domain': c.domain, 'path': c.path}
+                for c in self.session.cookies]
+
+    def _cached(self, step, fields, fresh, fetch):
+        key = form_key(step, *fields)
+        if self.cache is not None and not fresh:
+            text = self.cache.get(key)
+            if text is not None:
+                return text
+        text = fetch()
+        self.command_counts[step] += 1
+        if self.cache is not None and text:
+            self.cache.put(key, step, text)
+        return text
+
+    def _post(self, base, overrides, target='', argument=''):
+        data = form_fields(base)
+        data.update({'__EVENTTARGET': target, '__EVENTARGUMENT': argument})
+        data.update(overrides)
+        return self.session.post(BASE_URL, data=data, timeout=REQUEST_TIMEOUT, allow_redirects=False)
+
+    def _postback(self, base, overrides, target='', argument=''):
+        response = self._post(base, overrides, target, argument)
+        if response.status_code != 200 or '__VIEWSTATE' not in response.text:
+            raise PortalError(f"postback {target or 'submit'} returned {response.status_code}"
+                              f" {response.headers.get('Location', '')}".rstrip())
+        return response.text
+
+    def _retrying(self, build, *args):
+        """Build a page from cached pages; if the portal rejects them, rebuild from live pages"""
+        try:
+            return build(*args, fresh=False)
+        except PortalError:
+            if self.cache is None:
+                raise
+            return build(*args, fresh=True)
+
+    def start_page(self, fresh=False):
+        """The blank search form"""
+        def fetch():
+            response = self.session.get(BASE_URL, timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+            return response.text
+        return self._cached('start', (), fresh, fetch)
+
+    def district_page(self, district, fresh=False):
+        """Form with a district selected (lists its taluks)"""
+        return self._cached('district', (district,), fresh, lambda: self._postback(
+            self.start_page(fresh), {'ddl_district': district}, target='ddl_district'))
+
+    def taluk_page(self, district, taluk, fresh=False):
+        """Form with a taluk selected (lists its hoblis)"""
+        return self._cached('taluk', (district, taluk), fresh, lambda: self._postback(
+            self.district_page(district, fresh), {'ddl_district': district, 'ddl_taluk': taluk},
+            target='ddl_taluk'))
+
+    def hobli_page(self, district, taluk, hobli, fresh=False):
+        """Form with a hobli selected (first page of its village grid)"""
+        return self._cached('hobli', (district, taluk, hobli), fresh, lambda: self._postback(
+            self.taluk_page(district, taluk, fresh),
+            {'ddl_district': district, 'ddl_taluk': taluk, 'ddl_hobli': hobli}, target='ddl_hobli'))
+
+    def grid_page(self, district, taluk, hobli, number, fresh=False):
+        """Page `number` (1-based) of a hobli's village grid"""
+        if number == 1:
+            return self.hobli_page(district, taluk, hobli, fresh)
+        return self._cached('grid', (district, taluk, hobli, '', number), fresh, lambda: self._postback(
+            self.grid_page(district, taluk, hobli, number - 1, fresh), {},
+            target='grdMaps', argument=f'Page${number}'))
+
+    def search_page(self, district, taluk, hobli, village, fresh=False):
+        """Results grid for a village name search"""
+        return self._cached('search', (district, taluk, hobli, village), fresh, lambda: self._postback(
+            self.taluk_page(district, taluk, fresh),
+            {'ddl_district': district, 'ddl_taluk': taluk, 'ddl_hobli': hobli,
+             'txtVlgName': village, 'btnSearch': 'Search'}))
+
+    def _pdf_url(self, district, taluk, hobli, village, fresh=False):
+        def fetch():
+            page = self.search_page(district, taluk, hobli, village, fresh)
+            rows = [r for r in grid_rows(page) if r.get('pdf_button')]
+            if not rows:
+                # Tell "this hobli has no maps" from "none for this village" by its own grid
+                hobli_rows = grid_rows(self.hobli_page(district, taluk, hobli, fresh))
+                self.miss_reason = NO_MAP if hobli_rows else EMPTY_GRID
+                return None
+            # Prefer the row for this exact village; the portal searches by substring
+            wanted = normalize_value(village)
+            row = next((r for r in rows if normalize_value(r.get('village')) == wanted), rows[0])
+            response = self._post(page, {f"{row['pdf_button']}.x": '10', f"{row['pdf_button']}.y": '10'})
+            location = response.headers.get('Location', '')
+            if 'FileDownload.aspx' in location:
+                return urljoin(BASE_URL, location)
+            if response.status_code != 200:
+                raise PortalError(f"PDF button returned {response.status_code} {location}".rstrip())
+            match = _PDF_URL_RE.search(html.unescape(response.text))
+            if not match:
+                self.miss_reason = NO_URL
+                return None
+            return urljoin(BASE_URL, match.group(0))
+        return self._cached('pdf', (district, taluk, hobli, village), fresh, fetch)
+
+    def pdf_url(self, district, taluk, hobli, village):
+        """FileDownload.aspx URL of a village map, or None (with the reason in miss_reason)"""
+        self.miss_reason = None
+        return self._retrying(self._pdf_url, district, taluk, hobli, village)
+
+    def villages(self, district, taluk, hobli):
+        """Every village label in a hobli's grid, across all grid pages"""
+        villages = []
+        number = 1
+        while True:
+            page = self._retrying(self.grid_page, district, taluk, hobli, number)
+            villages.extend(r['village'] for r in grid_rows(page) if r.get('village'))
+            number += 1
+            if not has_grid_page(page, number):
+                break
+        return list(dict.fromkeys(villages))
+
+def setup_driver():
+    """Resolver engine entry point: a portal client instead of a browser"""
+    return PortalClient()
+
+def resolve_budget():
+    """Longest one get_pdf_url_from_page call can take, in seconds"""
+    return REQUESTS_PER_RESOLVE * REQUEST_TIMEOUT
+
+def warm_up_driver(client):
+    """Load the blank form (usually from cache) before the first village"""
+    client.start_page()
+
+def get_pdf_url_from_page(client, district, taluk, hobli, village, debug=False, skip_navigation=False):
+    """Resolve a village's PDF URL with postbacks (cached per form state)"""
+    try:
+        return client.pdf_url(district, taluk, hobli, village)
+    except (requests.RequestException, PortalError) as e:
+        if debug:
+            print(f"      [DEBUG] {village}: {e}")
+        return None
@@ -0,0 +1,487 @@
+"""
+Selenium resolver engine: fills the portal form in Chrome and finds the
+FileDownload.aspx URL of a village map
+"""
+
+import json
+import os
+import re
+import time
+from collections import Counter
+from datetime import datetime
+
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from .config import BASE_URL, DOWNLOAD_DIR
+from .negative_cache import EMPTY_GRID, GRID_TIMEOUT, NO_HOBLIS, NO_MAP, NO_TALUKS, NO_URL
+from .profiling import record_command
+from .timeouts import SURGE_FACTOR, get_timeouts
+
+HEADLESS = False  # Set to False to see browser (popups work better in non-headless)
+PDF_CAPTURE_MODE = "cdp"  # "cdp": capture FileDownload.aspx from network events; "popup": switch to popup window
+PDF_URL_PATTERN = "*FileDownload.aspx*"
+DRIVER_CACHE_FILE = ".chromedriver_path.json"  # Pinned chromedriver path (skips the webdriver-manager lookup)
+PAGE_LOAD_STRATEGY = "eager"  # Return from driver.get() at DOMContentLoaded
+SCRIPT_TIMEOUT_MARGIN = 10  # Seconds Selenium's script timeout allows past the longest probe wait
+POPUP_WAIT = 1  # Seconds to wait for a popup after clicking the PDF button
+# Waits one get_pdf_url_from_page call can make per step: a probe runs again when a
+# postback reloads the page, and an empty grid is searched again for the whole hobli
+RESOLVE_WAITS = {'page': 1, 'options': 4, 'grid': 4, 'capture': 1}
+BLOCK_HEAVY_RESOURCES = True  # Don't load images and fonts (the form doesn't need them)
+HEAVY_RESOURCE_PATTERNS = ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.ico", "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"]
+
+# Installed on every document: window.open() of FileDownload.aspx only records
+# the URL, so no popup is created and nothing is loaded
+PDF_CAPTURE_SCRIPT = """
+(function() {
+    var nativeOpen = window.open;
+    window.__geodocsPdfUrl = null;
+    window.open = function(url) {
+        if (url && /FileDownload\\.aspx/i.test(url)) {
+            window.__geodocsPdfUrl = new URL(url, window.location.href).href;
+            return {closed: true, close: function() {}, focus: function() {}};
+        }
+        return nativeOpen.apply(window, arguments);
+    };
+})();
+"""
+
+# Wait timeouts (dropdown options, results grid, PDF capture, page load) are
+# learned from recent latencies, see geodocs/timeouts.py
+
+# Shared helpers for the batched portal probes below. Each probe is a single
+# execute_(async_)script call, i.e. one round trip to chromedriver.
+PORTAL_PROBES = """
+var GeoDocs = {
+    select: function(name) {
+        return document.querySelector('select[name="' + name + '"]');
+    },
+    values: function(select) {
+        var values = [];
+        if (!select) return values;
+        for (var i = 0; i < select.options.length; i++) {
+            if (select.options[i].value) values.push(select.options[i].value);
+        }
+        return values;
+    },
+    waitFor: function(test, timeoutMs, done) {
+        var start = Date.now();
+        (function poll() {
+            var found = null;
+            try { found = test(); } catch (e) { found = null; }
+            if (found || Date.now() - start > timeoutMs) return done(found);
+            setTimeout(poll, 50);
+        })();
+    }
+};
+"""
+
+# args: name, value, next_name, timeout_ms -> {options: [...]} or {reloaded: true}
+SELECT_AND_LIST_SCRIPT = """
+var name = arguments[0], value = arguments[1], nextName = arguments[2], timeoutMs = arguments[3];
+var done = arguments[arguments.length - 1];
+GeoDocs.waitFor(function() { return GeoDocs.select(name); }, timeoutMs, function(select) {
+    if (!select) return done({options: []});
+    var page = document.documentElement;
+    select.value = value;
+    select.dispatchEvent(new Event('change', {bubbles: true}));
+    GeoDocs.waitFor(function() {
+        if (document.documentElement !== page) return {reloaded: true};
+        var values = GeoDocs.values(GeoDocs.select(nextName));
+        return values.length > 1 ? {options: values} : null;
+    }, timeoutMs, function(result) {
+        done(result || {options: GeoDocs.values(GeoDocs.select(nextName))});
+    });
+});
+"""
+
+# args: name, timeout_ms -> {options: [...]}
+LIST_OPTIONS_SCRIPT = """
+var name = arguments[0], timeoutMs = arguments[1], done = arguments[arguments.length - 1];
+GeoDocs.waitFor(function() {
+    var values = GeoDocs.values(GeoDocs.select(name));
+    return values.length > 1 ? values : null;
+}, timeoutMs, function(values) {
+    done({options: values || GeoDocs.values(GeoDocs.select(name))});
+});
+"""
+
+# args: hobli, village (sync; the click starts the search postback)
+# A grid left by an earlier search is removed so the grid probe waits for the new one
+FILL_AND_SEARCH_SCRIPT = """
+var grid = document.querySelector("table[id*='grdMaps'], table[id*='Grid']");
+if (grid) grid.parentNode.removeChild(grid);
+var hobli = GeoDocs.select('ddl_hobli');
+hobli.value = arguments[0];
+var input = document.querySelector('input[name="txtVlgName"]');
+input.value = arguments[1];
+input.dispatchEvent(new Event('input', {bubbles: true}));
+input.dispatchEvent(new Event('change', {bubbles: true}));
+document.querySelector('[name="btnSearch"]').click();
+"""
+
+# args: timeout_ms -> {grid: bool, buttons: [{id, onclick}]}
+FIND_PDF_BUTTONS_SCRIPT = """
+var timeoutMs = arguments[0], done = arguments[arguments.length - 1];
+GeoDocs.waitFor(function() {
+    return document.querySelector("table[id*='grdMaps'], table[id*='Grid']");
+}, timeoutMs, function(grid) {
+    if (!grid) return done({grid: false, buttons: []});
+    var first = document.getElementById('grdMaps_ImgPdf_0');
+    var found = first ? [first] : [];
+    var rest = document.querySelectorAll("[id*='grdMaps_ImgPdf']");
+    if (!rest.length) rest = grid.querySelectorAll("[id*='ImgPdf']");
+    for (var i = 0; i < rest.length; i++) {
+        if (rest[i] !== first) found.push(rest[i]);
+    }
+    done({grid: true, buttons: found.map(function(el) {
+        return {id: el.id, onclick: el.getAttribute('onclick') || ''};
+    })});
+});
+"""
+
+def count_commands(driver):
+    """Count and time every WebDriver command this driver sends (one HTTP round trip each)
+
+    Wraps driver.execute, which WebElement methods, execute_script and
+    execute_cdp_cmd all go through. Each command is also reported to
+    geodocs.profiling under the driver's current `stage` (set by
+    get_pdf_url_from_page) and summed per stage in `driver.stage_seconds`.
+    Returns a Counter keyed by command name.
+    """
+    counts = getattr(driver, 'command_counts', None)
+    if counts is None:
+        counts = driver.command_counts = Counter()
+        stage_seconds = driver.stage_seconds = Counter()
+        driver.stage = None
+        execute = driver.execute
+        
+        def counted_execute(driver_command, params=None):
+            counts[driver_command] += 1
+            started = time.perf_counter()
+            try:
+                return execute(driver_command, params)
+            finally:
+                elapsed = time.perf_counter() - started
+                stage_seconds[driver.stage] += elapsed
+                record_command(driver.stage, driver_command, elapsed)
+        
+        driver.execute = counted_execute
+    return counts
+
+def resolve_driver_path():
+    """Local chromedriver path: $CHROMEDRIVER_PATH, then the pinned cache, then webdriver-manager
+
+    Only the last step needs the network; its result is pinned in
+    DRIVER_CACHE_FILE so later starts work offline.
+    """
+    env_path = os.environ.get('CHROMEDRIVER_PATH')
+    if env_path and os.path.exists(env_path):
+        return env_path
+    if os.path.exists(DRIVER_CACHE_FILE):
+        with open(DRIVER_CACHE_FILE, 'r') as f:
+            cached = json.load(f).get('path')
+        if cached and os.path.exists(cached):
+            return cached
+    from webdriver_manager.chrome import ChromeDriverManager
+    path = ChromeDriverManager().install()
+    with open(DRIVER_CACHE_FILE, 'w') as f:
+        json.dump({'path': path, 'pinned': datetime.now().isoformat()}, f, indent=2)
+    return path
+
+def blocked_url_patterns():
+    """URL patterns the browser must never load"""
+    patterns = list(HEAVY_RESOURCE_PATTERNS) if BLOCK_HEAVY_RESOURCES else []
+    if PDF_CAPTURE_MODE == "cdp":
+        patterns.append(PDF_URL_PATTERN)
+    return patterns
+
+def setup_driver():
+    """Setup Chrome driver with options"""
+    chrome_options = Options()
+    chrome_options.page_load_strategy = PAGE_LOAD_STRATEGY
+    if HEADLESS:
+        chrome_options.add_argument('--headless')
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--disable-gpu')
+    chrome_options.add_argument('--window-size=1920,1080')
+    
+    # Set download preferences
+    prefs = {
+        "download.default_directory": os.path.abspath(DOWNLOAD_DIR),
+        "download.prompt_for_download": False,
+        "download.directory_upgrade": True,
+        "plugins.always_open_pdf_externally": True
+    }
+    if BLOCK_HEAVY_RESOURCES:
+        prefs["profile.managed_default_content_settings.images"] = 2
+    chrome_options.add_experimental_option("prefs", prefs)
+    
+    if PDF_CAPTURE_MODE == "cdp":
+        # Network events are read back from the performance log
+        chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+        chrome_options.add_experimental_option('perfLoggingPrefs', {'enableNetwork': True, 'enablePage': False})
+    
+    service = Service(resolve_driver_path())
+    driver = webdriver.Chrome(service=service, options=chrome_options)
+    count_commands(driver)
+    # The probes time their own waits; Selenium's default 30 s must not cut them short
+    driver.set_script_timeout(get_timeouts().longest() * SURGE_FACTOR + SCRIPT_TIMEOUT_MARGIN)
+    # Bound driver.get() too, so resolve_budget() holds
+    driver.set_page_load_timeout(get_timeouts().limits['page'][2])
+    if PDF_CAPTURE_MODE == "cdp":
+        enable_pdf_capture(driver)
+    elif BLOCK_HEAVY_RESOURCES:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': blocked_url_patterns()})
+    return driver
+
+def resolve_budget():
+    """Longest one get_pdf_url_from_page call can take with every wait at its ceiling, in seconds"""
+    limits = get_timeouts().limits
+    return sum(limits[step][2] * waits for step, waits in RESOLVE_WAITS.items()) + POPUP_WAIT
+
+def warm_up_driver(driver):
+    """Load the portal so the first village can skip navigation"""
+    timeouts = get_timeouts()
+    driver.stage = 'warmup'
+    started = time.time()
+    try:
+        driver.get(BASE_URL)
+        WebDriverWait(driver, timeouts.timeout('page')).until(
+            EC.presence_of_element_located((By.NAME, "ddl_district")))
+        timeouts.observe('page', time.time() - started)
+    except TimeoutException:
+        timeouts.observe('page', time.time() - started, ok=False)
+        raise
+    finally:
+        driver.stage = None
+
+def enable_pdf_capture(driver):
+    """Intercept FileDownload.aspx requests through the Chrome DevTools Protocol
+
+    Popups opened with window.open() are replaced by a script that records the
+    URL. Same-window navigations to FileDownload.aspx are still issued (and
+    show up in the performance log) but blocked, so the PDF never loads.
+    """
+    driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': PDF_CAPTURE_SCRIPT})
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': blocked_url_patterns()})
+
+def captured_request_url(driver):
+    """First FileDownload.aspx URL seen in the performance log since the last read"""
+    for entry in driver.get_log('performance'):
+        message = json.loads(entry['message'])['message']
+        if message.get('method') == 'Network.requestWillBeSent':
+            url = message['params']['request']['url']
+            if 'FileDownload.aspx' in url:
+                return url
+    return None
+
+def capture_pdf_url(driver, button_id):
+    """Click the PDF button and capture the FileDownload.aspx URL it requests"""
+    driver.get_log('performance')  # Drain events from the page load and postbacks
+    driver.execute_script("window.__geodocsPdfUrl = null; document.getElementById(arguments[0]).click();", button_id)
+    timeouts = get_timeouts()
+    started = time.time()
+    deadline = started + timeouts.timeout('capture')
+    while time.time() < deadline:
+        try:
+            pdf_url = driver.execute_script("return window.__geodocsPdfUrl || null;")
+        except WebDriverException:
+            pdf_url = None  # Page is mid-postback; the network log still sees the request
+        if not pdf_url:
+            pdf_url = captured_request_url(driver)
+        if pdf_url:
+            timeouts.observe('capture', time.time() - started)
+            return pdf_url
+        time.sleep(0.1)
+    timeouts.observe('capture', time.time() - started, ok=False)
+    return None
+
+def pdf_url_from_onclick(onclick):
+    """Extract the FileDownload.aspx URL from a PDF button's onclick, if present"""
+    # Pattern 1: FileDownload.aspx?file=... (most common)
+    patterns = [
+        r"FileDownload\.aspx[^'\"\s]*file=([^'\")\s&]+)",
+        # Pattern 2: Try other patterns
+        r"FileDownload\.aspx\?file=['\"]([^'\"]+)['\"]",
+        r"['\"]FileDownload\.aspx[^'\"]*file=([^'\")\s&]+)['\"]",
+    ]
+    for pattern in patterns:
+        match = re.search(pattern, onclick or '', re.IGNORECASE)
+        if match:
+            file_param = match.group(1).strip("'\"")
+            return f"{BASE_URL}FileDownload.aspx?file={file_param}"
+    return None
+
+def _run_probe(driver, script, *args):
+    """Run an async portal probe; if a postback reloads the page mid-call, run it once more
+
+    Returns None if the probe outlived the driver's script timeout.
+    """
+    try:
+        return driver.execute_async_script(PORTAL_PROBES + script, *args)
+    except TimeoutException:  # Script timeout
+        return None
+    except WebDriverException:
+        pass  # "document unloaded while waiting for result": the new page is loading
+    try:
+        return driver.execute_async_script(PORTAL_PROBES + script, *args)
+    except TimeoutException:
+        return None
+
+def select_and_list(driver, name, value, next_name):
+    """Set a dropdown and return the next dropdown's option values, in one round trip
+
+    Returns None if the wait ran past the driver's script timeout.
+    """
+    timeouts = get_timeouts()
+    timeout_ms = int(timeouts.timeout('options') * 1000)
+    started = time.time()
+    try:
+        result = driver.execute_async_script(PORTAL_PROBES + SELECT_AND_LIST_SCRIPT,
+                                             name, value, next_name, timeout_ms)
+    except TimeoutException:  # Script timeout
+        result = None
+    except WebDriverException:
+        result = {'reloaded': True}  # The page unloaded under the script
+    if result and result.get('reloaded'):
+        # The change caused a full postback; wait for the options on the new page
+        # (never re-run the select itself, that would post back again)
+        result = _run_probe(driver, LIST_OPTIONS_SCRIPT, next_name, timeout_ms)
+    if result is None:
+        timeouts.observe('options', time.time() - started, ok=False)
+        return None
+    options = result.get('options') or []
+    timeouts.observe('options', time.time() - started, ok=len(options) > 1)
+    return options
+
+def find_pdf_buttons(driver):
+    """Wait for the results grid and return every ImgPdf button's id and onclick, in one round trip"""
+    timeouts = get_timeouts()
+    started = time.time()
+    result = _run_probe(driver, FIND_PDF_BUTTONS_SCRIPT, int(timeouts.timeout('grid') * 1000))
+    found = bool(result and result.get('grid'))
+    timeouts.observe('grid', time.time() - started, ok=found)
+    if not found:
+        return None
+    return result['buttons']
+
+def get_pdf_url_from_page(driver, district, taluk, hobli, village, debug=False, skip_navigation=False):
+    """Navigate to page, fill form, and extract PDF URL - using exact flow from test_website_flow.py
+
+    Each step is one batched JavaScript probe (set a dropdown and read the next
+    one's options; fill and search; read the grid's PDF buttons), so a village
+    costs a handful of WebDriver round trips. `driver.stage` names the current
+    step for the command timings. Pass skip_navigation=True when the driver
+    already shows a fresh portal page (see warm_up_driver). When it returns
+    None, `driver.miss_reason` says why (see geodocs/negative_cache.py).
+    """
+    driver.miss_reason = None
+    try:
+        if debug:
+            print(f"      [DEBUG] Starting PDF URL extraction for {village}")
+        # Navigate to the page
+        driver.stage = 'navigate'
+        if not skip_navigation:
+            driver.get(BASE_URL)
+        
+        # Fill district, read taluk options
+        # (None: the wait outlived the script timeout, a slow portal rather than an answer)
+        driver.stage = 'district'
+        options = select_and_list(driver, 'ddl_district', district, 'ddl_taluk')
+        if options is None:
+            return None
+        if len(options) <= 1:
+            driver.miss_reason = NO_TALUKS
+            return None  # No valid options
+        
+        # Fill taluk, read hobli options
+        driver.stage = 'taluk'
+        options = select_and_list(driver, 'ddl_taluk', taluk, 'ddl_hobli')
+        if options is None:
+            return None
+        if len(options) <= 1:
+            driver.miss_reason = NO_HOBLIS
+            return None  # No valid options
+        
+        # Fill hobli and village, click search
+        driver.stage = 'search'
+        driver.execute_script(PORTAL_PROBES + FILL_AND_SEARCH_SCRIPT, hobli, village)
+        
+        # Wait for grid and read the PDF buttons
+        driver.stage = 'grid'
+        buttons = find_pdf_buttons(driver)
+        if buttons is None:
+            driver.miss_reason = GRID_TIMEOUT
+            return None
+        if not buttons:
+            # The search is filtered by village name; tell "this hobli has no maps"
+            # from "none for this village" by searching the whole hobli
+            driver.stage = 'hobli'
+            driver.execute_script(PORTAL_PROBES + FILL_AND_SEARCH_SCRIPT, hobli, '')
+            hobli_buttons = find_pdf_buttons(driver)
+            if hobli_buttons is None:
+                driver.miss_reason = GRID_TIMEOUT
+            else:
+                driver.miss_reason = NO_MAP if hobli_buttons else EMPTY_GRID
+            return None
+        button = buttons[0]
+        
+        # If onclick exists, try to extract URL from it first
+        pdf_url = pdf_url_from_onclick(button['onclick'])
+        if pdf_url:
+            return pdf_url
+        
+        # If onclick is empty or extraction failed, capture the request the button issues
+        if PDF_CAPTURE_MODE == "cdp":
+            driver.stage = 'capture'
+            pdf_url = capture_pdf_url(driver, button['id'])
+            if pdf_url:
+                return pdf_url
+        
+        # Fallback: click button and check for popup
+        # This handles the case where button opens a popup window
+        driver.stage = 'popup'
+        original_window = driver.current_window_handle
+        window_handles_before = driver.window_handles
+        
+        # Click the PDF button
+        driver.execute_script("document.getElementById(arguments[0]).click();", button['id'])
+        time.sleep(POPUP_WAIT)
+        
+        # Check for new window/popup
+        window_handles_after = driver.window_handles
+        new_windows = [w for w in window_handles_after if w not in window_handles_before]
+        
+        if new_windows:
+            # Switch to popup
+            driver.switch_to.window(new_windows[0])
+            popup_url = driver.current_url
+            
+            # Close popup and switch back
+            driver.close()
+            driver.switch_to.window(original_window)
+            if 'FileDownload.aspx' in popup_url:
+                return popup_url
+        else:
+            # No popup, check current URL
+            current_url = driver.current_url
+            if 'FileDownload.aspx' in current_url:
+                return current_url
+        
+        driver.miss_reason = NO_URL
+        return None
+            
+    except Exception as e:
+        return None
+    finally:
+        driver.stage = None
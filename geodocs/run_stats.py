@@ -0,0 +1,275 @@
+"""
+Historical per-village run statistics
+Every village a crawl works on is recorded in RUN_STATS_FILE with its outcome
+and timings: resolving, downloading, and the resolver's WebDriver time per
+stage. From that history each village gets an expected cost and success rate,
+shrunk toward its hobli, taluk and district when it has few samples of its
+own. The crawler uses them for its ETA and, optionally, to order its queue.
+"""
+
+import argparse
+import json
+import sqlite3
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from .catalog import load_catalog, iter_villages
+from .config import RUN_STATS_FILE
+from .progress import load_progress
+
+HISTORY_DAYS = 60  # Attempts older than this are not used for estimates
+DEFAULT_COST = 20.0  # Seconds per village before anything was measured
+DEFAULT_SUCCESS = 0.9  # Share of villages with a map before anything was measured
+SHRINK = 3  # Samples' worth of weight given to the enclosing level's estimate
+ORDERS = ('catalog', 'cost', 'value')
+SUCCESS_STATUSES = ('downloaded', 'linked')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started REAL NOT NULL,
+    finished REAL,
+    engine TEXT,
+    workers INTEGER,
+    villages INTEGER
+);
+CREATE TABLE IF NOT EXISTS attempts (
+    run_id INTEGER NOT NULL,
+    village_id TEXT NOT NULL,
+    district TEXT NOT NULL,
+    taluk TEXT NOT NULL,
+    hobli TEXT NOT NULL,
+    status TEXT NOT NULL,
+    reason TEXT,
+    total REAL NOT NULL,
+    resolve REAL,
+    download REAL,
+    commands INTEGER,
+    stages TEXT,
+    finished REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS attempts_village ON attempts (village_id);
+CREATE INDEX IF NOT EXISTS attempts_finished ON attempts (finished);
+"""
+
+class RunStats:
+    """SQLite store of crawl runs and their per-village attempts"""
+
+    def __init__(self, path=RUN_STATS_FILE):
+        self.path = path
+        self._db = sqlite3.connect(path, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    def start_run(self, engine=None, workers=None):
+        """Register a crawl run; returns its run_id"""
+        cursor = self._db.execute("INSERT INTO runs (started, engine, workers) VALUES (?, ?, ?)",
+                                  (time.time(), engine, workers))
+        self._db.commit()
+        return cursor.lastrowid
+
+    def finish_run(self, run_id, villages):
+        """Close a run with the number of villages it finished"""
+        self._db.execute("UPDATE runs SET finished = ?, villages = ? WHERE run_id = ?",
+                         (time.time(), villages, run_id))
+        self._db.commit()
+
+    def record(self, run_id, item, result):
+        """Store one village's process_village() result (call commit() now and then)"""
+        self._db.execute(
+            "INSERT INTO attempts (run_id, village_id, district, taluk, hobli, status, reason, total, "
+            "resolve, download, commands, stages, finished) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (run_id, item['id'], str(item['district']['value']), str(item['taluk']['value']),
+             str(item['hobli']['value']), result['status'], result.get('reason'), round(result['elapsed'], 3),
+             round(result.get('resolve', 0.0), 3), round(result.get('download', 0.0), 3),
+             result.get('commands'), json.dumps(result.get('stages') or {}), time.time()))
+
+    def commit(self):
+        self._db.commit()
+
+    def close(self):
+        self._db.commit()
+        self._db.close()
+
+    def estimator(self, days=HISTORY_DAYS):
+        """CostEstimator over the attempts of the last `days` days"""
+        rows = self._db.execute(
+            "SELECT village_id, COUNT(*), SUM(total), SUM(status IN (?, ?)) FROM attempts "
+            "WHERE finished > ? GROUP BY village_id",
+            SUCCESS_STATUSES + (time.time() - days * 86400,)).fetchall()
+        return CostEstimator(rows)
+
+    def stage_means(self, days=HISTORY_DAYS):
+        """{stage: mean seconds per resolved village} over recent attempts"""
+        totals, count = defaultdict(float), 0
+        for (stages,) in self._db.execute("SELECT stages FROM attempts WHERE finished > ? AND resolve > 0",
+                                          (time.time() - days * 86400,)):
+            count += 1
+            for stage, seconds in json.loads(stages or '{}').items():
+                totals[stage] += seconds
+        return {stage: total / count for stage, total in totals.items()} if count else {}
+
+    def runs(self, limit=10):
+        """Most recent runs as (run_id, started, finished, engine, workers, villages, mean cost)"""
+        return self._db.execute(
+            "SELECT r.run_id, r.started, r.finished, r.engine, r.workers, r.villages, AVG(a.total) "
+            "FROM runs r LEFT JOIN attempts a ON a.run_id = r.run_id "
+            "GROUP BY r.run_id ORDER BY r.run_id DESC LIMIT ?", (limit,)).fetchall()
+
+def _levels(village_id):
+    """Keys from the whole catalog down to one village: '', 'd', 'd_t', 'd_t_h', 'd_t_h_v'"""
+    parts = str(village_id).split('_')
+    return [''] + ["_".join(parts[:i]) for i in range(1, len(parts) + 1)]
+
+class CostEstimator:
+    """Expected seconds and success rate of each village, from per-village attempt totals
+
+    Each level (catalog, district, taluk, hobli, village) starts from the
+    estimate of the level above and moves toward its own average as samples
+    accumulate (SHRINK samples of weight for the level above).
+    """
+
+    def __init__(self, rows):
+        self.samples = defaultdict(lambda: [0, 0.0, 0])  # level key -> [attempts, seconds, successes]
+        for village_id, count, total, ok in rows:
+            for key in _levels(village_id):
+                sample = self.samples[key]
+                sample[0] += count
+                sample[1] += total or 0.0
+                sample[2] += ok or 0
+        self.measured = len(rows)
+        self._cache = {}
+
+    def estimate(self, key):
+        """(expected seconds, success rate) of a village_id or of a d / d_t / d_t_h prefix"""
+        found = self._cache.get(key)
+        if found is None:
+            cost, success = DEFAULT_COST, DEFAULT_SUCCESS
+            for level in _levels(key):
+                count, total, ok = self.samples.get(level, (0, 0.0, 0))
+                cost = (total + SHRINK * cost) / (count + SHRINK)
+                success = (ok + SHRINK * success) / (count + SHRINK)
+            found = self._cache[key] = (cost, success)
+        return found
+
+    def cost(self, item):
+        """Expected seconds for a catalog village"""
+        return self.estimate(item['id'])[0]
+
+    def order(self, items, order='catalog'):
+        """Reorder villages hobli by hobli ('cost': cheapest first, 'value': most maps per second first)
+
+        Villages of a hobli stay together and in catalog order, so the portal
+        form keeps its district/taluk selection between them.
+        """
+        if order == 'catalog':
+            return list(items)
+        hoblis = defaultdict(list)
+        for item in items:
+            hoblis[item['id'].rsplit('_', 1)[0]].append(item)
+
+        def key(villages):
+            estimates = [self.estimate(item['id']) for item in villages]
+            seconds = sum(cost for cost, _ in estimates)
+            if order == 'cost':
+                return seconds / len(villages)
+            return -sum(success for _, success in estimates) / max(seconds, 1e-6)
+
+        return [item for villages in sorted(hoblis.values(), key=key) for item in villages]
+
+class EtaTracker:
+    """ETA from the expected cost of the villages still to do
+
+    The history's estimates are scaled by how this run compares with them so
+    far (elapsed time against the expected cost of the villages done), so the
+    ETA follows a faster or slower portal without swinging on a few outliers.
+    """
+
+    MIN_DONE = 10  # Villages finished before this run's pace is trusted
+    FACTOR_LIMITS = (0.25, 4.0)
+
+    def __init__(self, estimator, items, workers=1):
+        self.expected = {item['id']: estimator.cost(item) for item in items}
+        self.workers = max(1, workers)
+        self.remaining = sum(self.expected.values())
+        self.done_cost = 0.0
+        self.done = 0
+
+    def finished(self, village_id):
+        cost = self.expected.pop(village_id, 0.0)
+        self.remaining -= cost
+        self.done_cost += cost
+        self.done += 1
+
+    def eta(self, elapsed):
+        """Seconds left for the remaining villages"""
+        factor = 1.0
+        if self.done >= self.MIN_DONE and self.done_cost > 0:
+            low, high = self.FACTOR_LIMITS
+            factor = min(max(elapsed / (self.done_cost / self.workers), low), high)
+        return max(0.0, self.remaining) / self.workers * factor
+
+def report(by='district', workers=1, district_label=None, limit=None, path=RUN_STATS_FILE):
+    """Print measured cost, success rate and remaining time per district, taluk or hobli"""
+    stats = RunStats(path)
+    estimator = stats.estimator()
+    depth = {'district': 1, 'taluk': 2, 'hobli': 3}[by]
+    progress = load_progress()
+    done = set(progress.get('downloaded', [])) | set(progress.get('failed', []))
+
+    groups = {}
+    for item in iter_villages(load_catalog()):
+        if district_label and item['district']['label'] != district_label:
+            continue
+        key = "_".join(item['id'].split('_')[:depth])
+        group = groups.setdefault(key, {'label': " > ".join(item[k]['label'] for k in
+                                                            ('district', 'taluk', 'hobli')[:depth]),
+                                        'villages': 0, 'remaining': 0, 'remaining_cost': 0.0})
+        group['villages'] += 1
+        if item['id'] not in done:
+            group['remaining'] += 1
+            group['remaining_cost'] += estimator.cost(item)
+
+    rows = sorted(groups.items(), key=lambda g: -g[1]['remaining_cost'])[:limit]
+    print(f"📊 {stats.path}: {estimator.measured} villages measured in the last {HISTORY_DAYS} days")
+    print(f"   {by.title():<45} {'tries':>6} {'avg s':>7} {'ok %':>6} {'left':>6} {'ETA':>12}")
+    for key, group in rows:
+        count, total, ok = estimator.samples.get(key, (0, 0.0, 0))
+        average = f"{total / count:7.1f}" if count else f"{'-':>7}"
+        success = f"{ok / count * 100:6.1f}" if count else f"{'-':>6}"
+        eta = str(timedelta(seconds=int(group['remaining_cost'] / max(1, workers))))
+        print(f"   {group['label'][:45]:<45} {count:6d} {average} {success} {group['remaining']:6d} {eta:>12}")
+    remaining = sum(g['remaining_cost'] for g in groups.values())
+    print(f"   ⏳ Everything left: {timedelta(seconds=int(remaining / max(1, workers)))} with {workers} browser(s)")
+    stages = stats.stage_means()
+    if stages:
+        print("   ⏱️  Resolver time per village: " + " | ".join(
+            f"{stage} {seconds:.1f}s" for stage, seconds in sorted(stages.items(), key=lambda s: -s[1])))
+    stats.close()
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Historical crawl statistics and cost estimates")
+    sub = parser.add_subparsers(dest='command', required=True)
+    summary = sub.add_parser('report', help="Cost, success rate and ETA per district, taluk or hobli")
+    summary.add_argument('--by', choices=['district', 'taluk', 'hobli'], default='district')
+    summary.add_argument('--district', help="Only one district (by label)")
+    summary.add_argument('--workers', type=int, default=1, help="Browsers the ETA assumes")
+    summary.add_argument('--limit', type=int, help="Only the N most expensive groups")
+    sub.add_parser('runs', help="Recent runs")
+    args = parser.parse_args()
+
+    if args.command == 'report':
+        report(args.by, args.workers, args.district, args.limit)
+        return
+    stats = RunStats()
+    for run_id, started, finished, engine, workers, villages, mean in stats.runs():
+        took = str(timedelta(seconds=int(finished - started))) if finished else "unfinished"
+        print(f"   #{run_id:<4} {time.strftime('%Y-%m-%d %H:%M', time.localtime(started))}  {engine or '-':<9} "
+              f"{workers or '-'} browser(s)  {villages or 0:6d} villages  {took:>10}  "
+              f"{(mean or 0):.1f}s/village")
+    stats.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Priority lanes for work that shares the portal
+Interactive lookups and the bulk crawl queue in separate lanes. A free worker
+always takes from the highest-priority lane that has work and is within its
+limits: a share of the workers it may occupy at once and a share of the
+portal rate (village starts per second), which all lanes draw from together.
+Hedged copies of straggling items (browser_pool.py) come next, and the bulk
+lane gets whatever is left.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+
+INTERACTIVE = 'interactive'
+HEDGE = 'hedge'
+BULK = 'bulk'
+
+# lane -> priority (lower runs first), share of the workers, share of the portal rate
+DEFAULT_LANES = {
+    INTERACTIVE: {'priority': 0, 'workers': 1.0, 'rate': 1.0},
+    HEDGE: {'priority': 1, 'workers': 1.0, 'rate': 1.0},
+    BULK: {'priority': 2, 'workers': 1.0, 'rate': 1.0},
+}
+
+class _Bucket:
+    """Token bucket of village starts (burst of one)"""
+
+    def __init__(self, rate):
+        self.rate = rate  # Starts per second
+        self.tokens = 1.0
+        self.refilled = time.time()
+
+    def delay(self, now):
+        """Seconds until the bucket allows another start (0: now)"""
+        self.tokens = min(1.0, self.tokens + (now - self.refilled) * self.rate)
+        self.refilled = now
+        return 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+class _Lane:
+    def __init__(self, name, priority, worker_limit, bucket):
+        self.name = name
+        self.priority = priority
+        self.limit = worker_limit
+        self.bucket = bucket  # The lane's cap within the portal rate, None: only the portal rate
+        self.queue = deque()  # (queued at, task)
+        self.running = 0
+        self.started = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+class LaneScheduler:
+    """Task queue with priority lanes, per-lane worker limits and rate shares
+
+    Drop-in for the pool's queue.Queue: put(task, lane), get(timeout) returning
+    (lane, task) or raising queue.Empty, and done(lane) once the task finished.
+    `rate` is the portal budget in starts per second (None: unlimited). Every
+    start draws from that one budget; a lane with a share below 1 is also held
+    to its share of it, which leaves the rest to the other lanes. Likewise a
+    worker share below 1 (rounded down) leaves at least one worker to the others
+when there are two or more.
+    """
+
+    def __init__(self, workers=1, lanes=None, rate=None):
+        self.lanes = {}
+        for name in set(DEFAULT_LANES) | set(lanes or {}):
+            config = dict(DEFAULT_LANES.get(name, {'priority': len(DEFAULT_LANES), 'workers': 1.0, 'rate': 1.0}),
+                          **(lanes or {}).get(name, {}))
+            limit = int(config['workers'] * workers)
+            if config['workers'] < 1:
+                limit = min(limit, workers - 1)
+            bucket = _Bucket(rate * config['rate']) if rate and config['rate'] < 1 else None
+            self.lanes[name] = _Lane(name, config['priority'], max(1, limit), bucket)
+        self.portal = _Bucket(rate) if rate else None
+        self.order = sorted(self.lanes.values(), key=lambda lane: lane.priority)
+        self._cond = threading.Condition()
+
+    def put(self, task, lane=BULK):
+        """Queue a task in a lane"""
+        with self._cond:
+            self.lanes[lane].queue.append((time.time(), task))
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Next (lane, task) a free worker should run; raises queue.Empty after `timeout`"""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while True:
+                now = time.time()
+                retry = None
+                for lane in self.order:
+                    if not lane.queue or lane.running >= lane.limit:
+                        continue
+                    buckets = [b for b in (self.portal, lane.bucket) if b is not None]
+                    delay = max([b.delay(now) for b in buckets], default=0)
+                    if delay:
+                        retry = delay if retry is None else min(retry, delay)
+                        continue
+                    for bucket in buckets:
+                        bucket.take()
+                    queued, task = lane.queue.popleft()
+                    lane.running += 1
+                    lane.started += 1
+                    lane.wait_total += now - queued
+                    lane.wait_max = max(lane.wait_max, now - queued)
+                    return lane.name, task
+                remaining = None if deadline is None else deadline - now
+                if remaining is not None and remaining <= 0:
+                    raise queue.Empty
+                waits = [w for w in (remaining, retry) if w is not None]
+                self._cond.wait(min(waits) if waits else None)
+
+    def done(self, lane):
+        """A task taken from `lane` finished (frees its worker slot)"""
+        with self._cond:
+            self.lanes[lane].running -= 1
+            self._cond.notify_all()
+
+    def qsize(self):
+        """Tasks waiting in all lanes"""
+        with self._cond:
+            return sum(len(lane.queue) for lane in self.lanes.values())
+
+    def stats(self):
+        """{lane: {'queued', 'running', 'started', 'wait_avg', 'wait_max'}}"""
+        with self._cond:
+            return {lane.name: {'queued': len(lane.queue), 'running': lane.running, 'started': lane.started,
+                                'wait_avg': round(lane.wait_total / lane.started, 3) if lane.started else 0.0,
+                                'wait_max': round(lane.wait_max, 3)}
+                    for lane in self.order}
@@ -0,0 +1,131 @@
+"""
+Learned per-step timeouts for the portal waits
+Each resolver step (dropdown options, results grid, PDF capture, page load)
+keeps a window of recent latencies of successful waits. Its timeout is a high
+percentile of that window times a margin, clamped to a floor and ceiling, so
+dead ends fail after a little longer than a slow success instead of after a
+fixed 15 s. The windows are saved to TIMEOUTS_FILE and reused by later runs.
+"""
+
+import json
+import math
+import os
+import threading
+from collections import deque
+
+from .config import TIMEOUTS_FILE
+
+WINDOW = 500  # Recent successful latencies kept per step
+MIN_SAMPLES = 20  # Use the step's default timeout until this many successes were seen
+PERCENTILE = 99
+MARGIN = 1.5  # Timeout = percentile latency x margin
+SURGE_WINDOW = 10  # Recent outcomes checked for a run of timeouts
+SURGE_SHARE = 0.5  # More timeouts than this share: the portal is slow, not every village a dead end
+SURGE_FACTOR = 2  # Timeouts are multiplied by this during a surge
+
+# step -> (default, floor, ceiling) in seconds
+STEP_LIMITS = {
+    'options': (3, 1, 15),  # Next dropdown's options after a change
+    'grid': (15, 2, 45),  # Results grid after searching
+    'capture': (5, 1, 20),  # FileDownload.aspx request after clicking the PDF button
+    'page': (15, 3, 60),  # Blank form after driver.get()
+}
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+class TimeoutManager:
+    """Per-step latency windows and the timeouts derived from them"""
+
+    def __init__(self, path=TIMEOUTS_FILE, limits=None):
+        self.path = path
+        self.limits = dict(STEP_LIMITS, **(limits or {}))
+        self.latencies = {step: deque(maxlen=WINDOW) for step in self.limits}
+        self.outcomes = {step: deque(maxlen=SURGE_WINDOW) for step in self.limits}
+        self.expired = {step: 0 for step in self.limits}  # Waits that hit their timeout this run
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """Read latency windows saved by earlier runs"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                saved = json.load(f).get('latencies', {})
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            for step, values in saved.items():
+                if step in self.latencies:
+                    self.latencies[step].extend(float(v) for v in values)
+
+    def save(self):
+        """Write the latency windows (only if new samples arrived)"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {
+                'latencies': {step: [round(v, 3) for v in values] for step, values in self.latencies.items()},
+                'timeouts': {step: round(self._timeout(step), 2) for step in self.limits}
+            }
+            self._dirty = False
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def observe(self, step, seconds, ok=True):
+        """Record one wait: its latency if it succeeded, or that it ran out of time"""
+        with self._lock:
+            self.outcomes[step].append(ok)
+            if ok:
+                self.latencies[step].append(seconds)
+                self._dirty = True
+            else:
+                self.expired[step] += 1
+
+    def _timeout(self, step):
+        default, floor, ceiling = self.limits[step]
+        values = self.latencies[step]
+        if len(values) < MIN_SAMPLES:
+            value = default
+        else:
+            value = percentile(values, PERCENTILE) * MARGIN
+        # A run of timeouts means the portal slowed down since the window was filled
+        outcomes = self.outcomes[step]
+        if len(outcomes) == SURGE_WINDOW and outcomes.count(False) > SURGE_SHARE * SURGE_WINDOW:
+            value = max(value * SURGE_FACTOR, default)
+        return min(max(value, floor), ceiling)
+
+    def timeout(self, step):
+        """Current timeout for a step, in seconds"""
+        with self._lock:
+            return self._timeout(step)
+
+    def longest(self):
+        """Largest ceiling of any step, in seconds"""
+        return max(ceiling for _, _, ceiling in self.limits.values())
+
+    def summary(self):
+        """{step: {'timeout', 'samples', 'expired'}} for reports"""
+        with self._lock:
+            return {step: {'timeout': round(self._timeout(step), 2),
+                           'samples': len(self.latencies[step]),
+                           'expired': self.expired[step]}
+                    for step in self.limits}
+
+_shared = None
+_shared_lock = threading.Lock()
+
+def get_timeouts():
+    """Process-wide shared timeout manager"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = TimeoutManager()
+        return _shared
@@ -0,0 +1,60 @@
+"""
+CDP transfer engine: streams PDFs through the browser's own network stack
+Uses Network.loadNetworkResource and IO.read, so the browser's cookies and
+connection are reused and no second HTTP client is involved.
+"""
+
+import base64
+import os
+from datetime import datetime
+
+from .resolver_selenium import PDF_URL_PATTERN, blocked_url_patterns
+
+def fetch_pdf_via_cdp(driver, pdf_url, filepath, validators=None):
+    """Stream a PDF through the browser's own network stack (cookies included)"""
+    try:
+        frame_id = driver.execute_cdp_cmd('Page.getFrameTree', {})['frameTree']['frame']['id']
+        driver.execute_cdp_cmd('Network.setBlockedURLs',
+                               {'urls': [p for p in blocked_url_patterns() if p != PDF_URL_PATTERN]})
+        try:
+            resource = driver.execute_cdp_cmd('Network.loadNetworkResource', {
+                'frameId': frame_id,
+                'url': pdf_url,
+                'options': {'disableCache': False, 'includeCredentials': True}
+            })['resource']
+        finally:
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': blocked_url_patterns()})
+        
+        headers = {k.lower(): v for k, v in (resource.get('headers') or {}).items()}
+        if not resource.get('success') or 'application/pdf' not in headers.get('content-type', ''):
+            if resource.get('stream'):
+                driver.execute_cdp_cmd('IO.close', {'handle': resource['stream']})
+            return False
+        
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        tmp_path = filepath + '.part'
+        with open(tmp_path, 'wb') as f:
+            while True:
+                chunk = driver.execute_cdp_cmd('IO.read', {'handle': resource['stream'], 'size': 1024 * 1024})
+                data = chunk.get('data', '')
+                f.write(base64.b64decode(data) if chunk.get('base64Encoded') else data.encode('latin-1'))
+                if chunk.get('eof'):
+                    break
+        driver.execute_cdp_cmd('IO.close', {'handle': resource['stream']})
+        os.replace(tmp_path, filepath)
+        
+        if validators is not None:
+            validators.update({
+                'url': pdf_url,
+                'etag': headers.get('etag'),
+                'last_modified': headers.get('last-modified'),
+                'content_length': headers.get('content-length'),
+                'checked': datetime.now().isoformat()
+            })
+        return True
+    except Exception as e:
+        return False
+
+def fetch_pdf(pdf_url, filepath, validators=None, session=None, driver=None):
+    """Transfer engine entry point"""
+    return fetch_pdf_via_cdp(driver, pdf_url, filepath, validators=validators)
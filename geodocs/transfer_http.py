@@ -0,0 +1,94 @@
+"""
+HTTP transfer engine: downloads PDFs with requests
+Sessions are paired with a browser so its cookies (ASP.NET session etc.)
+come along on every download.
+"""
+
+import os
+from datetime import datetime
+
+import requests
+
+from .config import BASE_URL
+
+def write_pdf(response, filepath):
+    """Stream a PDF response to disk, replacing any existing file atomically"""
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    tmp_path = filepath + '.part'
+    with open(tmp_path, 'wb') as f:
+        for chunk in response.iter_content(chunk_size=8192):
+            f.write(chunk)
+    os.replace(tmp_path, filepath)
+
+def validators_from_response(response, pdf_url):
+    """Build a validator record from a PDF response's headers"""
+    return {
+        'url': pdf_url,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'content_length': response.headers.get('Content-Length'),
+        'checked': datetime.now().isoformat()
+    }
+
+def create_download_session(driver=None):
+    """Persistent keep-alive HTTP session, paired with a browser when one is given"""
+    session = requests.Session()
+    session.mount('https://', requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=2))
+    session.mount('http://', requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=2))
+    session.headers.update({
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+        'Referer': BASE_URL
+    })
+    if driver is not None:
+        try:
+            # Same User-Agent as the browser so the portal sees one client
+            session.headers['User-Agent'] = driver.execute_script("return navigator.userAgent;")
+        except Exception:
+            pass
+        sync_session_cookies(session, driver)
+    return session
+
+def sync_session_cookies(session, driver):
+    """Copy the browser's cookies (ASP.NET session etc.) into the HTTP session"""
+    try:
+        cookies = driver.get_cookies()
+    except Exception:
+        return False
+    for cookie in cookies:
+        session.cookies.set(
+            cookie['name'], cookie['value'],
+            domain=cookie.get('domain', ''), path=cookie.get('path', '/')
+        )
+    return True
+
+def download_pdf(pdf_url, filepath, validators=None, session=None):
+    """Download PDF from URL (fills `validators` with the response's ETag/Last-Modified if given)
+
+    Pass a session from create_download_session() to reuse its connection and
+    the browser's cookies; without one a plain request is made.
+    """
+    try:
+        if session is not None:
+            response = session.get(pdf_url, timeout=30, stream=True)
+        else:
+            headers = {
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+                'Referer': BASE_URL
+            }
+            response = requests.get(pdf_url, headers=headers, timeout=30, stream=True)
+        response.raise_for_status()
+        
+        # Check if it's actually a PDF
+        if 'application/pdf' in response.headers.get('content-type', ''):
+            write_pdf(response, filepath)
+            if validators is not None:
+                validators.update(validators_from_response(response, pdf_url))
+            return True
+        else:
+            return False
+    except Exception as e:
+        return False
+
+def fetch_pdf(pdf_url, filepath, validators=None, session=None, driver=None):
+    """Transfer engine entry point"""
+    return download_pdf(pdf_url, filepath, validators=validators, session=session)
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Linearize downloaded village maps for fast first-page display
+The PDFs saved from FileDownload.aspx are not linearized, so a viewer has to
+fetch the whole file before it can draw anything. This pass rewrites every map
+in village_maps/ in a process pool: linearized ("fast web view"), object
+streams generated and Flate streams recompressed, all lossless. Each original
+hash is recorded with its before/after size in OPTIMIZE_LOG. Maps in the
+content-addressed store get a new blob and their views, manifest entry (and so
+the map server's ETag) move to it; identical originals are rewritten once.
+
+Needs pikepdf (`pip install pikepdf`) or the qpdf command line tool.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+try:
+    import pikepdf
+    HAS_PIKEPDF = True
+except ImportError:
+    HAS_PIKEPDF = False
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from map_store import (
+    blob_path, downloaded_maps, hash_file, link_view, load_manifest, save_manifest, store_blob
+)
+
+OPTIMIZE_LOG = "map_optimize.json"
+OPTIMIZE_WORKERS = os.cpu_count() or 2  # Rewriting processes
+KEEP_ENCRYPTION = True  # Keep the portal's (empty password) encryption and permission flags
+SAVE_EVERY = 200  # Save the manifest and log every N rewritten maps
+QPDF = shutil.which('qpdf')
+
+def load_optimize_log():
+    """Load the original sha256 -> optimized result log"""
+    if os.path.exists(OPTIMIZE_LOG):
+        with open(OPTIMIZE_LOG, 'r') as f:
+            return json.load(f)
+    return {"blobs": {}}
+
+def save_optimize_log(log):
+    """Save the optimization log"""
+    tmp_path = OPTIMIZE_LOG + '.part'
+    with open(tmp_path, 'w') as f:
+        json.dump(log, f, indent=2)
+    os.replace(tmp_path, OPTIMIZE_LOG)
+
+def original_sizes(log=None):
+    """Optimized sha256 -> size of the file the portal served"""
+    log = log if log is not None else load_optimize_log()
+    return {entry['sha256']: entry['before'] for entry in log['blobs'].values()}
+
+def _qpdf_pages(path):
+    result = subprocess.run([QPDF, '--show-npages', path], capture_output=True, text=True)
+    return int(result.stdout.strip()) if result.returncode in (0, 3) else None
+
+def optimize_pdf(src, dst):
+    """Write a linearized, losslessly recompressed copy of src to dst; returns (tool, pages). Runs in a worker"""
+    if HAS_PIKEPDF:
+        with pikepdf.open(src, password='') as pdf:
+            pages = len(pdf.pages)
+            pdf.save(dst, linearize=True, object_stream_mode=pikepdf.ObjectStreamMode.generate,
+                     compress_streams=True, recompress_flate=True, encryption=KEEP_ENCRYPTION)
+        with pikepdf.open(dst, password='') as pdf:
+            written = len(pdf.pages)
+        tool = 'pikepdf'
+    else:
+        command = [QPDF, '--linearize', '--object-streams=generate', '--recompress-flate', '--compression-level=9']
+        if not KEEP_ENCRYPTION:
+            command.append('--decrypt')
+        result = subprocess.run(command + [src, dst], capture_output=True, text=True)
+        if result.returncode not in (0, 3):  # 3: written with warnings
+            raise RuntimeError(result.stderr.strip() or f"qpdf exited with {result.returncode}")
+        pages, written = _qpdf_pages(src), _qpdf_pages(dst)
+        tool = 'qpdf'
+    if written != pages:
+        raise ValueError(f"rewritten file has {written} pages, original {pages}")
+    return tool, pages
+
+def _install(manifest, targets, src, sha256):
+    """Point every village of `targets` at the rewritten file"""
+    stored = False
+    for village_id, filepath in targets:
+        entry = manifest['villages'].get(village_id)
+        if entry is not None:
+            if not stored:
+                store_blob(src, sha256)
+                stored = True
+            link_view(sha256, filepath)
+            entry.update({'sha256': sha256, 'size': os.path.getsize(filepath)})
+        else:
+            # Loose file outside the store: replace it in place
+            shutil.copy2(src, filepath + '.part')
+            os.replace(filepath + '.part', filepath)
+
+def optimize_archive(workers=OPTIMIZE_WORKERS, district_label=None):
+    """Rewrite every map not optimized yet; returns counts and byte totals"""
+    manifest = load_manifest()
+    log = load_optimize_log()
+    outputs = {entry['sha256'] for entry in log['blobs'].values()}
+    stats = {'optimized': 0, 'relinked': 0, 'skipped': 0, 'failed': 0, 'before': 0, 'after': 0}
+
+    # Group villages by content so shared originals are rewritten once
+    groups = defaultdict(list)
+    for item, filepath, sha256 in downloaded_maps(manifest, district_label):
+        if sha256 in outputs:
+            stats['skipped'] += 1
+        elif sha256 in log['blobs'] and os.path.exists(blob_path(log['blobs'][sha256]['sha256'])):
+            # Seen this original before (e.g. re-downloaded): reuse its rewritten blob
+            done = log['blobs'][sha256]
+            try:
+                _install(manifest, [(item['id'], filepath)], blob_path(done['sha256']), done['sha256'])
+            except OSError as e:
+                print(f"   ❌ {item['id']}: {type(e).__name__}: {e}")
+                stats['failed'] += 1
+                continue
+            stats['relinked'] += 1
+        else:
+            groups[sha256].append((item['id'], filepath))
+
+    print(f"🗜️  {len(groups)} maps to linearize ({stats['skipped']} already done) with {workers} workers")
+    started = time.time()
+    try:
+        with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = {}
+            for sha256, targets in groups.items():
+                src = targets[0][1]
+                futures[pool.submit(optimize_pdf, src, src + '.opt.part')] = (sha256, targets)
+            for done, future in enumerate(as_completed(futures), 1):
+                sha256, targets = futures[future]
+                src = targets[0][1]
+                tmp_path = src + '.opt.part'
+                try:
+                    tool, pages = future.result()
+                    new_sha256 = hash_file(tmp_path)
+                    before, after = os.path.getsize(src), os.path.getsize(tmp_path)
+                    _install(manifest, targets, tmp_path, new_sha256)
+                except Exception as e:
+                    print(f"   ❌ {targets[0][0]}: {type(e).__name__}: {e}")
+                    stats['failed'] += 1
+                    continue
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                log['blobs'][sha256] = {'sha256': new_sha256, 'before': before, 'after': after,
+                                        'pages': pages, 'tool': tool, 'optimized': datetime.now().isoformat()}
+                stats['optimized'] += 1
+                stats['before'] += before * len(targets)
+                stats['after'] += after * len(targets)
+                if done % SAVE_EVERY == 0:
+                    save_manifest(manifest)
+                    save_optimize_log(log)
+                    print(f"   {done}/{len(futures)} maps ({done / (time.time() - started):.1f}/s)")
+    finally:
+        save_manifest(manifest)
+        save_optimize_log(log)
+    return stats
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Linearize and losslessly recompress downloaded maps")
+    parser.add_argument('--workers', type=int, default=OPTIMIZE_WORKERS)
+    parser.add_argument('--district', help="Only one district (by label)")
+    parser.add_argument('--report', action='store_true', help="Only summarise the log")
+    args = parser.parse_args()
+
+    if not args.report:
+        if not (HAS_PIKEPDF or QPDF):
+            print("❌ Linearizing needs pikepdf or qpdf: pip install pikepdf", file=sys.stderr)
+            sys.exit(1)
+        stats = optimize_archive(args.workers, args.district)
+        saved = stats['before'] - stats['after']
+        print(f"✅ Linearized {stats['optimized']} maps ({stats['relinked']} relinked, {stats['skipped']} "
+              f"already done, {stats['failed']} failed), {saved / 1024 / 1024:+.1f} MB saved")
+
+    blobs = load_optimize_log()['blobs'].values()
+    before = sum(e['before'] for e in blobs)
+    after = sum(e['after'] for e in blobs)
+    print(f"📊 {OPTIMIZE_LOG}: {len(blobs)} originals, {before / 1024 / 1024:.1f} MB -> "
+          f"{after / 1024 / 1024:.1f} MB ({(after / before - 1) * 100 if before else 0:+.1f}%)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Packed archive format for the village map corpus
+Loose PDFs under village_maps/<district>/<taluk>/<hobli>/ are packed into
+uncompressed ZIP shards (one or more per district) plus an offset index, so any
+village's PDF can be read by village_id through mmap without unpacking.
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import zipfile
+from collections import defaultdict, deque
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from geodocs import DOWNLOAD_DIR, load_catalog, iter_villages, village_filepath, sanitize_filename
+
+PACK_DIR = "map_packs"
+PACK_INDEX_FILE = os.path.join(PACK_DIR, "index.json")
+SHARD_MAX_BYTES = 1024 * 1024 * 1024  # Start a new shard for a district after ~1 GB
+
+_LOCAL_HEADER = struct.Struct('<4sHHHHHIIIHH')  # ZIP local file header (30 bytes)
+
+def load_pack_index():
+    """Load the village_id -> (shard, offset, size, sha256) index"""
+    if os.path.exists(PACK_INDEX_FILE):
+        with open(PACK_INDEX_FILE, 'r') as f:
+            return json.load(f)
+    return {"shards": {}, "villages": {}}
+
+def save_pack_index(index):
+    """Save the pack index"""
+    os.makedirs(PACK_DIR, exist_ok=True)
+    tmp_path = PACK_INDEX_FILE + '.part'
+    with open(tmp_path, 'w') as f:
+        json.dump(index, f)
+    os.replace(tmp_path, PACK_INDEX_FILE)
+
+def shard_name(district, number):
+    """File name of a district shard"""
+    safe = re.sub(r'[^A-Za-z0-9_-]+', '_', sanitize_filename(district['label']))
+    return f"{district['value']}_{safe}-{number:03d}.zip"
+
+def data_offsets(shard_path):
+    """Byte offset and size of every member's data inside a stored ZIP"""
+    offsets = {}
+    with open(shard_path, 'rb') as raw, zipfile.ZipFile(shard_path) as zf:
+        for info in zf.infolist():
+            raw.seek(info.header_offset)
+            header = _LOCAL_HEADER.unpack(raw.read(_LOCAL_HEADER.size))
+            name_len, extra_len = header[9], header[10]
+            offsets[info.filename] = (info.header_offset + _LOCAL_HEADER.size + name_len + extra_len,
+                                      info.file_size)
+    return offsets
+
+def pack_district(district, items, index):
+    """Pack one district's PDFs into new shards and record their offsets
+
+    Loose files are packed; villages without one keep the bytes they already
+    have in the district's current shards. The new shards get numbers the
+    current ones do not use, so those stay readable until the caller has saved
+    the index. Returns (maps packed, maps carried over, shard names replaced).
+    """
+    old_shards = [n for n, s in index['shards'].items() if s['district'] == district['value']]
+    old_entries = {v: e for v, e in index['villages'].items() if e['district'] == district['value']}
+    sources = deque()  # (village_id, arcname, filepath or None)
+    for item in items:
+        filepath = village_filepath(item)
+        if os.path.exists(filepath):
+            sources.append((item['id'], os.path.relpath(filepath, DOWNLOAD_DIR).replace(os.sep, '/'), filepath))
+        elif item['id'] in old_entries:
+            sources.append((item['id'], old_entries[item['id']]['path'], None))
+    listed = {village_id for village_id, _, _ in sources}
+    sources.extend((v, e['path'], None) for v, e in old_entries.items() if v not in listed)
+
+    reader = MapPack(index)
+    new_shards = {}
+    new_entries = {}
+    shard_number = 0
+    packed = kept = 0
+    try:
+        while sources:
+            while shard_name(district, shard_number) in old_shards:
+                shard_number += 1
+            name = shard_name(district, shard_number)
+            shard_path = os.path.join(PACK_DIR, name)
+            members = {}
+            written = 0
+            with zipfile.ZipFile(shard_path + '.part', 'w', compression=zipfile.ZIP_STORED) as zf:
+                while sources and written < SHARD_MAX_BYTES:
+                    village_id, arcname, filepath = sources.popleft()
+                    if filepath is not None:
+                        with open(filepath, 'rb') as f:
+                            data = f.read()
+                        packed += 1
+                    else:
+                        data = reader.read(village_id, verify=True)
+                        kept += 1
+                    zf.writestr(zipfile.ZipInfo(arcname, date_time=(1980, 1, 1, 0, 0, 0)), data)
+                    members[arcname] = (village_id, hashlib.sha256(data).hexdigest())
+                    written += len(data)
+            os.replace(shard_path + '.part', shard_path)
+
+            for arcname, (offset, size) in data_offsets(shard_path).items():
+                village_id, sha256 = members[arcname]
+                new_entries[village_id] = {
+                    'district': district['value'],
+                    'shard': name,
+                    'path': arcname,
+                    'offset': offset,
+                    'size': size,
+                    'sha256': sha256
+                }
+            new_shards[name] = {'district': district['value'], 'bytes': os.path.getsize(shard_path)}
+            shard_number += 1
+    finally:
+        reader.close()
+
+    for name in old_shards:
+        del index['shards'][name]
+    for village_id in old_entries:
+        del index['villages'][village_id]
+    index['shards'].update(new_shards)
+    index['villages'].update(new_entries)
+    return packed, kept, old_shards
+
+def pack_archive(district_label=None):
+    """Convert the loose layout into packed shards (optionally one district)"""
+    os.makedirs(PACK_DIR, exist_ok=True)
+    index = load_pack_index()
+    by_district = defaultdict(list)
+    districts = {}
+    for item in iter_villages(load_catalog()):
+        by_district[item['district']['value']].append(item)
+        districts[item['district']['value']] = item['district']
+
+    total = 0
+    for value, items in by_district.items():
+        district = districts[value]
+        if district_label and district['label'].lower() != district_label.lower():
+            continue
+        packed, kept, replaced = pack_district(district, items, index)
+        # The old shards go only once the index no longer points into them
+        save_pack_index(index)
+        for name in replaced:
+            if name not in index['shards'] and os.path.exists(os.path.join(PACK_DIR, name)):
+                os.remove(os.path.join(PACK_DIR, name))
+        if packed or kept:
+            kept_note = f" ({kept} kept from earlier shards)" if kept else ""
+            print(f"   📦 {district['label']}: {packed} maps{kept_note}")
+        total += packed + kept
+    save_pack_index(index)
+    return total
+
+def unpack_archive(district_label=None):
+    """Convert packed shards back into the loose layout"""
+    reader = MapPack()
+    districts = {item['district']['value']: item['district']['label']
+                 for item in iter_villages(load_catalog())}
+    restored = 0
+    for village_id, entry in reader.index['villages'].items():
+        if district_label and districts.get(entry['district'], '').lower() != district_label.lower():
+            continue
+        filepath = os.path.join(DOWNLOAD_DIR, *entry['path'].split('/'))
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with open(filepath + '.part', 'wb') as f:
+            f.write(reader.read(village_id))
+        os.replace(filepath + '.part', filepath)
+        restored += 1
+    reader.close()
+    return restored
+
+class MapPack:
+    """Random-access reader over packed shards (memory-mapped, read-only)"""
+
+    def __init__(self, index=None):
+        self.index = index or load_pack_index()
+        self._maps = {}
+
+    def __contains__(self, village_id):
+        return village_id in self.index['villages']
+
+    def _shard(self, name):
+        shard = self._maps.get(name)
+        if shard is None:
+            with open(os.path.join(PACK_DIR, name), 'rb') as f:
+                shard = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[name] = shard
+        return shard
+
+    def view(self, village_id):
+        """Zero-copy memoryview of a village's PDF bytes"""
+        entry = self.index['villages'][village_id]
+        shard = self._shard(entry['shard'])
+        return memoryview(shard)[entry['offset']:entry['offset'] + entry['size']]
+
+    def read(self, village_id, verify=False):
+        """A village's PDF as bytes"""
+        entry = self.index['villages'][village_id]
+        data = self._shard(entry['shard'])[entry['offset']:entry['offset'] + entry['size']]
+        if verify and hashlib.sha256(data).hexdigest() != self.index['villages'][village_id]['sha256']:
+            raise ValueError(f"Checksum mismatch for {village_id}")
+        return data
+
+    def close(self):
+        """Unmap all shards"""
+        for shard in self._maps.values():
+            try:
+                shard.close()
+            except BufferError:
+                pass  # A caller still holds a view; the map closes when it is released
+        self._maps = {}
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Convert between loose and packed map layouts")
+    sub = parser.add_subparsers(dest='command', required=True)
+    pack = sub.add_parser('pack', help="Loose village_maps/ -> map_packs/")
+    pack.add_argument('--district', help="Only (re)pack one district (by label)")
+    unpack = sub.add_parser('unpack', help="map_packs/ -> loose village_maps/")
+    unpack.add_argument('--district', help="Only unpack one district (by label)")
+    get = sub.add_parser('get', help="Read one village's PDF by village_id")
+    get.add_argument('village_id')
+    get.add_argument('-o', '--output', help="Output file (default: stdout)")
+    args = parser.parse_args()
+
+    if args.command == 'pack':
+        print(f"📦 Packing {DOWNLOAD_DIR}/ into {PACK_DIR}/...")
+        print(f"✅ Packed {pack_archive(args.district)} maps (index: {PACK_INDEX_FILE})")
+    elif args.command == 'unpack':
+        print(f"📂 Unpacking {PACK_DIR}/ into {DOWNLOAD_DIR}/...")
+        print(f"✅ Restored {unpack_archive(args.district)} maps")
+    else:
+        reader = MapPack()
+        if args.village_id not in reader:
+            print(f"❌ {args.village_id} is not in the pack index", file=sys.stderr)
+            sys.exit(1)
+        data = reader.read(args.village_id, verify=True)
+        if args.output:
+            with open(args.output, 'wb') as f:
+                f.write(data)
+        else:
+            sys.stdout.buffer.write(data)
+        reader.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Local HTTP server for downloaded village maps
+Serves each village's PDF from village_maps/ (or from the packed shards of
+map_pack.py) by village_id or by its district/taluk/hobli/village label path,
+and the tile pyramids rendered by map_tiles.py under /tiles/.
+Responses carry a strong ETag (the stored SHA-256), Cache-Control and
+Accept-Ranges, so repeat opens are a 304 and viewers can fetch byte ranges.
+File bodies go out with loop.sendfile() (os.sendfile where the platform has it).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import Counter
+from email.utils import formatdate
+from urllib.parse import unquote, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from geodocs import DOWNLOAD_DIR, load_catalog, iter_villages, village_filepath
+from geodocs.http_cache import normalize_value
+from map_pack import PACK_DIR, load_pack_index
+from map_store import MANIFEST_FILE, hash_file, load_manifest
+from map_tiles import TileReader
+
+MAP_SERVER_PORT = 8090
+CACHE_MAX_AGE = 7 * 24 * 3600  # Cache-Control max-age; maps change rarely and the ETag catches updates
+KEEPALIVE_TIMEOUT = 15  # Seconds an idle keep-alive connection is kept open
+RELOAD_INTERVAL = 10  # Seconds between checks for a newer manifest / pack index
+MAX_HEADER_BYTES = 16 * 1024
+
+STATUS_TEXT = {200: 'OK', 206: 'Partial Content', 304: 'Not Modified', 400: 'Bad Request',
+               404: 'Not Found', 405: 'Method Not Allowed', 416: 'Range Not Satisfiable'}
+
+def label_path_key(path):
+    """Lookup key of a district/taluk/hobli/village(.pdf) path"""
+    if path.lower().endswith('.pdf'):
+        path = path[:-4]
+    return tuple(normalize_value(part) for part in path.strip('/').split('/'))
+
+def parse_range(header, size):
+    """(start, end) inclusive for a single `bytes=` range, None to send everything, 'invalid' if unsatisfiable"""
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None  # Missing, other units or multiple ranges: send the whole file
+    first, _, last = header[6:].strip().partition('-')
+    try:
+        if not first:
+            length = int(last)
+            if length <= 0:
+                return 'invalid'
+            return max(0, size - length), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        return 'invalid'
+    return start, min(end, size - 1)
+
+class MapLocator:
+    """Finds a village's PDF bytes (file, offset, size) and its ETag"""
+
+    def __init__(self):
+        self.by_id = {}
+        self.by_path = {}
+        for item in iter_villages(load_catalog()):
+            self.by_id[item['id']] = item
+            self.by_path[label_path_key(os.path.relpath(village_filepath(item), DOWNLOAD_DIR))] = item
+        self.manifest = {}
+        self.pack = {}
+        self._mtimes = {}
+        self._checked = 0
+        self._hashes = {}  # (path, size, mtime) -> sha256 for files the manifest doesn't know
+        self.reload()
+
+    def _changed(self, path):
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return False
+        if self._mtimes.get(path) == mtime:
+            return False
+        self._mtimes[path] = mtime
+        return True
+
+    def reload(self):
+        """Re-read the store manifest and pack index if they changed"""
+        self._checked = time.time()
+        if self._changed(MANIFEST_FILE):
+            self.manifest = load_manifest()['villages']
+        pack_index = os.path.join(PACK_DIR, 'index.json')
+        if self._changed(pack_index):
+            self.pack = load_pack_index()['villages']
+
+    def find(self, path):
+        """Catalog item for /maps/<village_id> or /maps/<district>/<taluk>/<hobli>/<village>.pdf"""
+        name = path[:-4] if path.lower().endswith('.pdf') else path
+        return self.by_id.get(name) or self.by_path.get(label_path_key(path))
+
+    def locate(self, item):
+        """{'path', 'offset', 'size', 'mtime', 'sha256'} of a village's PDF, or None"""
+        if time.time() - self._checked > RELOAD_INTERVAL:
+            self.reload()
+        filepath = village_filepath(item)
+        try:
+            stat = os.stat(filepath)
+        except OSError:
+            stat = None
+        if stat is not None:
+            sha256 = self.manifest.get(item['id'], {}).get('sha256')
+            if not sha256 or self.manifest[item['id']].get('size') != stat.st_size:
+                key = (filepath, stat.st_size, stat.st_mtime)
+                sha256 = self._hashes.get(key)
+                if sha256 is None:
+                    sha256 = self._hashes[key] = hash_file(filepath)
+            return {'path': filepath, 'offset': 0, 'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': sha256}
+        entry = self.pack.get(item['id'])
+        if entry is not None:
+            shard = os.path.join(PACK_DIR, entry['shard'])
+            return {'path': shard, 'offset': entry['offset'], 'size': entry['size'],
+                    'mtime': os.path.getmtime(shard), 'sha256': entry['sha256']}
+        return None
+
+class MapServer:
+    """asyncio HTTP/1.1 server for GET/HEAD of map PDFs"""
+
+    def __init__(self, locator=None, tiles=None):
+        self.locator = locator or MapLocator()
+        self.tiles = tiles or TileReader()
+        self.stats = Counter()
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEPALIVE_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                        ConnectionError):
+                    break
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, version = lines[0].split(' ', 2)
+                except ValueError:
+                    await self.send(writer, 400, {}, close=True)
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    name, sep, value = line.partition(':')
+                    if sep:
+                        headers[name.strip().lower()] = value.strip()
+                close = (headers.get('connection', '').lower() == 'close'
+                         or (version == 'HTTP/1.0' and headers.get('connection', '').lower() != 'keep-alive'))
+                await self.respond(writer, method, unquote(urlsplit(target).path), headers, close)
+                if close:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, method, path, headers, close):
+        if method not in ('GET', 'HEAD'):
+            await self.send(writer, 405, {'Allow': 'GET, HEAD'}, close=close)
+            return
+        if path == '/health':
+            body = json.dumps({'status': 'ok', 'stats': dict(self.stats)}).encode()
+            await self.send(writer, 200, {'Content-Type': 'application/json'}, body, close=close,
+                            head_only=method == 'HEAD')
+            return
+        if path.startswith('/tiles/'):
+            await self.respond_tile(writer, method, path[len('/tiles/'):], headers, close)
+            return
+        item = self.locator.find(path[len('/maps/'):]) if path.startswith('/maps/') else None
+        # locate() may hash a file the manifest doesn't know; keep that off the event loop
+        found = await asyncio.get_running_loop().run_in_executor(None, self.locator.locate, item) if item else None
+        if found is None:
+            self.stats['missing'] += 1
+            await self.send(writer, 404, {'Content-Type': 'text/plain'}, b'map not downloaded', close=close,
+                            head_only=method == 'HEAD')
+            return
+
+        etag = f'"{found["sha256"]}"'
+        common = {
+            'ETag': etag,
+            'Cache-Control': f'public, max-age={CACHE_MAX_AGE}',
+            'Last-Modified': formatdate(found['mtime'], usegmt=True),
+            'Accept-Ranges': 'bytes',
+        }
+        if etag in [t.strip() for t in headers.get('if-none-match', '').split(',')] \
+                or headers.get('if-none-match') == '*':
+            self.stats['not_modified'] += 1
+            await self.send(writer, 304, common, close=close)
+            return
+
+        size = found['size']
+        wanted = parse_range(headers.get('range'), size)
+        if headers.get('if-range') and headers['if-range'] != etag:
+            wanted = None  # The client's partial copy is outdated: send the whole file
+        if wanted == 'invalid':
+            self.stats['unsatisfiable'] += 1
+            await self.send(writer, 416, dict(common, **{'Content-Range': f'bytes */{size}'}), close=close)
+            return
+        common['Content-Type'] = 'application/pdf'
+        if wanted is None:
+            status, start, length = 200, 0, size
+        else:
+            status, start, length = 206, wanted[0], wanted[1] - wanted[0] + 1
+            common['Content-Range'] = f'bytes {wanted[0]}-{wanted[1]}/{size}'
+        self.stats['partial' if status == 206 else 'full'] += 1
+        await self.send(writer, status, common, close=close, length=length,
+                        file=None if method == 'HEAD' else (found['path'], found['offset'] + start))
+
+    async def respond_tile(self, writer, method, path, headers, close):
+        """/tiles/<village_id>.json (pyramid size) or /tiles/<village_id>[/p<page>]/<z>/<x>/<y>.<format>"""
+        parts = path.split('/')
+        page = 1
+        if len(parts) == 5 and parts[1].startswith('p') and parts[1][1:].isdigit():
+            page = int(parts.pop(1)[1:])
+        village_id = parts[0][:-5] if len(parts) == 1 and parts[0].endswith('.json') else parts[0]
+        loop = asyncio.get_running_loop()
+        info = await loop.run_in_executor(None, self.tiles.info, village_id, page)
+        body = None
+        if info and len(parts) == 1:
+            body, content_type = json.dumps(info).encode(), 'application/json'
+        elif info and len(parts) == 4 and parts[1].isdigit() and parts[2].isdigit() \
+                and parts[3].partition('.')[0].isdigit():
+            zoom, column, row = int(parts[1]), int(parts[2]), int(parts[3].partition('.')[0])
+            body = await loop.run_in_executor(None, self.tiles.tile, village_id, zoom, column, row, page)
+            content_type = 'image/png' if info['format'] == 'png' else 'image/jpeg'
+        if body is None:
+            self.stats['tile_missing'] += 1
+            await self.send(writer, 404, {'Content-Type': 'text/plain'}, b'tile not rendered', close=close,
+                            head_only=method == 'HEAD')
+            return
+        # Tiles only change with their map, so the map's hash makes a strong ETag
+        etag = f'"{info["sha256"][:16]}-{page}-{"-".join(parts[1:]).partition(".")[0] or "info"}"'
+        common = {'ETag': etag, 'Cache-Control': f'public, max-age={CACHE_MAX_AGE}', 'Content-Type': content_type}
+        if etag in [t.strip() for t in headers.get('if-none-match', '').split(',')]:
+            self.stats['not_modified'] += 1
+            await self.send(writer, 304, common, close=close)
+            return
+        self.stats['tile'] += 1
+        await self.send(writer, 200, common, body, close=close, head_only=method == 'HEAD')
+
+    async def send(self, writer, status, headers, body=b'', close=False, length=None, file=None, head_only=False):
+        lines = [f'HTTP/1.1 {status} {STATUS_TEXT[status]}',
+                 f'Date: {formatdate(usegmt=True)}',
+                 'Access-Control-Allow-Origin: *',
+                 f'Content-Length: {len(body) if length is None else length}']
+        lines += [f'{name}: {value}' for name, value in headers.items()]
+        if close:
+            lines.append('Connection: close')
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        if body and not head_only:
+            writer.write(body)
+        await writer.drain()
+        if file is not None and length:
+            path, offset = file
+            with open(path, 'rb') as f:
+                await asyncio.get_running_loop().sendfile(writer.transport, f, offset, length)
+
+async def serve(host, port):
+    """Run the server until cancelled"""
+    map_server = MapServer()
+    server = await asyncio.start_server(map_server.handle, host, port, limit=MAX_HEADER_BYTES)
+    print(f"🗺️  Serving {len(map_server.locator.by_id)} catalog villages on http://localhost:{port}/maps/<village_id>")
+    async with server:
+        await server.serve_forever()
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Serve downloaded village maps with ETags and range requests")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=MAP_SERVER_PORT)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\n⚠️  Stopped")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Content-addressed store for village map PDFs
+Every unique PDF is kept once under map_blobs/ keyed by its SHA-256.
+The usual village_maps/<district>/<taluk>/<hobli>/<village>.pdf hierarchy is a
+view made of hardlinks (or symlinks) into the store, described by a manifest.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from geodocs import DOWNLOAD_DIR, load_catalog, iter_villages, village_filepath
+
+BLOB_DIR = "map_blobs"
+MANIFEST_FILE = "map_manifest.json"
+LINK_MODE = "hardlink"  # "hardlink", "symlink" or "copy"
+
+def hash_file(path):
+    """SHA-256 of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def blob_path(sha256):
+    """Location of a blob inside the store"""
+    return os.path.join(BLOB_DIR, sha256[:2], f"{sha256}.pdf")
+
+def load_manifest():
+    """Load the store manifest"""
+    if os.path.exists(MANIFEST_FILE):
+        with open(MANIFEST_FILE, 'r') as f:
+            return json.load(f)
+    return {"villages": {}, "unassigned": {}}
+
+def save_manifest(manifest):
+    """Save the store manifest"""
+    tmp_path = MANIFEST_FILE + '.part'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, MANIFEST_FILE)
+
+def url_index(manifest):
+    """Map each recorded download URL to the blob it produced"""
+    return {entry['url']: entry['sha256']
+            for entry in manifest['villages'].values() if entry.get('url')}
+
+def store_blob(src_path, sha256):
+    """Move a file into the store unless an identical blob is already there"""
+    target = blob_path(sha256)
+    if os.path.exists(target):
+        return target
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.copy2(src_path, target + '.part')
+    os.replace(target + '.part', target)
+    os.chmod(target, 0o444)  # Views share the inode; never write through them
+    return target
+
+def link_view(sha256, filepath):
+    """Point a hierarchy path at a blob, replacing whatever is there"""
+    target = blob_path(sha256)
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    if os.path.exists(filepath) and os.path.samefile(target, filepath):
+        return
+    tmp_path = filepath + '.link'
+    if os.path.lexists(tmp_path):
+        os.remove(tmp_path)
+    if LINK_MODE == "hardlink":
+        try:
+            os.link(target, tmp_path)
+        except OSError:
+            # Different filesystem or no hardlink support
+            os.symlink(os.path.abspath(target), tmp_path)
+    elif LINK_MODE == "symlink":
+        os.symlink(os.path.abspath(target), tmp_path)
+    else:
+        shutil.copy2(target, tmp_path)
+    os.replace(tmp_path, filepath)
+
+def ingest_file(manifest, village_id, filepath, pdf_url=None):
+    """Move a downloaded PDF into the store and replace it with a view link"""
+    sha256 = hash_file(filepath)
+    store_blob(filepath, sha256)
+    link_view(sha256, filepath)
+    entry = manifest['villages'].get(village_id, {})
+    entry.update({
+        'sha256': sha256,
+        'size': os.path.getsize(filepath),
+        'path': os.path.relpath(filepath, DOWNLOAD_DIR),
+        'stored': datetime.now().isoformat()
+    })
+    if pdf_url:
+        entry['url'] = pdf_url
+    manifest['villages'][village_id] = entry
+    return sha256
+
+def link_existing(manifest, village_id, filepath, sha256, pdf_url=None):
+    """Create a village's view from a blob that is already stored (no transfer)"""
+    link_view(sha256, filepath)
+    manifest['villages'][village_id] = {
+        'sha256': sha256,
+        'size': os.path.getsize(filepath),
+        'path': os.path.relpath(filepath, DOWNLOAD_DIR),
+        'url': pdf_url,
+        'stored': datetime.now().isoformat()
+    }
+
+def downloaded_maps(manifest=None, district_label=None):
+    """Yield (item, filepath, sha256) for every downloaded village map
+
+    The hash comes from the manifest while the file still has the recorded
+    size, otherwise the file is hashed.
+    """
+    manifest = manifest if manifest is not None else load_manifest()
+    for item in iter_villages(load_catalog()):
+        if district_label and item['district']['label'].lower() != district_label.lower():
+            continue
+        filepath = village_filepath(item)
+        try:
+            size = os.path.getsize(filepath)
+        except OSError:
+            continue
+        entry = manifest['villages'].get(item['id'], {})
+        sha256 = entry.get('sha256') if entry.get('size') == size else None
+        yield item, filepath, sha256 or hash_file(filepath)
+
+def ingest_archive():
+    """Move every PDF under DOWNLOAD_DIR into the store
+
+    Files are mapped back to villages through the catalog; PDFs that match no
+    village (e.g. stray FileDownload.pdf copies) are stored as unassigned.
+    """
+    manifest = load_manifest()
+    path_to_id = {os.path.normpath(village_filepath(item)): item['id']
+                  for item in iter_villages(load_catalog())}
+
+    ingested = 0
+    for root, dirs, files in os.walk(DOWNLOAD_DIR):
+        for name in files:
+            if not name.lower().endswith('.pdf'):
+                continue
+            filepath = os.path.normpath(os.path.join(root, name))
+            village_id = path_to_id.get(filepath)
+            if village_id:
+                ingest_file(manifest, village_id, filepath)
+            else:
+                sha256 = hash_file(filepath)
+                store_blob(filepath, sha256)
+                link_view(sha256, filepath)
+                manifest['unassigned'][os.path.relpath(filepath, DOWNLOAD_DIR)] = sha256
+            ingested += 1
+
+    save_manifest(manifest)
+    return ingested, manifest
+
+def dedup_report(manifest):
+    """Summarise how much the store saves over loose files"""
+    entries = list(manifest['villages'].values())
+    shas = [e['sha256'] for e in entries] + list(manifest['unassigned'].values())
+    unique = set(shas)
+    sizes = {e['sha256']: e['size'] for e in entries}
+    for sha in manifest['unassigned'].values():
+        if sha not in sizes and os.path.exists(blob_path(sha)):
+            sizes[sha] = os.path.getsize(blob_path(sha))
+
+    logical = sum(sizes.get(sha, 0) for sha in shas)
+    physical = sum(sizes.get(sha, 0) for sha in unique)
+    return {
+        'files': len(shas),
+        'unique_blobs': len(unique),
+        'duplicates': len(shas) - len(unique),
+        'duplicate_rate': (len(shas) - len(unique)) / len(shas) if shas else 0.0,
+        'logical_bytes': logical,
+        'stored_bytes': physical,
+        'saved_bytes': logical - physical
+    }
+
+def print_report(report):
+    """Print the deduplication report"""
+    print("="*60)
+    print("📦 Map Store Report:")
+    print("="*60)
+    print(f"   📄 Files in hierarchy: {report['files']}")
+    print(f"   🧩 Unique blobs: {report['unique_blobs']}")
+    print(f"   ♊ Duplicates: {report['duplicates']} ({report['duplicate_rate'] * 100:.1f}%)")
+    print(f"   💾 Logical size: {report['logical_bytes'] / 1024 / 1024:.1f} MB")
+    print(f"   💾 Stored size: {report['stored_bytes'] / 1024 / 1024:.1f} MB")
+    print(f"   ✨ Saved: {report['saved_bytes'] / 1024 / 1024:.1f} MB")
+    print("="*60)
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Content-addressed store for village maps")
+    parser.add_argument('command', choices=['ingest', 'report'],
+                        help="ingest: move village_maps/ into the store; report: show duplicate rate")
+    args = parser.parse_args()
+
+    if args.command == 'ingest':
+        print(f"📥 Ingesting {DOWNLOAD_DIR}/ into {BLOB_DIR}/...")
+        ingested, manifest = ingest_archive()
+        print(f"✅ Ingested {ingested} files ({len(manifest['unassigned'])} unassigned)")
+    else:
+        manifest = load_manifest()
+    print_report(dedup_report(manifest))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Raster tile pyramids for the village maps
+Renders each downloaded PDF page into a zoomable pyramid of 256 px tiles
+(level 0 fits the page in one tile, each level doubles the resolution up to
+RENDER_DPI) in a process pool, and stores the tiles in one MBTiles-style
+SQLite file per district. Maps whose hash is unchanged since they were
+rendered are skipped. map_server.py serves the tiles, so a viewer fetches only
+what is on screen instead of the whole vector PDF.
+
+Rendering needs PyMuPDF (`pip install pymupdf`).
+"""
+
+import argparse
+import math
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+try:
+    import fitz  # PyMuPDF
+    HAS_FITZ = True
+except ImportError:
+    HAS_FITZ = False
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from geodocs import sanitize_filename
+from map_store import downloaded_maps
+
+TILE_DIR = "map_tiles"
+TILE_SIZE = 256
+RENDER_DPI = 300  # Resolution of the deepest zoom level
+TILE_FORMAT = "png"  # "png" (crisp line work) or "jpg" (smaller for scanned maps)
+TILE_WORKERS = os.cpu_count() or 2  # Rendering processes
+MAX_PAGES = 4  # Pages rendered per map (village maps are usually one page)
+IN_FLIGHT_PER_WORKER = 2  # Maps queued per rendering process (bounds the tiles held in memory)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS maps (
+    village_id TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    max_zoom INTEGER NOT NULL,
+    rendered REAL NOT NULL,
+    PRIMARY KEY (village_id, page)
+);
+CREATE TABLE IF NOT EXISTS tiles (
+    village_id TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    zoom_level INTEGER NOT NULL,
+    tile_column INTEGER NOT NULL,
+    tile_row INTEGER NOT NULL,
+    tile_data BLOB NOT NULL,
+    PRIMARY KEY (village_id, page, zoom_level, tile_column, tile_row)
+);
+"""
+
+def tileset_path(district):
+    """Tile file of a district"""
+    safe = re.sub(r'[^A-Za-z0-9_-]+', '_', sanitize_filename(district['label']))
+    return os.path.join(TILE_DIR, f"{district['value']}_{safe}.mbtiles")
+
+def open_tileset(path):
+    """Open (and create) a district's tile file"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    db = sqlite3.connect(path, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.executescript(_SCHEMA)
+    db.executemany("INSERT OR REPLACE INTO metadata (name, value) VALUES (?, ?)", [
+        ('format', TILE_FORMAT), ('tile_size', str(TILE_SIZE)), ('scheme', 'xyz'), ('type', 'overlay')])
+    return db
+
+def pyramid_levels(width, height):
+    """Deepest zoom level: the page at RENDER_DPI fits 2^level tiles across"""
+    return max(0, math.ceil(math.log2(max(width, height, 1) / TILE_SIZE)))
+
+def render_tiles(path):
+    """[(page, width, height, max_zoom, [(zoom, column, row, bytes)])] for one map; runs in a worker"""
+    pages = []
+    with fitz.open(path) as doc:
+        if doc.needs_pass:
+            doc.authenticate('')
+        for number, page in enumerate(doc, 1):
+            if number > MAX_PAGES:
+                break
+            full_scale = RENDER_DPI / 72
+            width = math.ceil(page.rect.width * full_scale)
+            height = math.ceil(page.rect.height * full_scale)
+            max_zoom = pyramid_levels(width, height)
+            tiles = []
+            for zoom in range(max_zoom + 1):
+                scale = full_scale / 2 ** (max_zoom - zoom)
+                matrix = fitz.Matrix(scale, scale)
+                step = TILE_SIZE / scale  # Tile edge in page units
+                columns = math.ceil(page.rect.width / step)
+                rows = math.ceil(page.rect.height / step)
+                for row in range(rows):
+                    for column in range(columns):
+                        clip = fitz.Rect(page.rect.x0 + column * step, page.rect.y0 + row * step,
+                                         page.rect.x0 + (column + 1) * step, page.rect.y0 + (row + 1) * step)
+                        pixmap = page.get_pixmap(matrix=matrix, clip=clip & page.rect, alpha=False)
+                        tiles.append((zoom, column, row, pixmap.tobytes(TILE_FORMAT)))
+            pages.append((number, width, height, max_zoom, tiles))
+    return pages
+
+def build_tiles(workers=TILE_WORKERS, district_label=None, force=False):
+    """Render new and changed maps; returns counts of rendered, skipped and failed maps and tiles written"""
+    by_district = defaultdict(list)
+    districts = {}
+    for item, filepath, sha256 in downloaded_maps(district_label=district_label):
+        districts[item['district']['value']] = item['district']
+        by_district[item['district']['value']].append((item['id'], filepath, sha256))
+
+    stats = {'rendered': 0, 'skipped': 0, 'failed': 0, 'tiles': 0}
+    started = time.time()
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+        for value, maps in by_district.items():
+            db = open_tileset(tileset_path(districts[value]))
+            known = {v: s for v, s in db.execute("SELECT village_id, sha256 FROM maps WHERE page = 1")}
+            todo = [m for m in maps if force or known.get(m[0]) != m[2]]
+            stats['skipped'] += len(maps) - len(todo)
+            print(f"🗺️  {districts[value]['label']}: {len(todo)} maps to render ({len(maps) - len(todo)} unchanged)")
+            queued = iter(todo)
+            futures = {}
+            while True:
+                # Keep a few maps per process in flight; each result holds all of a map's tiles
+                for village_id, filepath, sha256 in queued:
+                    futures[pool.submit(render_tiles, filepath)] = (village_id, sha256)
+                    if len(futures) >= max(1, workers) * IN_FLIGHT_PER_WORKER:
+                        break
+                if not futures:
+                    break
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                while done:
+                    future = done.pop()
+                    village_id, sha256 = futures.pop(future)
+                    try:
+                        pages = future.result()
+                    except Exception as e:
+                        print(f"   ❌ {village_id}: {type(e).__name__}: {e}")
+                        stats['failed'] += 1
+                        continue
+                    db.execute("DELETE FROM tiles WHERE village_id = ?", (village_id,))
+                    db.execute("DELETE FROM maps WHERE village_id = ?", (village_id,))
+                    for number, width, height, max_zoom, tiles in pages:
+                        db.executemany(
+                            "INSERT INTO tiles (village_id, page, zoom_level, tile_column, tile_row, tile_data) "
+                            "VALUES (?, ?, ?, ?, ?, ?)",
+                            [(village_id, number, z, x, y, data) for z, x, y, data in tiles])
+                        db.execute("INSERT INTO maps (village_id, page, sha256, width, height, max_zoom, rendered) "
+                                   "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                   (village_id, number, sha256, width, height, max_zoom, time.time()))
+                        stats['tiles'] += len(tiles)
+                    db.commit()
+                    stats['rendered'] += 1
+            db.close()
+    stats['seconds'] = time.time() - started
+    return stats
+
+class TileReader:
+    """Read-only access to the district tile files by village_id"""
+
+    def __init__(self):
+        self._dbs = {}
+        self._lock = threading.Lock()
+
+    def _query(self, village_id, sql, params):
+        district = village_id.split('_', 1)[0]
+        with self._lock:
+            if district not in self._dbs:
+                names = [n for n in os.listdir(TILE_DIR) if n.startswith(f"{district}_") and n.endswith('.mbtiles')] \
+                    if os.path.isdir(TILE_DIR) else []
+                if not names:
+                    return None  # Not rendered (yet); looked up again next time
+                self._dbs[district] = sqlite3.connect(
+                    f"file:{os.path.join(TILE_DIR, names[0])}?mode=ro", uri=True, check_same_thread=False)
+            return self._dbs[district].execute(sql, params).fetchone()
+
+    def info(self, village_id, page=1):
+        """{'sha256', 'width', 'height', 'max_zoom', 'tile_size', 'format'} of a rendered page, or None"""
+        row = self._query(village_id, "SELECT sha256, width, height, max_zoom FROM maps "
+                          "WHERE village_id = ? AND page = ?", (village_id, page))
+        if not row:
+            return None
+        return {'sha256': row[0], 'width': row[1], 'height': row[2], 'max_zoom': row[3],
+                'tile_size': TILE_SIZE, 'format': TILE_FORMAT}
+
+    def tile(self, village_id, zoom, column, row, page=1):
+        """Tile bytes, or None"""
+        found = self._query(village_id, "SELECT tile_data FROM tiles WHERE village_id = ? AND page = ? "
+                            "AND zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                            (village_id, page, zoom, column, row))
+        return found[0] if found else None
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Render village maps into tile pyramids")
+    parser.add_argument('--workers', type=int, default=TILE_WORKERS)
+    parser.add_argument('--district', help="Only one district (by label)")
+    parser.add_argument('--force', action='store_true', help="Re-render every map")
+    args = parser.parse_args()
+
+    if not HAS_FITZ:
+        print("❌ Rendering needs PyMuPDF: pip install pymupdf", file=sys.stderr)
+        sys.exit(1)
+    stats = build_tiles(args.workers, args.district, args.force)
+    print(f"✅ Rendered {stats['rendered']} maps ({stats['tiles']} tiles) in {stats['seconds']:.0f}s, "
+          f"{stats['skipped']} unchanged, {stats['failed']} failed -> {TILE_DIR}/")
+
+if __name__ == "__main__":
+    main()
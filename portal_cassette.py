@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Record and replay portal traffic for offline, repeatable benchmarks
+`record` runs a local reverse proxy in front of the portal and writes every
+exchange (form posts with their ViewState, grid pages, PDF bytes) to a
+cassette. `replay` serves a cassette back with the recorded latency, scaled or
+none. Point the tools at either one with GEODOCS_BASE_URL.
+"""
+
+import argparse
+import base64
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from geodocs.config import PORTAL_URL
+
+CASSETTE_DIR = "cassettes"
+DEFAULT_PORT = 8800
+# Form fields that differ between sessions without changing the answer
+VOLATILE_FIELDS = ('__VIEWSTATE', '__VIEWSTATEGENERATOR', '__VIEWSTATEENCRYPTED',
+                   '__EVENTVALIDATION', '__LASTFOCUS')
+HOP_HEADERS = ('connection', 'keep-alive', 'transfer-encoding', 'content-encoding',
+               'content-length', 'proxy-connection', 'upgrade', 'te', 'trailer')
+TEXT_TYPES = ('text/', 'javascript', 'json', 'xml')
+
+def origin(url):
+    """scheme://host[:port] of a URL"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+def request_key(method, path, body, content_type):
+    """Match key for an exchange: method, path and the meaningful form fields"""
+    if 'application/x-www-form-urlencoded' in (content_type or ''):
+        fields = []
+        for name, value in parse_qsl(body.decode('utf-8', 'replace'), keep_blank_values=True):
+            if name in VOLATILE_FIELDS:
+                continue
+            if name.endswith('.x') or name.endswith('.y'):
+                value = ''  # Click coordinates of an image button
+            fields.append((name, value))
+        return f"{method} {path} {urlencode(sorted(fields))}"
+    if body:
+        return f"{method} {path} sha256={hashlib.sha256(body).hexdigest()}"
+    return f"{method} {path}"
+
+def rewrite_headers(headers, upstream, local):
+    """Make upstream response headers usable on the local origin"""
+    rewritten = []
+    for name, value in headers:
+        lower = name.lower()
+        if lower in HOP_HEADERS:
+            continue
+        if lower == 'location':
+            value = value.replace(upstream, local)
+        elif lower == 'set-cookie':
+            # Cookies must stick to 127.0.0.1 over plain HTTP
+            value = re.sub(r';\s*(Domain=[^;]*|Secure|SameSite=[^;]*)', '', value, flags=re.IGNORECASE)
+        rewritten.append((name, value))
+    return rewritten
+
+def rewrite_body(body, headers, upstream, local):
+    """Point absolute portal URLs in text bodies (form action, scripts) at the local origin"""
+    content_type = next((v for k, v in headers if k.lower() == 'content-type'), '')
+    if any(t in content_type for t in TEXT_TYPES):
+        return body.replace(upstream.encode(), local.encode())
+    return body
+
+class CassetteWriter:
+    """Append-only gzip JSON-lines cassette; bodies are stored once per SHA-256"""
+
+    def __init__(self, path, upstream_url):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self._file = gzip.open(path, 'wt', encoding='utf-8')
+        self._lock = threading.Lock()
+        self._bodies = set()
+        self._start = time.time()
+        self.exchanges = 0
+        self._write({'cassette': 1, 'upstream': origin(upstream_url), 'base_url': upstream_url,
+                     'recorded': datetime.now().isoformat()})
+
+    def _write(self, record):
+        self._file.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+    def record(self, key, method, path, status, headers, body, elapsed):
+        """Store one exchange"""
+        sha256 = hashlib.sha256(body).hexdigest()
+        with self._lock:
+            if sha256 not in self._bodies:
+                self._bodies.add(sha256)
+                self._write({'body': sha256, 'data': base64.b64encode(body).decode('ascii')})
+            self._write({
+                'key': key, 'method': method, 'path': path, 'status': status,
+                'headers': headers, 'body_sha256': sha256,
+                'elapsed': round(elapsed, 4), 'at': round(time.time() - self._start, 4)
+            })
+            self._file.flush()
+            self.exchanges += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+def load_cassette(path):
+    """Read a cassette: (header, exchanges in recorded order, bodies by SHA-256)"""
+    header, exchanges, bodies = None, [], {}
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break  # Truncated by an interrupted recording
+            if 'cassette' in record:
+                header = record
+            elif 'data' in record:
+                bodies[record['body']] = base64.b64decode(record['data'])
+            else:
+                exchanges.append(record)
+    return header, exchanges, bodies
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the real portal
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _send(self, status, headers, body):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def do_GET(self):
+        self.handle_exchange()
+
+    def do_POST(self):
+        self.handle_exchange()
+
+    def do_HEAD(self):
+        self.handle_exchange()
+
+class RecordingProxy(_Handler):
+    """Forward to the portal and record each exchange"""
+
+    server_state = None  # {'upstream', 'local', 'writer', 'sessions'}
+
+    def handle_exchange(self):
+        state = self.server_state
+        body = self._read_body()
+        headers = {k: v.replace(state['local'], state['upstream'])
+                   for k, v in self.headers.items()
+                   if k.lower() not in HOP_HEADERS and k.lower() not in ('host', 'accept-encoding')}
+        session = getattr(state['sessions'], 'session', None)
+        if session is None:
+            session = state['sessions'].session = requests.Session()
+        started = time.time()
+        try:
+            response = session.request(self.command, state['upstream'] + self.path, headers=headers,
+                                       data=body or None, allow_redirects=False, timeout=60)
+            content = response.content
+        except requests.RequestException as e:
+            session.cookies.clear()
+            self._send(502, [('Content-Type', 'text/plain')], str(e).encode())
+            return
+        elapsed = time.time() - started
+        session.cookies.clear()  # The client holds the cookies; never mix sessions here
+        raw_headers = [(k, v) for k, v in response.raw.headers.items()]
+        key = request_key(self.command, self.path, body, self.headers.get('Content-Type'))
+        state['writer'].record(key, self.command, self.path, response.status_code, raw_headers, content, elapsed)
+        local_headers = rewrite_headers(raw_headers, state['upstream'], state['local'])
+        self._send(response.status_code, local_headers,
+                   rewrite_body(content, raw_headers, state['upstream'], state['local']))
+
+class ReplayServer(_Handler):
+    """Serve recorded exchanges by request key, in recorded order"""
+
+    server_state = None  # {'upstream', 'local', 'queues', 'bodies', 'scale', 'lock', 'stats'}
+
+    def handle_exchange(self):
+        state = self.server_state
+        body = self._read_body()
+        key = request_key(self.command, self.path, body, self.headers.get('Content-Type'))
+        with state['lock']:
+            queue = state['queues'].get(key)
+            if not queue:
+                state['stats']['missed'] += 1
+                exchange = None
+            else:
+                exchange = queue.popleft() if len(queue) > 1 else queue[0]  # Last answer repeats
+                state['stats']['served'] += 1
+        if exchange is None:
+            print(f"   ❓ No recording for {key[:120]}")
+            self._send(404, [('Content-Type', 'text/plain')], b'not in cassette')
+            return
+        if state['scale']:
+            time.sleep(exchange['elapsed'] * state['scale'])
+        headers = [tuple(h) for h in exchange['headers']]
+        self._send(exchange['status'], rewrite_headers(headers, state['upstream'], state['local']),
+                   rewrite_body(state['bodies'][exchange['body_sha256']], headers,
+                                state['upstream'], state['local']))
+
+def local_base_url(port, upstream_url):
+    """BASE_URL to use for tools talking to the local server"""
+    return f"http://127.0.0.1:{port}{urlsplit(upstream_url).path}"
+
+def serve(handler, port, state):
+    """Run a handler class until Ctrl+C"""
+    handler.server_state = state
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def record(path, port, upstream_url):
+    """Record through a local proxy until Ctrl+C"""
+    upstream = origin(upstream_url)
+    writer = CassetteWriter(path, upstream_url)
+    print(f"🎙️  Recording {upstream_url} into {path}")
+    print(f"   Run the tools with GEODOCS_BASE_URL={local_base_url(port, upstream_url)}")
+    print("   Press Ctrl+C to stop")
+    serve(RecordingProxy, port, {'upstream': upstream, 'local': f"http://127.0.0.1:{port}",
+                                 'writer': writer, 'sessions': threading.local()})
+    writer.close()
+    print(f"\n✅ Recorded {writer.exchanges} exchanges ({os.path.getsize(path) / 1024 / 1024:.1f} MB)")
+
+def replay(path, port, scale):
+    """Serve a cassette until Ctrl+C"""
+    header, exchanges, bodies = load_cassette(path)
+    queues = defaultdict(deque)
+    for exchange in exchanges:
+        queues[exchange['key']].append(exchange)
+    upstream = header['upstream']
+    stats = Counter()
+    print(f"▶️  Replaying {len(exchanges)} exchanges from {path} (latency x{scale:g})")
+    print(f"   Run the tools with GEODOCS_BASE_URL={local_base_url(port, header['base_url'])}")
+    print("   Press Ctrl+C to stop")
+    serve(ReplayServer, port, {'upstream': upstream, 'local': f"http://127.0.0.1:{port}",
+                               'queues': queues, 'bodies': bodies, 'scale': scale,
+                               'lock': threading.Lock(), 'stats': stats})
+    print(f"\n✅ Served {stats['served']} exchanges, {stats['missed']} not in cassette")
+
+def info(path):
+    """Summarise a cassette"""
+    header, exchanges, bodies = load_cassette(path)
+    print(f"📼 {path}: {header['upstream']}, recorded {header['recorded']}")
+    print(f"   {len(exchanges)} exchanges, {len(bodies)} unique bodies "
+          f"({sum(len(b) for b in bodies.values()) / 1024 / 1024:.1f} MB), "
+          f"file {os.path.getsize(path) / 1024 / 1024:.1f} MB")
+    by_path = defaultdict(list)
+    for exchange in exchanges:
+        by_path[f"{exchange['method']} {exchange['path'].split('?')[0]}"].append(exchange['elapsed'])
+    for name, times in sorted(by_path.items(), key=lambda kv: -sum(kv[1])):
+        print(f"   {len(times):6d} x {name:<50} {sum(times) / len(times) * 1000:8.0f} ms avg")
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Record and replay portal traffic")
+    sub = parser.add_subparsers(dest='command', required=True)
+    rec = sub.add_parser('record', help="Proxy the portal and record a cassette")
+    rec.add_argument('cassette', help=f"Cassette file (e.g. {CASSETTE_DIR}/bagalkote.cassette)")
+    rec.add_argument('--port', type=int, default=DEFAULT_PORT)
+    rec.add_argument('--upstream', default=PORTAL_URL, help="Portal base URL to record")
+    rep = sub.add_parser('replay', help="Serve a cassette")
+    rep.add_argument('cassette')
+    rep.add_argument('--port', type=int, default=DEFAULT_PORT)
+    rep.add_argument('--scale', type=float, default=1.0,
+                     help="Latency multiplier: 1 = as recorded, 0.5 = twice as fast, 0 = no delay")
+    inf = sub.add_parser('info', help="Summarise a cassette")
+    inf.add_argument('cassette')
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        record(args.cassette, args.port, args.upstream)
+    elif args.command == 'replay':
+        replay(args.cassette, args.port, args.scale)
+    else:
+        info(args.cassette)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Refresh downloaded village maps using HTTP validators
+Sends conditional requests (If-None-Match / If-Modified-Since) for every map we
+have a URL for and only rewrites the maps that changed upstream.
+A full sweep costs response headers, not the whole archive.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from geodocs import (
+    BASE_URL, USE_BLOB_STORE, load_catalog, iter_villages, village_filepath,
+    load_pdf_links, load_validators, save_validators
+)
+from geodocs.transfer_http import validators_from_response, write_pdf
+from map_optimize import load_optimize_log, original_sizes
+from map_store import hash_file, load_manifest, save_manifest, ingest_file
+
+REFRESH_WORKERS = 8  # Concurrent conditional requests
+REQUEST_TIMEOUT = 30
+SAVE_EVERY = 200  # Save validators every N checked maps
+
+_thread_local = threading.local()
+
+def get_session():
+    """One keep-alive session per worker thread"""
+    session = getattr(_thread_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            'Referer': BASE_URL
+        })
+        _thread_local.session = session
+    return session
+
+def conditional_headers(validator):
+    """Build conditional request headers from a stored validator"""
+    headers = {}
+    if validator.get('etag'):
+        headers['If-None-Match'] = validator['etag']
+    if validator.get('last_modified'):
+        headers['If-Modified-Since'] = validator['last_modified']
+    return headers
+
+def header_size(response):
+    """Approximate bytes on the wire for the status line and headers"""
+    return 16 + sum(len(k) + len(v) + 4 for k, v in response.headers.items())
+
+def is_unchanged(validator, response, filepath, original_size=None):
+    """Decide whether a 200 response describes the map we already have
+
+    Used when the server ignores conditional headers. Without a stored
+    validator, a matching Content-Length against the local file (or, for a map
+    map_optimize.py rewrote, the size the portal served) is taken as unchanged
+    so the first sweep can seed validators without downloading.
+    """
+    etag = response.headers.get('ETag')
+    last_modified = response.headers.get('Last-Modified')
+    content_length = response.headers.get('Content-Length')
+
+    if validator.get('etag') and etag:
+        return etag == validator['etag'] and not etag.startswith('W/')
+    if validator.get('last_modified') and last_modified:
+        return (last_modified == validator['last_modified'] and
+                content_length == validator.get('content_length'))
+    if content_length and os.path.exists(filepath):
+        return int(content_length) == (original_size or os.path.getsize(filepath))
+    return False
+
+def served_size(filepath, sha256, served_sizes, optimized_sizes):
+    """Size the portal served for a map map_optimize.py rewrote (None: not rewritten)
+
+    `sha256` is the manifest's hash of the map; for maps outside the store the
+    local file is hashed, but only if its size is one the optimizer wrote.
+    """
+    if sha256 is None:
+        try:
+            if os.path.getsize(filepath) not in optimized_sizes:
+                return None
+        except OSError:
+            return None
+        sha256 = hash_file(filepath)
+    return served_sizes.get(sha256)
+
+def refresh_map(village_id, pdf_url, filepath, validator, original_size=None):
+    """Check one map and rewrite it only if it changed
+
+    Returns (status, validator, bytes_transferred) where status is one of
+    'unchanged', 'updated' or 'failed'.
+    """
+    try:
+        response = get_session().get(
+            pdf_url,
+            headers=conditional_headers(validator) if os.path.exists(filepath) else {},
+            timeout=REQUEST_TIMEOUT,
+            stream=True
+        )
+    except requests.RequestException:
+        return 'failed', validator, 0
+
+    transferred = header_size(response)
+    try:
+        if response.status_code == 304:
+            checked = dict(validator, checked=datetime.now().isoformat())
+            return 'unchanged', checked, transferred
+
+        if response.status_code != 200 or 'application/pdf' not in response.headers.get('content-type', ''):
+            return 'failed', validator, transferred
+
+        new_validator = validators_from_response(response, pdf_url)
+        if is_unchanged(validator, response, filepath, original_size):
+            # Server ignored the conditional request but the map is the same:
+            # close the stream without reading the body
+            return 'unchanged', new_validator, transferred
+
+        write_pdf(response, filepath)
+        return 'updated', new_validator, transferred + os.path.getsize(filepath)
+    except (requests.RequestException, OSError):
+        return 'failed', validator, transferred
+    finally:
+        response.close()
+
+def collect_targets(district=None):
+    """List (village_id, url, filepath, validator) for every map with a known URL"""
+    pdf_links = load_pdf_links()
+    validators = load_validators()
+    targets = []
+
+    for item in iter_villages(load_catalog()):
+        if district and item['district']['label'].lower() != district.lower():
+            continue
+        validator = validators.get(item['id'], {})
+        link = (pdf_links.get(item['district']['label'], {})
+                .get(item['taluk']['label'], {})
+                .get(item['hobli']['label'], {})
+                .get(item['village']['label'], {}))
+        pdf_url = validator.get('url') or link.get('url')
+        if pdf_url:
+            targets.append((item['id'], pdf_url, village_filepath(item), validator))
+    return targets, validators
+
+def main():
+    """Run a freshness sweep over the downloaded archive"""
+    parser = argparse.ArgumentParser(description="Refresh village maps that changed upstream")
+    parser.add_argument('--workers', type=int, default=REFRESH_WORKERS, help="Concurrent requests")
+    parser.add_argument('--district', help="Only refresh one district (by label)")
+    args = parser.parse_args()
+
+    print("🔄 Starting map freshness sweep...")
+    targets, validators = collect_targets(args.district)
+    print(f"📊 Maps with a known URL: {len(targets)}")
+    if not targets:
+        print("✨ Nothing to refresh (no PDF links recorded yet)")
+        return
+
+    manifest = load_manifest() if USE_BLOB_STORE else None
+    optimize_log = load_optimize_log()
+    served_sizes = original_sizes(optimize_log)
+    optimized_sizes = {entry['after'] for entry in optimize_log['blobs'].values()}
+    stored = manifest['villages'] if manifest is not None else {}
+    counts = {'unchanged': 0, 'updated': 0, 'failed': 0}
+    transferred = 0
+    start_time = time.time()
+
+    def check(village_id, pdf_url, filepath, validator):
+        original_size = served_size(filepath, stored.get(village_id, {}).get('sha256'),
+                                    served_sizes, optimized_sizes)
+        return refresh_map(village_id, pdf_url, filepath, validator, original_size)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+            target_paths = {village_id: filepath for village_id, _, filepath, _ in targets}
+            futures = {
+                executor.submit(check, village_id, pdf_url, filepath, validator): village_id
+                for village_id, pdf_url, filepath, validator in targets
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                village_id = futures[future]
+                status, validator, size = future.result()
+                counts[status] += 1
+                transferred += size
+                if status != 'failed':
+                    validators[village_id] = validator
+                if status == 'updated':
+                    if manifest is not None:
+                        ingest_file(manifest, village_id, target_paths[village_id], validator['url'])
+                    print(f"\n   ♻️  Updated {village_id}")
+                if done % SAVE_EVERY == 0:
+                    save_validators(validators)
+                print(f"\r[{done:5d}/{len(targets)}] ✅ {counts['unchanged']:5d} unchanged | "
+                      f"♻️  {counts['updated']:4d} updated | ❌ {counts['failed']:4d} failed | "
+                      f"📦 {transferred / 1024 / 1024:.1f} MB", end='', flush=True)
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Interrupted by user. Saving validators...")
+    finally:
+        save_validators(validators)
+        if manifest is not None:
+            save_manifest(manifest)
+
+    total_time = str(timedelta(seconds=int(time.time() - start_time)))
+    print("\n\n" + "="*80)
+    print("📊 Refresh Summary:")
+    print("="*80)
+    print(f"   ✅ Unchanged: {counts['unchanged']}")
+    print(f"   ♻️  Updated: {counts['updated']}")
+    print(f"   ❌ Failed: {counts['failed']}")
+    print(f"   📦 Transferred: {transferred / 1024 / 1024:.2f} MB")
+    print(f"   ⏱️  Total time: {total_time}")
+    print("="*80)
+
+if __name__ == "__main__":
+    main()
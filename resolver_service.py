@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Long-running PDF URL resolver with a warm browser pool
+Serves the same JSON contract as api/server.js (POST /api/get-pdf-url with
+district, taluk, hobli and village; GET /health), but answers from the local
+archive first: a downloaded map in village_maps/ or a link already in
+all_pdf_links.json costs a dictionary lookup. Everything else goes to a pool
+of browsers (or HTTP sessions) that wait on a pre-loaded portal page, and
+concurrent requests for the same village share one resolution.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import TimeoutError as FutureTimeout
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from browser_pool import WATCHDOG_TIMEOUT, BrowserPool, WorkerCrashed
+from geodocs.scheduler import INTERACTIVE
+from geodocs import PDF_LINKS_FILE, load_catalog, iter_villages, load_pdf_links, village_filepath, load_engine
+from geodocs.http_cache import normalize_value
+from geodocs.name_index import KINDS, load_index
+
+SERVICE_PORT = int(os.environ.get('PORT', 3000))  # Same default port as api/server.js
+SERVICE_WORKERS = 2  # Warm browsers (or HTTP sessions) kept ready
+SERVICE_ENGINE = "selenium"  # Resolver engine: "selenium" or "http"
+RESOLVE_TIMEOUT = 90  # Seconds a request waits for a live resolution
+PREFER_LOCAL_MAPS = True  # Answer with the downloaded file when there is one
+LINKS_RELOAD_INTERVAL = 30  # Seconds between checks for a newer all_pdf_links.json
+MAPS_PATH = '/maps/'  # Downloaded maps are served under /maps/<village_id>
+AUTO_CORRECT_SCORE = 0.8  # Treat a misspelled village as the best name match in its hobli above this similarity
+MAP_SERVER_URL = os.environ.get('GEODOCS_MAP_SERVER_URL')  # Link local maps to map_server.py (ETags, ranges) instead
+
+def request_key(district, taluk, hobli, village):
+    """Lookup key: dropdown values plus the village name, compared loosely"""
+    return tuple(normalize_value(v) for v in (district, taluk, hobli, village))
+
+class VillageDirectory:
+    """Catalog villages and known PDF links, indexed by request key"""
+
+    def __init__(self):
+        self.items = {}
+        self.by_id = {}
+        for item in iter_villages(load_catalog()):
+            values = (item['district']['value'], item['taluk']['value'], item['hobli']['value'])
+            self.items[request_key(*values, item['village']['label'])] = item
+            self.items.setdefault(request_key(*values, item['village']['value']), item)
+            self.by_id[item['id']] = item
+        self.links = {}
+        self._links_mtime = None
+        self._checked = 0
+        self._lock = threading.Lock()
+        self.reload_links()
+
+    def reload_links(self):
+        """Re-read all_pdf_links.json if the bulk downloader updated it"""
+        try:
+            mtime = os.path.getmtime(PDF_LINKS_FILE)
+        except OSError:
+            return
+        if mtime == self._links_mtime:
+            return
+        links = {}
+        for taluks in load_pdf_links().values():
+            for hoblis in taluks.values():
+                for villages in hoblis.values():
+                    for label, entry in villages.items():
+                        key = request_key(entry['district_value'], entry['taluk_value'],
+                                          entry['hobli_value'], label)
+                        links[key] = entry['url']
+        with self._lock:
+            links.update({k: v for k, v in self.links.items() if k not in links})
+            self.links = links
+            self._links_mtime = mtime
+
+    def known_url(self, key):
+        """PDF URL from all_pdf_links.json or an earlier resolution, or None"""
+        if time.time() - self._checked > LINKS_RELOAD_INTERVAL:
+            self._checked = time.time()
+            self.reload_links()
+        return self.links.get(key)
+
+    def remember(self, key, url):
+        """Keep a live resolution for later requests"""
+        with self._lock:
+            self.links[key] = url
+
+    def find(self, key):
+        """Catalog item for a request key, or None"""
+        return self.items.get(key)
+
+    def local_file(self, item):
+        """Path of a village's downloaded map, or None"""
+        path = village_filepath(item)
+        return path if os.path.exists(path) else None
+
+class ResolverService:
+    """Local answers first, then coalesced resolutions on a warm pool
+
+    Pass the `pool` of a running bulk download to share its browsers: lookups
+    then go to its interactive lane, ahead of the queued villages.
+    """
+
+    def __init__(self, engine=SERVICE_ENGINE, workers=SERVICE_WORKERS, pool=None):
+        self.engine = engine
+        self.directory = VillageDirectory()
+        self.names = load_index()
+        self.resolver = load_engine('resolver', engine)
+        self.pool = pool or BrowserPool(workers, self._resolve, self.resolver.setup_driver,
+                                        warmup=self.resolver.warm_up_driver, rewarm=True,
+                                        watchdog_timeout=max(WATCHDOG_TIMEOUT, self.resolver.resolve_budget()))
+        self.inflight = {}  # request key -> Future of the running resolution
+        self.stats = Counter()
+        self._lock = threading.RLock()
+
+    def start(self):
+        """Launch and warm the pool"""
+        self.pool.start()
+
+    def shutdown(self):
+        """Close every browser"""
+        self.pool.shutdown()
+
+    def _resolve(self, worker, item):
+        """Pool handler: one resolution on a worker's (usually warm) driver"""
+        worker.check()
+        pdf_url = self.resolver.get_pdf_url_from_page(
+            worker.driver,
+            item['district']['value'],
+            item['taluk']['value'],
+            item['hobli']['value'],
+            item['village']['label'],
+            skip_navigation=worker.warm
+        )
+        worker.warm = False
+        worker.pages += 1
+        if not pdf_url and not worker.is_alive():
+            raise WorkerCrashed(f"browser of worker {worker.worker_id} died")
+        return pdf_url
+
+    def _finished(self, key, future):
+        pdf_url = None if future.cancelled() else future.result()
+        with self._lock:
+            if pdf_url:
+                self.directory.remember(key, pdf_url)
+            self.inflight.pop(key, None)
+
+    def lookup(self, district, taluk, hobli, village):
+        """(pdf_url or local map path, source) for a village; raises FutureTimeout"""
+        key = request_key(district, taluk, hobli, village)
+        item = self.directory.find(key)
+        if item is None:
+            item = self.correct(district, taluk, hobli, village)
+        if item is not None:
+            # Requests by village value and by label share links and resolutions
+            key = request_key(district, taluk, hobli, item['village']['label'])
+        if PREFER_LOCAL_MAPS and item is not None and self.directory.local_file(item):
+            self.stats['local'] += 1
+            if MAP_SERVER_URL:
+                return MAP_SERVER_URL.rstrip('/') + MAPS_PATH + item['id'], 'local'
+            return MAPS_PATH + item['id'], 'local'
+        pdf_url = self.directory.known_url(key)
+        if pdf_url:
+            self.stats['links'] += 1
+            return pdf_url, 'links'
+        if item is None:
+            # Not in the catalog: resolve exactly what was asked for
+            item = {'id': None,
+                    'district': {'value': district, 'label': district},
+                    'taluk': {'value': taluk, 'label': taluk},
+                    'hobli': {'value': hobli, 'label': hobli},
+                    'village': {'value': village, 'label': village}}
+        with self._lock:
+            future = self.inflight.get(key)
+            if future is not None:
+                self.stats['coalesced'] += 1
+                source = 'coalesced'
+            else:
+                self.stats['resolved'] += 1
+                source = 'resolved'
+                future = self.inflight[key] = self.pool.submit(item, INTERACTIVE, self._resolve)
+                future.add_done_callback(lambda f: self._finished(key, f))
+        return future.result(timeout=RESOLVE_TIMEOUT), source
+
+    def correct(self, district, taluk, hobli, village):
+        """Catalog item of the village in this hobli whose name best matches a misspelling, or None"""
+        matches = self.names.search(village, ['village'], 2, [district, taluk, hobli], AUTO_CORRECT_SCORE)
+        if not matches or (len(matches) > 1 and matches[1]['score'] == matches[0]['score']):
+            return None  # No close name, or two equally close ones
+        self.stats['corrected'] += 1
+        return self.directory.by_id.get(matches[0]['village_id'])
+
+    def map_file(self, village_id):
+        """Path of a downloaded map by village id, or None"""
+        item = self.directory.by_id.get(village_id)
+        return self.directory.local_file(item) if item else None
+
+    def health(self):
+        """Status for GET /health"""
+        return {
+            'status': 'ok',
+            'timestamp': datetime.now().isoformat(),
+            'engine': self.engine,
+            'workers': len(self.pool.workers),
+            'warm': sum(1 for w in self.pool.workers if w.warm),
+            'inflight': len(self.inflight),
+            'stats': dict(self.stats, **{k: v for k, v in self.pool.stats.items() if v}),
+            'lanes': self.pool.tasks.stats()
+        }
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    service = None  # ResolverService
+    quiet = False
+
+    def log_message(self, format, *args):
+        pass
+
+    def _cors(self):
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, ngrok-skip-browser-warning')
+
+    def _json(self, status, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self._cors()
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _base_url(self):
+        scheme = self.headers.get('X-Forwarded-Proto', 'http')
+        return f"{scheme}://{self.headers.get('Host', f'127.0.0.1:{self.server.server_address[1]}')}"
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self._cors()
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._json(200, self.service.health())
+        elif self.path.startswith('/api/search'):
+            self._search(parse_qs(urlsplit(self.path).query))
+        elif self.path.startswith(MAPS_PATH):
+            self._send_map(self.path[len(MAPS_PATH):].split('?', 1)[0])
+        else:
+            self._json(404, {'success': False, 'error': 'Not found'})
+
+    def _search(self, query):
+        name = query.get('q', [''])[0]
+        if not name.strip():
+            self._json(400, {'success': False, 'error': 'Missing required parameter: q'})
+            return
+        kinds = [k for k in query.get('kind', []) if k in KINDS] or None
+        within = [v for v in query.get('within', [''])[0].split('/') if v] or None
+        try:
+            limit = min(50, max(1, int(query.get('limit', ['10'])[0])))
+        except ValueError:
+            limit = 10
+        self._json(200, {'success': True, 'results': self.service.names.search(name, kinds, limit, within)})
+
+    def _send_map(self, village_id):
+        path = self.service.map_file(village_id)
+        if not path:
+            self._json(404, {'success': False, 'error': 'Map not downloaded'})
+            return
+        self.send_response(200)
+        self._cors()
+        self.send_header('Content-Type', 'application/pdf')
+        self.send_header('Content-Length', str(os.path.getsize(path)))
+        self.end_headers()
+        with open(path, 'rb') as f:
+            shutil.copyfileobj(f, self.wfile)
+
+    def do_POST(self):
+        if self.path != '/api/get-pdf-url':
+            self._json(404, {'success': False, 'error': 'Not found'})
+            return
+        started = time.time()
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            params = json.loads(self.rfile.read(length) or b'{}')
+            fields = [str(params.get(name) or '').strip() for name in ('district', 'taluk', 'hobli', 'village')]
+            if not all(fields):
+                self._json(400, {'success': False,
+                                 'error': 'Missing required parameters: district, taluk, hobli, village'})
+                return
+            try:
+                pdf_url, source = self.service.lookup(*fields)
+            except FutureTimeout:
+                self._json(504, {'success': False, 'error': 'Timed out resolving the PDF URL. Please try again.'})
+                return
+            if pdf_url and pdf_url.startswith('/'):
+                pdf_url = self._base_url() + pdf_url
+            if not self.quiet:
+                print(f"[{datetime.now().isoformat(timespec='seconds')}] {' > '.join(fields)}: "
+                      f"{source} in {(time.time() - started) * 1000:.0f} ms{'' if pdf_url else ' (not found)'}")
+            if pdf_url:
+                self._json(200, {'success': True, 'pdfUrl': pdf_url, 'source': source})
+            else:
+                self.service.stats['not_found'] += 1
+                self._json(404, {'success': False, 'error': 'PDF URL not found. Please check your selections.'})
+        except Exception as e:
+            self.service.stats['errors'] += 1
+            self._json(500, {'success': False, 'error': 'Internal server error: ' + str(e)})
+
+def make_server(service, host='0.0.0.0', port=SERVICE_PORT, quiet=False):
+    """HTTP server for a service (call serve_forever() on it)"""
+    ServiceHandler.service = service
+    ServiceHandler.quiet = quiet
+    server = ThreadingHTTPServer((host, port), ServiceHandler)
+    server.daemon_threads = True
+    return server
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Serve /api/get-pdf-url from the archive and a warm browser pool")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=SERVICE_PORT)
+    parser.add_argument('--workers', type=int, default=SERVICE_WORKERS, help="Warm browsers or HTTP sessions")
+    parser.add_argument('--engine', default=SERVICE_ENGINE, help="Resolver engine (selenium or http)")
+    parser.add_argument('--quiet', action='store_true', help="Don't log each request")
+    args = parser.parse_args()
+
+    print("📖 Loading catalog and PDF links...")
+    service = ResolverService(args.engine, args.workers)
+    print(f"   {len(service.directory.by_id)} villages, {len(service.directory.links)} known links")
+    print(f"🌐 Warming {args.workers} {args.engine} worker(s)...")
+    service.start()
+
+    server = make_server(service, args.host, args.port, args.quiet)
+    print(f"🚀 PDF resolver running on http://localhost:{args.port}")
+    print(f"📡 Endpoint: POST http://localhost:{args.port}/api/get-pdf-url")
+    print(f"💚 Health check: GET http://localhost:{args.port}/health")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n⚠️  Stopping...")
+    finally:
+        server.server_close()
+        service.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Survey-number index over the downloaded village maps
+Extracts the text layer of every PDF in village_maps/ in a process pool and
+records which survey numbers (and place labels) appear on which village map
+and page. Maps whose hash is unchanged since the last run are skipped, so
+rebuilding after a crawl only reads new or changed files. Queries read the
+SQLite index only; no PDF is opened.
+
+Text extraction needs PyMuPDF (`pip install pymupdf`) or pypdf
+(`pip install pypdf`); the maps are encrypted with an empty password, which
+both handle.
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+try:
+    import fitz  # PyMuPDF
+    HAS_FITZ = True
+except ImportError:
+    HAS_FITZ = False
+
+try:
+    import pypdf
+    HAS_PYPDF = True
+except ImportError:
+    HAS_PYPDF = False
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from geodocs import load_catalog, iter_villages
+from map_store import downloaded_maps
+
+SURVEY_INDEX_FILE = "survey_index.sqlite"
+INDEX_WORKERS = os.cpu_count() or 2  # Extraction processes
+BATCH_COMMIT = 200  # Maps written per transaction
+
+SURVEY_RE = re.compile(r'^\d{1,4}[A-Z]?(?:[/-]\d{1,3}[A-Z]?){0,3}\*?$')
+LABEL_RE = re.compile(r'^[A-Z][A-Z.]{2,}$')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS maps (
+    village_id TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    pages INTEGER NOT NULL,
+    terms INTEGER NOT NULL,
+    error TEXT,
+    indexed REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS terms (
+    term TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    village_id TEXT NOT NULL,
+    page INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS terms_term ON terms (term);
+CREATE INDEX IF NOT EXISTS terms_village ON terms (village_id);
+"""
+
+def normalize_survey(text):
+    """Canonical survey number: upper case, no spaces, '/' between parts"""
+    return re.sub(r'\s+', '', str(text or '').upper()).replace('-', '/').rstrip('*')
+
+def page_words(path):
+    """Words of each page of a PDF, with whichever library is installed"""
+    if HAS_FITZ:
+        with fitz.open(path) as doc:
+            if doc.needs_pass:
+                doc.authenticate('')
+            return [[w[4] for w in page.get_text('words')] for page in doc]
+    reader = pypdf.PdfReader(path)
+    if reader.is_encrypted:
+        reader.decrypt('')
+    return [(page.extract_text() or '').split() for page in reader.pages]
+
+def extract_terms(path):
+    """(pages, {(term, kind, page)}) for one map; runs in a worker process"""
+    pages = page_words(path)
+    found = set()
+    for number, words in enumerate(pages, 1):
+        for word in words:
+            token = word.strip('.,;:()[]{}').upper()
+            if SURVEY_RE.match(token):
+                found.add((normalize_survey(token), 'survey', number))
+            elif LABEL_RE.match(token):
+                found.add((token.strip('.'), 'label', number))
+    return len(pages), found
+
+def open_index(path=SURVEY_INDEX_FILE):
+    """Open (and create) the index database"""
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.executescript(_SCHEMA)
+    return db
+
+def build_index(workers=INDEX_WORKERS, district_label=None, force=False):
+    """Index new and changed maps; returns counts of indexed, skipped, failed and removed maps"""
+    db = open_index()
+    known = dict(db.execute("SELECT village_id, sha256 FROM maps"))
+    todo, present = [], set()
+    for item, filepath, sha256 in downloaded_maps(district_label=district_label):
+        present.add(item['id'])
+        if force or known.get(item['id']) != sha256:
+            todo.append((item['id'], filepath, sha256))
+    stats = {'indexed': 0, 'skipped': len(present) - len(todo), 'failed': 0, 'removed': 0}
+
+    # Maps that are gone from the archive (only within the district being rebuilt)
+    scope = {item['id'] for item in iter_villages(load_catalog())
+             if not district_label or item['district']['label'].lower() == district_label.lower()}
+    for village_id in [v for v in known if v not in present and (v in scope or not district_label)]:
+        db.execute("DELETE FROM terms WHERE village_id = ?", (village_id,))
+        db.execute("DELETE FROM maps WHERE village_id = ?", (village_id,))
+        stats['removed'] += 1
+
+    print(f"🔎 {len(todo)} maps to index ({stats['skipped']} unchanged) with {workers} workers")
+    started = time.time()
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(extract_terms, filepath): (village_id, sha256)
+                   for village_id, filepath, sha256 in todo}
+        for done, future in enumerate(as_completed(futures), 1):
+            village_id, sha256 = futures[future]
+            db.execute("DELETE FROM terms WHERE village_id = ?", (village_id,))
+            try:
+                pages, found = future.result()
+                error = None
+            except Exception as e:
+                pages, found, error = 0, set(), f"{type(e).__name__}: {e}"
+                stats['failed'] += 1
+            db.executemany("INSERT INTO terms (term, kind, village_id, page) VALUES (?, ?, ?, ?)",
+                           [(term, kind, village_id, page) for term, kind, page in found])
+            db.execute("INSERT OR REPLACE INTO maps (village_id, sha256, pages, terms, error, indexed) "
+                       "VALUES (?, ?, ?, ?, ?, ?)", (village_id, sha256, pages, len(found), error, time.time()))
+            if error is None:
+                stats['indexed'] += 1
+            if done % BATCH_COMMIT == 0:
+                db.commit()
+                rate = done / (time.time() - started)
+                print(f"   {done}/{len(todo)} maps ({rate:.1f}/s)")
+    db.commit()
+    db.close()
+    return stats
+
+def find(term, within=None, kind='survey'):
+    """[(village_id, page)] where a survey number (or label) appears
+
+    A survey number also matches its subdivisions: 45 finds 45, 45/1 and 45/2A.
+    `within` is a village_id prefix such as "2_1" (district 2, taluk 1).
+    """
+    db = open_index()
+    term = normalize_survey(term) if kind == 'survey' else term.upper()
+    query = "SELECT DISTINCT village_id, page, term FROM terms WHERE kind = ? AND (term = ? OR term LIKE ?)"
+    params = [kind, term, term + '/%']
+    if within:
+        # Escape the whole prefix: "_" inside it is a separator, not a LIKE wildcard
+        prefix = within.rstrip('_').replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        query += " AND village_id LIKE ? ESCAPE '\\'"
+        params.append(prefix + '\\_%')
+    rows = db.execute(query + " ORDER BY village_id, page", params).fetchall()
+    db.close()
+    return rows
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Index survey numbers printed on the village maps")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help="Index new and changed maps")
+    build.add_argument('--workers', type=int, default=INDEX_WORKERS)
+    build.add_argument('--district', help="Only one district (by label)")
+    build.add_argument('--force', action='store_true', help="Re-read every map")
+    query = sub.add_parser('find', help="Maps showing a survey number")
+    query.add_argument('survey')
+    query.add_argument('--within', help="village_id prefix, e.g. 2 or 2_1_1")
+    query.add_argument('--label', action='store_true', help="Search place labels instead of survey numbers")
+    sub.add_parser('stats', help="Summarise the index")
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        if not (HAS_FITZ or HAS_PYPDF):
+            print("❌ Text extraction needs PyMuPDF or pypdf: pip install pymupdf", file=sys.stderr)
+            sys.exit(1)
+        stats = build_index(args.workers, args.district, args.force)
+        print(f"✅ Indexed {stats['indexed']} maps, {stats['skipped']} unchanged, "
+              f"{stats['failed']} failed, {stats['removed']} removed -> {SURVEY_INDEX_FILE}")
+    elif args.command == 'find':
+        started = time.perf_counter()
+        rows = find(args.survey, args.within, 'label' if args.label else 'survey')
+        labels = {item['id']: item for item in iter_villages(load_catalog())} if rows else {}
+        for village_id, page, term in rows:
+            item = labels.get(village_id)
+            where = " > ".join(item[k]['label'] for k in ('district', 'taluk', 'hobli', 'village')) if item else village_id
+            print(f"   {term:<10} {where}  (page {page}, {village_id})")
+        print(f"🔎 {len(rows)} matches in {(time.perf_counter() - started) * 1000:.1f} ms")
+    else:
+        db = open_index()
+        maps, pages, failed = db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(pages), 0), COUNT(error) FROM maps").fetchone()
+        surveys = db.execute("SELECT COUNT(DISTINCT term) FROM terms WHERE kind = 'survey'").fetchone()[0]
+        print(f"📊 {SURVEY_INDEX_FILE}: {maps} maps ({pages} pages, {failed} unreadable), "
+              f"{surveys} distinct survey numbers")
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Regression tests for browser_pool.py, run without a browser
+A stand-in driver lets the supervisor's crash, re-queue and delivery paths run
+in a few milliseconds: python -m pytest test_browser_pool.py
+"""
+
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import browser_pool
+from browser_pool import MAX_REQUEUES, BrowserPool
+
+class FakeDriver:
+    """Just enough of a WebDriver for BrowserWorker.start()/stop()"""
+
+    def quit(self):
+        pass
+
+def run_with_timeout(pool, items, seconds=10):
+    """Results of pool.run(items); fails instead of hanging if it never finishes"""
+    results = []
+    thread = threading.Thread(target=lambda: results.extend(pool.run(items)), daemon=True)
+    thread.start()
+    thread.join(seconds)
+    assert not thread.is_alive(), f"run() still waiting after {seconds}s (stats: {pool.stats})"
+    return results
+
+def test_claimed_then_crashed_is_requeued(monkeypatch):
+    """A worker that claims its item and then crashes must not leave run() waiting"""
+    monkeypatch.setattr(browser_pool, 'RESTART_BACKOFF', 0)
+    calls = []
+
+    def handler(worker, item):
+        calls.append(item)
+        worker.claim()
+        if len(calls) == 1:
+            raise RuntimeError("download failed after claiming")
+        return 'ok'
+
+    pool = BrowserPool(1, handler, FakeDriver)
+    assert run_with_timeout(pool, ['a']) == [('a', 'ok')]
+    assert pool.stats['crashed'] == 1 and pool.stats['requeued'] == 1
+
+def test_claimed_then_always_crashing_is_abandoned(monkeypatch):
+    """After MAX_REQUEUES crashes past the claim the item is delivered as None"""
+    monkeypatch.setattr(browser_pool, 'RESTART_BACKOFF', 0)
+
+    def handler(worker, item):
+        worker.claim()
+        raise RuntimeError("download failed after claiming")
+
+    pool = BrowserPool(1, handler, FakeDriver)
+    assert run_with_timeout(pool, ['a']) == [('a', None)]
+    assert pool.stats['crashed'] == MAX_REQUEUES + 1 and pool.stats['abandoned'] == 1
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, '-q']))
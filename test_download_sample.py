@@ -12,7 +12,8 @@ import sys
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from download_all_pdfs import (
     setup_driver, get_pdf_url_from_page, download_pdf, 
-    sanitize_filename, BASE_URL, DOWNLOAD_DIR
+    sanitize_filename, BASE_URL, DOWNLOAD_DIR,
+    create_download_session, sync_session_cookies
 )
 
 def test_download_sample():
@@ -54,6 +55,7 @@ def test_download_sample():
     # Setup driver
     print("🌐 Setting up browser...")
     driver = setup_driver()
+    session = create_download_session(driver)
     
     success_count = 0
     failed_count = 0
@@ -93,7 +95,8 @@ def test_download_sample():
             
             # Download PDF
             print("   ⬇️  Downloading PDF...")
-            success = download_pdf(pdf_url, filepath)
+            sync_session_cookies(session, driver)
+            success = download_pdf(pdf_url, filepath, session=session)
             
             if success:
                 print(f"   ✅ Successfully downloaded: {filepath}")
@@ -105,6 +108,7 @@ def test_download_sample():
     except KeyboardInterrupt:
         print("\n⚠️  Interrupted by user")
     finally:
+        session.close()
         driver.quit()
         
         print("\n" + "="*60)